@@ -0,0 +1,221 @@
+# admission.py
+#
+# Ingest admission control: per-source rate limits + a bounded, prioritized
+# processing queue.
+#
+# WHY:
+# - /telemetry/push accepted everything. A misbehaving collector, or a storm
+#   of anomalous samples (each one tracked, many re-running the incident
+#   chain), could fill FastAPI's threadpool with ingest work, and /status
+#   (also served from that pool) would queue behind it.
+#
+# HOW:
+# - RateLimiter: one token bucket per source (the peer address, never a
+#   client-chosen id) and per region, each scope with its own rate. Refill is
+#   computed lazily from the elapsed time, so a bucket costs O(1) per take
+#   and nothing while idle. Idle buckets are evicted LRU past max_keys; the
+#   next new key of that scope inherits the evicted bucket's tokens, so
+#   churning through keys never mints fresh bursts.
+# - AdmissionQueue: at most max_in_flight ingest requests hold a thread;
+#   the rest wait on the event loop (no thread held) in a heap ordered by
+#   (priority, arrival). A release hands the slot straight to the best
+#   waiter. Bulk (healthy) samples may only fill bulk_share of the wait
+#   queue, the rest is kept for HIGH priority (anomalous) samples; beyond
+#   that, acquire() raises Overloaded and the caller answers 429.
+# - Dashboard reads never enter the queue. Capping ingest below the
+#   threadpool size is what keeps threads free for them.
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import asyncio
+import heapq
+import itertools
+import math
+import threading
+import time
+
+
+HIGH = 0   # anomalous samples
+BULK = 1   # healthy telemetry
+
+PRIORITY_NAMES = {HIGH: "high", BULK: "bulk"}
+
+
+class Overloaded(Exception):
+    """Request not admitted; retry_after_s is the suggested back-off."""
+
+    def __init__(self, reason: str, retry_after_s: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After takes whole seconds; never tell a client to retry at once."""
+    return str(max(1, math.ceil(seconds)))
+
+
+def parse_rate(spec: str) -> Optional[Tuple[float, float]]:
+    """"200:400" → (200 tokens/s, burst 400); "0" or "" → None (unlimited)."""
+    spec = spec.strip()
+    if not spec or spec == "0":
+        return None
+    rate, _, burst = spec.partition(":")
+    rate_f = float(rate)
+    burst_f = float(burst) if burst else rate_f
+    if rate_f <= 0 or burst_f <= 0:
+        raise ValueError(f"invalid rate limit {spec!r}")
+    return rate_f, burst_f
+
+
+class TokenBucket:
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float, n: float) -> float:
+        """Seconds until n tokens are available (0 = now)."""
+        self._refill(now)
+        if self.tokens >= n:
+            return 0.0
+        return (min(n, self.burst) - self.tokens) / self.rate
+
+    def take(self, n: float) -> None:
+        """Charge n tokens (may go negative: charged-but-exempt traffic)."""
+        self.tokens -= n
+
+
+class RateLimiter:
+    """
+    Token buckets keyed (scope, name), e.g. ("collector", "10.0.0.7") or
+    ("region", "northwest"); each scope has its own (rate, burst). Scopes
+    without a limit are not tracked. Thread-safe.
+
+    Buckets start full only while there is room: past max_keys a new bucket
+    takes over the state of the one evicted for it (the least recently used).
+    """
+
+    def __init__(self, limits: Dict[str, Optional[Tuple[float, float]]], max_keys: int = 10000):
+        self.limits = {scope: limit for scope, limit in limits.items() if limit is not None}
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.refused = 0
+
+    def _bucket(self, key: Tuple[str, str], now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate, burst = self.limits[key[0]]
+            bucket = TokenBucket(rate, burst, now)
+            if len(self._buckets) >= self.max_keys:
+                (scope, _), evicted = self._buckets.popitem(last=False)
+                if scope == key[0]:
+                    bucket.tokens, bucket.updated = evicted.tokens, evicted.updated
+            self._buckets[key] = bucket
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def admit(self, items: Sequence[Tuple[Sequence[Tuple[str, str]], bool]]) -> Tuple[List[bool], float]:
+        """
+        items: (bucket keys, exempt) per sample, in arrival order.
+        A bulk sample is admitted only if all of its buckets hold a token.
+        Exempt (priority) samples are always admitted but still charged, so a
+        bucket can go negative and the same source's bulk traffic pays later.
+        Returns per-sample admitted flags, and the longest wait for a refused
+        sample's buckets to refill (0.0 if none was refused).
+        """
+        now = time.monotonic()
+        admitted: List[bool] = []
+        wait = 0.0
+        with self._lock:
+            for keys, exempt in items:
+                buckets = [self._bucket(key, now) for key in keys if key[0] in self.limits]
+                if not exempt:
+                    item_wait = max((b.wait_time(now, 1.0) for b in buckets), default=0.0)
+                    if item_wait > 0:
+                        admitted.append(False)
+                        wait = max(wait, item_wait)
+                        continue
+                for bucket in buckets:
+                    bucket.take(1.0)
+                admitted.append(True)
+            self.refused += admitted.count(False)
+        return admitted, wait
+
+    @property
+    def keys(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionQueue:
+    """
+    Bounded, prioritized admission for ingest work. Event-loop only (call
+    acquire/release from coroutines on one loop), so no locking.
+    """
+
+    def __init__(self, max_in_flight: int = 16, max_queued: int = 256,
+                 bulk_share: float = 0.5, retry_after_s: float = 1.0):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.bulk_queued_limit = int(max_queued * bulk_share)
+        self.retry_after_s = retry_after_s
+        self.in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self.admitted = {HIGH: 0, BULK: 0}
+        self.waited = {HIGH: 0, BULK: 0}
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, priority: int) -> None:
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted[priority] += 1
+            return
+        limit = self.max_queued if priority == HIGH else self.bulk_queued_limit
+        if len(self._waiters) >= limit:
+            raise Overloaded("queue_full", self.retry_after_s)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self.waited[priority] += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # the slot was handed over just as we were cancelled
+            else:
+                self._waiters = [w for w in self._waiters if w[2] is not future]
+                heapq.heapify(self._waiters)
+            raise
+        self.admitted[priority] += 1
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)  # slot passes on; in_flight unchanged
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued,
+            "admitted": {PRIORITY_NAMES[p]: n for p, n in self.admitted.items()},
+            "waited": {PRIORITY_NAMES[p]: n for p, n in self.waited.items()},
+        }
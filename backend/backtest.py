@@ -0,0 +1,433 @@
+# backtest.py
+#
+# Offline replay / backtest of recorded telemetry through the real detector,
+# incident table and Cognitive → Decision → Planning chain (main.py), with
+# call_llm replaced by a local mock. No server, no HTTP.
+#
+# WHY:
+# - Trying a threshold, detector or policy change meant pushing live traffic
+#   through feed_demo.py and watching the dashboard.
+#
+# HOW:
+# - The input (NDJSON/JSON lines of TelemetryEvent objects, or CSV with the
+#   same columns) is streamed once and spooled per partition; cells are
+#   hashed to partitions, so each cell's samples stay in order in one
+#   process. Each worker imports main.py fresh (with --detector / --env
+#   applied), replays its partition and reports counters; the parent merges.
+# - Per sample: detect_anomaly → incident tracking; when the live service
+#   would run the incident chain it runs inline here (_run_incident_pipeline:
+#   analyze with the mocked LLM, what-if plan, policy, forecast).
+# - --speed 0 (default) replays as fast as possible; --speed N paces each
+#   worker to N x recorded time.
+# - Ground truth for time-to-detect is the record's "fault" field when the
+#   file has one (record mode writes it), else the static thresholds. An
+#   episode is a run of ground-truth samples in one cell; time-to-detect is
+#   recorded time from its first sample to the first detection in it.
+# - Per-stage throughput comes from main.py's own stage latency histograms.
+#
+# Caveats: a worker only sees its own cells, so offload targets in another
+# partition have no headroom data (same limit as sharding); --partition-by
+# region keeps same-region neighbors together. The incident table runs on
+# recorded time; the LLM cache TTL is wall-clock.
+#
+# HOW TO USE:
+#   python backtest.py record day.ndjson --cells-per-region 100 --hours 24 --topology day-topology.json
+#   python backtest.py run day.ndjson --workers 4 --output static.json
+#   python backtest.py run day.ndjson --workers 4 --detector ewma --output ewma.json
+#   python backtest.py run day.ndjson --speed 60          # 1 recorded minute / s
+#   python backtest.py run day.ndjson --partition-by region --env AINOA_TOPOLOGY_FILE=day-topology.json
+
+import argparse
+import contextlib
+import csv
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from telemetry_store import from_epoch, to_epoch
+
+
+# stages reported from main.py's STAGE_LATENCY histograms
+BACKTEST_STAGES = ("detect", "track", "pipeline", "analyze", "llm", "plan", "policy", "forecast")
+
+# static-threshold ground truth when the file has no "fault" field
+TRUTH_LOSS_PCT = 5.0
+TRUTH_LATENCY_MS = 150.0
+
+# spooled record: region, cell_id, loss, latency, throughput, epoch_s, fault ("1"/"0"/"")
+_SPOOL_SEP = "\t"
+
+
+def mock_llm(prompt: str) -> str:
+    """Deterministic stand-in for call_llm (offload suggestion, like the demo)."""
+    return json.dumps({
+        "issue_summary": "Congestion detected (backtest).",
+        "probable_cause": "Backhaul saturation due to heavy user load.",
+        "suggested_action": "Offload ~20% traffic to a neighboring cell to relieve congestion.",
+        "risk_level": "high",
+    })
+
+
+def _epoch(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    return to_epoch(datetime.fromisoformat(str(value).replace("Z", "+00:00")))
+
+
+def _flag(value: Any) -> str:
+    if value is None or value == "":
+        return ""
+    return "1" if str(value).strip().lower() in ("1", "true", "yes") else "0"
+
+
+def read_records(path: str) -> Iterator[Tuple[str, str, float, float, float, float, str]]:
+    """(region, cell_id, loss, latency, throughput, epoch_s, fault flag) in file order."""
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield (row["region"], row["cell_id"], float(row["packet_loss_pct"]),
+                       float(row["latency_ms"]), float(row["throughput_mbps"]),
+                       _epoch(row["timestamp"]), _flag(row.get("fault")))
+            return
+        for line in f:
+            line = line.strip()
+            if not line or line in ("[", "]"):
+                continue
+            obj = json.loads(line.rstrip(","))
+            yield (obj["region"], obj["cell_id"], float(obj["packet_loss_pct"]),
+                   float(obj["latency_ms"]), float(obj["throughput_mbps"]),
+                   _epoch(obj["timestamp"]), _flag(obj.get("fault")))
+
+
+def spool(path: str, workers: int, directory: str, by_region: bool = False) -> Tuple[List[str], Dict[str, Any]]:
+    """Split the input into one spool file per partition (by cell, or by region)."""
+    paths = [os.path.join(directory, f"part-{i}.tsv") for i in range(workers)]
+    files = [open(p, "w") for p in paths]
+    info: Dict[str, Any] = {"records": 0, "first_epoch": None, "last_epoch": None, "labelled": False}
+    try:
+        for region, cell_id, loss, latency, tput, epoch_s, fault in read_records(path):
+            key = region if by_region else f"{region}:{cell_id}"
+            part = zlib.crc32(key.encode("utf-8")) % workers
+            files[part].write(_SPOOL_SEP.join((region, cell_id, repr(loss), repr(latency), repr(tput),
+                                               repr(epoch_s), fault)) + "\n")
+            info["records"] += 1
+            if info["first_epoch"] is None:
+                info["first_epoch"] = epoch_s
+            info["last_epoch"] = epoch_s
+            info["labelled"] = info["labelled"] or fault != ""
+    finally:
+        for f in files:
+            f.close()
+    return paths, info
+
+
+# -----------------------------------------------------------------------------
+# worker side (one process per partition)
+# -----------------------------------------------------------------------------
+
+def _init_worker(env: Dict[str, str]) -> None:
+    os.environ.update(env)
+
+
+def replay_partition(spool_path: str, speed: float, first_epoch: float, wall_start: float,
+                     labelled: bool) -> Dict[str, Any]:
+    import main  # after _init_worker: picks up --detector / --env
+    main.call_llm = mock_llm
+
+    cells: Dict[str, List[Any]] = {}  # cell -> [episode onset or None, detected]
+    ttd: List[float] = []
+    counters = {"samples": 0, "anomalies": 0, "chains": 0, "episodes": 0, "missed": 0,
+                "false_alarm_chains": 0}
+    actions: Dict[str, int] = {}
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+
+    with open(spool_path) as f, open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):
+        for line in f:
+            region, cell_id, loss, latency, tput, epoch, fault = line.rstrip("\n").split(_SPOOL_SEP)
+            loss, latency, tput, epoch_s = float(loss), float(latency), float(tput), float(epoch)
+            if speed > 0:
+                delay = wall_start + (epoch_s - first_epoch) / speed - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+
+            event = main.PretypedEvent(region, cell_id, loss, latency, tput, from_epoch(epoch_s))
+            incident = main.detect_anomaly(event)
+            run_chain = main._track_detection(event, incident)
+            counters["samples"] += 1
+
+            truth = fault == "1" if labelled else (loss > TRUTH_LOSS_PCT or latency > TRUTH_LATENCY_MS)
+            state = cells.get(f"{region}:{cell_id}")
+            if state is None:
+                state = cells[f"{region}:{cell_id}"] = [None, False]
+            if truth and state[0] is None:
+                state[0], state[1] = epoch_s, False
+                counters["episodes"] += 1
+            elif not truth and state[0] is not None:
+                counters["missed"] += not state[1]
+                state[0] = None
+
+            if incident is None:
+                continue
+            counters["anomalies"] += 1
+            if state[0] is not None and not state[1]:
+                ttd.append(epoch_s - state[0])
+                state[1] = True
+            if run_chain:
+                counters["chains"] += 1
+                counters["false_alarm_chains"] += not truth
+                main._run_incident_pipeline(incident)
+                record = main.INCIDENTS.get(incident.incident_id)
+                if record is not None and record.policy:
+                    action = record.policy["action_type"]
+                    actions[action] = actions.get(action, 0) + 1
+
+    counters["missed"] += sum(1 for onset, detected in cells.values() if onset is not None and not detected)
+    stages = {}
+    for stage in BACKTEST_STAGES:
+        samples = main.STAGE_LATENCY[stage].samples()
+        stages[stage] = {"calls": samples[-1][2], "seconds": samples[-2][2]}
+    return {
+        "counters": counters,
+        "ttd_s": ttd,
+        "actions": actions,
+        "incident_events": {outcome: counter.value for outcome, counter in main.INCIDENT_EVENTS.items()},
+        "stages": stages,
+        "cells": len(cells),
+        "cpu_s": time.process_time() - cpu_started,
+        "wall_s": time.perf_counter() - wall_started,
+    }
+
+
+# -----------------------------------------------------------------------------
+# parent side
+# -----------------------------------------------------------------------------
+
+def _summary(values: List[float]) -> Dict[str, Optional[float]]:
+    values = sorted(values)
+
+    def pct(q: float) -> Optional[float]:
+        if not values:
+            return None
+        return round(values[min(len(values) - 1, max(0, math.ceil(q / 100.0 * len(values)) - 1))], 3)
+
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3) if values else None,
+        "p50": pct(50),
+        "p95": pct(95),
+        "max": pct(100),
+    }
+
+
+def merge(parts: List[Dict[str, Any]], info: Dict[str, Any], wall_s: float) -> Dict[str, Any]:
+    counters: Dict[str, int] = {}
+    actions: Dict[str, int] = {}
+    incident_events: Dict[str, float] = {}
+    stages: Dict[str, Dict[str, float]] = {s: {"calls": 0, "seconds": 0.0} for s in BACKTEST_STAGES}
+    ttd: List[float] = []
+    for part in parts:
+        for key, value in part["counters"].items():
+            counters[key] = counters.get(key, 0) + value
+        for key, value in part["actions"].items():
+            actions[key] = actions.get(key, 0) + value
+        for key, value in part["incident_events"].items():
+            incident_events[key] = incident_events.get(key, 0) + int(value)
+        for stage, stat in part["stages"].items():
+            stages[stage]["calls"] += stat["calls"]
+            stages[stage]["seconds"] += stat["seconds"]
+        ttd.extend(part["ttd_s"])
+
+    span_s = (info["last_epoch"] - info["first_epoch"]) if info["records"] else 0.0
+    detected = counters.get("episodes", 0) - counters.get("missed", 0)
+    return {
+        "records": info["records"],
+        "cells": sum(part["cells"] for part in parts),
+        "recorded_span_s": round(span_s, 1),
+        "wall_s": round(wall_s, 3),
+        "speedup_vs_recorded": round(span_s / wall_s, 1) if wall_s else None,
+        "samples_per_s": round(info["records"] / wall_s, 1) if wall_s else None,
+        "cpu_s": round(sum(part["cpu_s"] for part in parts), 3),
+        "ground_truth": "fault field" if info["labelled"] else "static thresholds",
+        "anomalous_samples": counters.get("anomalies", 0),
+        "incidents": incident_events,
+        "incident_chains": counters.get("chains", 0),
+        "false_alarm_chains": counters.get("false_alarm_chains", 0),
+        "actions": actions,
+        "episodes": counters.get("episodes", 0),
+        "episodes_detected": detected,
+        "episodes_missed": counters.get("missed", 0),
+        "time_to_detect_s": _summary(ttd),
+        "stages": {
+            stage: {
+                "calls": int(stat["calls"]),
+                "seconds": round(stat["seconds"], 4),
+                "calls_per_s": round(stat["calls"] / stat["seconds"], 1) if stat["seconds"] else None,
+            }
+            for stage, stat in stages.items()
+        },
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    env = dict(item.partition("=")[::2] for item in args.env)
+    if args.detector:
+        env["AINOA_DETECTOR"] = args.detector
+    workers = max(1, args.workers)
+
+    directory = tempfile.mkdtemp(prefix="ainoa-backtest-")
+    try:
+        spool_started = time.perf_counter()
+        paths, info = spool(args.input, workers, directory, args.partition_by == "region")
+        spool_s = time.perf_counter() - spool_started
+        if not info["records"]:
+            raise SystemExit(f"{args.input}: no records")
+
+        wall_start = time.time()
+        started = time.perf_counter()
+        call_args = [(p, args.speed, info["first_epoch"], wall_start, info["labelled"]) for p in paths]
+        if workers == 1:
+            _init_worker(env)
+            parts = [replay_partition(*call_args[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(env,)) as pool:
+                parts = list(pool.map(replay_partition, *zip(*call_args)))
+        result = merge(parts, info, time.perf_counter() - started)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    result["spool_s"] = round(spool_s, 3)
+    result["config"] = {"input": args.input, "workers": workers, "speed": args.speed,
+                        "detector": env.get("AINOA_DETECTOR", "static"), "partition_by": args.partition_by,
+                        "env": args.env}
+    return result
+
+
+def print_table(result: Dict[str, Any]) -> None:
+    ttd = result["time_to_detect_s"]
+    print(f"{result['records']} samples / {result['cells']} cells, {result['recorded_span_s'] / 3600:.1f}h "
+          f"recorded, replayed in {result['wall_s']:.1f}s ({result['speedup_vs_recorded']}x)",
+          file=sys.stderr)
+    print(f"  incidents {result['incidents']}  chains {result['incident_chains']} "
+          f"(false alarms {result['false_alarm_chains']})  actions {result['actions']}", file=sys.stderr)
+    print(f"  episodes {result['episodes']} detected {result['episodes_detected']} "
+          f"missed {result['episodes_missed']}  time-to-detect p50 {ttd['p50']}s p95 {ttd['p95']}s",
+          file=sys.stderr)
+    for stage, stat in result["stages"].items():
+        if stat["calls"]:
+            print(f"  {stage:<9} {stat['calls']:>9} calls {stat['calls_per_s'] or 0:>12.1f}/s", file=sys.stderr)
+
+
+# -----------------------------------------------------------------------------
+# record: synthetic fleet telemetry with labelled fault episodes
+# -----------------------------------------------------------------------------
+
+def record(args: argparse.Namespace) -> int:
+    rng = random.Random(args.seed)
+    cells = [(f"region_{r}", f"cell_{r}_{c}") for r in range(args.regions) for c in range(args.cells_per_region)]
+    start = args.start if args.start is not None else math.floor(time.time() / 86400) * 86400 - 86400
+    steps = int(args.hours * 3600 / args.interval_s)
+    # per cell: (start step, ramp steps, hold steps) of each fault episode
+    fault_p = args.faults_per_cell_day * args.interval_s / 86400.0
+    active: Dict[int, Tuple[int, int, int]] = {}
+    is_csv = args.output.endswith(".csv")
+    lines = 0
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f) if is_csv else None
+        if writer:
+            writer.writerow(["region", "cell_id", "packet_loss_pct", "latency_ms", "throughput_mbps",
+                             "timestamp", "fault"])
+        for step in range(steps):
+            ts = from_epoch(start + step * args.interval_s).isoformat()
+            for index, (region, cell_id) in enumerate(cells):
+                loss = rng.uniform(0.3, 0.9)
+                latency = rng.uniform(45, 70)
+                tput = rng.uniform(100, 200)
+                episode = active.get(index)
+                if episode is None and rng.random() < fault_p:
+                    episode = active[index] = (step, rng.randint(1, 12), rng.randint(3, 30))
+                fault = episode is not None
+                if episode is not None:
+                    began, ramp, hold = episode
+                    level = min(1.0, (step - began + 1) / ramp)  # degrade gradually, then hold
+                    loss += level * rng.uniform(5.0, 9.0)
+                    latency += level * rng.uniform(100, 180)
+                    tput *= 1.0 - 0.3 * level
+                    if step - began + 1 >= ramp + hold:
+                        del active[index]
+                row = (region, cell_id, round(loss, 2), round(latency, 1), round(tput, 1), ts)
+                if writer:
+                    writer.writerow(row + (int(fault),))
+                else:
+                    f.write(json.dumps(dict(zip(("region", "cell_id", "packet_loss_pct", "latency_ms",
+                                                 "throughput_mbps", "timestamp"), row), fault=fault)) + "\n")
+                lines += 1
+    print(f"wrote {lines} samples ({len(cells)} cells x {steps} steps) to {args.output}", file=sys.stderr)
+
+    if args.topology:
+        neighbors = {
+            f"region_{r}:cell_{r}_{c}": [f"region_{r}:cell_{r}_{(c + k) % args.cells_per_region}" for k in (1, 2)]
+            for r in range(args.regions) for c in range(args.cells_per_region)
+        }
+        with open(args.topology, "w") as f:
+            json.dump({"default_capacity_mbps": 300, "neighbors": neighbors}, f, indent=1)
+        print(f"wrote topology for {len(neighbors)} cells to {args.topology}", file=sys.stderr)
+    return 0
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="AINOA offline replay / backtest")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("run", help="replay a recorded file through detect → decide → plan")
+    r.add_argument("input", help="NDJSON (TelemetryEvent per line) or .csv")
+    r.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes (cells are partitioned)")
+    r.add_argument("--speed", type=float, default=0.0, help="x recorded time (0 = as fast as possible)")
+    r.add_argument("--partition-by", choices=("cell", "region"), default="cell",
+                   help="region keeps offload neighbors in one worker")
+    r.add_argument("--detector", choices=("static", "ewma"), help="AINOA_DETECTOR for the replay")
+    r.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                   help="extra AINOA_* settings for the replay (repeatable)")
+    r.add_argument("--output", help="write JSON results here (default: stdout)")
+
+    g = sub.add_parser("record", help="write synthetic fleet telemetry with labelled faults")
+    g.add_argument("output", help="NDJSON, or .csv")
+    g.add_argument("--regions", type=int, default=3)
+    g.add_argument("--cells-per-region", type=int, default=20)
+    g.add_argument("--hours", type=float, default=24.0)
+    g.add_argument("--interval-s", type=float, default=60.0, help="seconds between samples per cell")
+    g.add_argument("--faults-per-cell-day", type=float, default=2.0)
+    g.add_argument("--start", type=float, default=None, help="first timestamp, epoch s (default: yesterday 00:00 UTC)")
+    g.add_argument("--topology", help="also write a topology file (each cell adjacent to the next two in its region)")
+    g.add_argument("--seed", type=int, default=None)
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.command == "record":
+        return record(args)
+
+    result = run(args)
+    print_table(result)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
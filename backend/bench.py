@@ -0,0 +1,369 @@
+# bench.py
+#
+# Load generator / benchmark for the AINOA backend, built on feed_demo.py's
+# payloads. Answers "how far does ingest scale" with numbers that can be
+# diffed between commits.
+#
+# WHAT IT DOES:
+# - Starts its own local uvicorn (or targets --url), with N regions x M cells.
+# - Async senders (httpx) push at a target event rate (0 = as fast as
+#   possible), a --spike-ratio share of them anomalous, against
+#   /telemetry/push (one event per request) and/or /telemetry/push/batch.
+# - Meanwhile --pollers clients poll /status like the dashboard does
+#   (If-None-Match), so read latency is measured under write load.
+# - Reports p50/p95/p99 ingest latency, sustained (accepted) events/sec,
+#   samples shed by admission control and /status latency as JSON
+#   (--output), plus a short table on stderr.
+#   --compare old.json prints the change against an earlier run.
+#
+# HOW TO USE:
+#   python bench.py                                   # spawn server, both modes
+#   python bench.py --mode batch --rate 20000 --batch-size 200
+#   python bench.py --workers 4 --env AINOA_SHARDS=4  # sharded server
+#   python bench.py --url http://localhost:8000 --output before.json
+#   python bench.py --output after.json --compare before.json
+#
+# Needs httpx (pip install httpx). The latency of one request is measured
+# from its scheduled send time, so a server that falls behind the target
+# rate shows up as latency instead of quietly lowering the rate.
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from feed_demo import normal_payload, spike_payload
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(samples_s: List[float]) -> Dict[str, Optional[float]]:
+    values = sorted(s * 1000.0 for s in samples_s)
+
+    def r(v: Optional[float]) -> Optional[float]:
+        return round(v, 3) if v is not None else None
+
+    return {
+        "count": len(values),
+        "mean": r(sum(values) / len(values)) if values else None,
+        "p50": r(percentile(values, 50)),
+        "p95": r(percentile(values, 95)),
+        "p99": r(percentile(values, 99)),
+        "max": r(values[-1]) if values else None,
+    }
+
+
+def build_cells(regions: int, cells_per_region: int) -> List[Tuple[str, str]]:
+    return [(f"region_{r}", f"cell_{r}_{c}") for r in range(regions) for c in range(cells_per_region)]
+
+
+def make_event(cells: List[Tuple[str, str]], spike_ratio: float) -> Dict[str, Any]:
+    region, cell_id = random.choice(cells)
+    if random.random() < spike_ratio:
+        return spike_payload(region, cell_id)
+    return normal_payload(region, cell_id)
+
+
+# -----------------------------------------------------------------------------
+# load phases
+# -----------------------------------------------------------------------------
+
+async def _poll_status(client: httpx.AsyncClient, stop: asyncio.Event, interval_s: float,
+                       latencies: List[float], counters: Dict[str, int]) -> None:
+    etag = None
+    while not stop.is_set():
+        headers = {"If-None-Match": etag} if etag else {}
+        started = time.perf_counter()
+        try:
+            resp = await client.get("/status", headers=headers)
+            latencies.append(time.perf_counter() - started)
+            if resp.status_code == 304:
+                counters["not_modified"] += 1
+            elif resp.status_code == 200:
+                etag = resp.headers.get("etag")
+            else:
+                counters["errors"] += 1
+        except httpx.HTTPError:
+            counters["errors"] += 1
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval_s)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_phase(base_url: str, mode: str, args: argparse.Namespace,
+                    cells: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """One timed ingest run ("single" or "batch") with concurrent /status pollers."""
+    per_request = args.batch_size if mode == "batch" else 1
+    path = "/telemetry/push/batch" if mode == "batch" else "/telemetry/push"
+    request_rate = args.rate / per_request if args.rate > 0 else 0.0
+    max_requests = int(request_rate * args.duration) if request_rate else None
+
+    limits = httpx.Limits(max_connections=args.concurrency + args.pollers,
+                          max_keepalive_connections=args.concurrency + args.pollers)
+    latencies: List[float] = []
+    poll_latencies: List[float] = []
+    poll_counters = {"not_modified": 0, "errors": 0}
+    counters = {"requests": 0, "events": 0, "shed": 0, "errors": 0, "anomalies": 0}
+    next_index = 0
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        stop_polling = asyncio.Event()
+        pollers = [asyncio.create_task(_poll_status(client, stop_polling, args.poll_interval,
+                                                    poll_latencies, poll_counters))
+                   for _ in range(args.pollers)]
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+
+        async def sender() -> None:
+            nonlocal next_index
+            while True:
+                index = next_index
+                next_index += 1
+                if max_requests is not None and index >= max_requests:
+                    return
+                # open loop: request i is due at started + i / rate
+                due = started + index / request_rate if request_rate else time.perf_counter()
+                if due >= deadline:
+                    return
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                if mode == "batch":
+                    body: Any = [make_event(cells, args.spike_ratio) for _ in range(per_request)]
+                else:
+                    body = make_event(cells, args.spike_ratio)
+                try:
+                    resp = await client.post(path, json=body)
+                    status = resp.status_code
+                except httpx.HTTPError:
+                    status = None
+                latencies.append(time.perf_counter() - due)
+                counters["requests"] += 1
+                if status == 429:   # admission control refused all of it
+                    counters["shed"] += per_request
+                    continue
+                if status != 200:
+                    counters["errors"] += 1
+                    continue
+                data = resp.json()
+                if mode == "batch":
+                    counters["events"] += data.get("accepted", 0)
+                    counters["shed"] += data.get("shed", 0)
+                    counters["anomalies"] += data.get("anomalies", 0)
+                    continue
+                counters["events"] += 1
+                if data.get("anomaly_detected"):
+                    counters["anomalies"] += 1
+
+        await asyncio.gather(*(sender() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+        stop_polling.set()
+        await asyncio.gather(*pollers)
+
+    return {
+        "mode": mode,
+        "path": path,
+        "events_per_request": per_request,
+        "target_events_per_s": args.rate or None,
+        "duration_s": round(elapsed, 3),
+        "requests": counters["requests"],
+        "events": counters["events"],
+        "shed": counters["shed"],
+        "errors": counters["errors"],
+        "anomalies": counters["anomalies"],
+        "events_per_s": round(counters["events"] / elapsed, 1) if elapsed else 0.0,
+        "requests_per_s": round(counters["requests"] / elapsed, 1) if elapsed else 0.0,
+        "ingest_latency_ms": latency_summary(latencies),
+        "status": {
+            "pollers": args.pollers,
+            "polls": len(poll_latencies),
+            "not_modified": poll_counters["not_modified"],
+            "errors": poll_counters["errors"],
+            "latency_ms": latency_summary(poll_latencies),
+        },
+    }
+
+
+# -----------------------------------------------------------------------------
+# local server
+# -----------------------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    port = args.port or _free_port()
+    env = dict(os.environ)
+    # the server runs with its default rate limits, so shed samples show up
+    # in the results; pass --env AINOA_RATE_LIMIT_COLLECTOR=0 to measure the
+    # pipeline without them
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--log-level", "warning", "--no-access-log"]
+    if args.workers > 1:
+        cmd += ["--workers", str(args.workers)]
+    log = open(args.server_log, "ab") if args.server_log else subprocess.DEVNULL
+    proc = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with {proc.returncode} (see --server-log)")
+        try:
+            if httpx.get(base_url + "/health", timeout=1.0).status_code == 200:
+                return proc, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not come up within 30s")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# -----------------------------------------------------------------------------
+# reporting
+# -----------------------------------------------------------------------------
+
+def print_table(results: Dict[str, Any]) -> None:
+    print(f"{'mode':<7} {'events/s':>10} {'shed':>7} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+          f" {'status p50':>11} {'status p99':>11}", file=sys.stderr)
+    for run in results["runs"]:
+        lat, st = run["ingest_latency_ms"], run["status"]["latency_ms"]
+        print(f"{run['mode']:<7} {run['events_per_s']:>10} {run['shed']:>7} {run['errors']:>7} {lat['p50'] or '-':>9}"
+              f" {lat['p95'] or '-':>9} {lat['p99'] or '-':>9} {st['p50'] or '-':>11} {st['p99'] or '-':>11}",
+              file=sys.stderr)
+
+
+def print_comparison(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Relative change per mode for the headline numbers (+ = higher)."""
+    old_runs = {run["mode"]: run for run in baseline.get("runs", [])}
+    metrics = [
+        ("events_per_s", lambda r: r["events_per_s"]),
+        ("ingest p50", lambda r: r["ingest_latency_ms"]["p50"]),
+        ("ingest p99", lambda r: r["ingest_latency_ms"]["p99"]),
+        ("status p99", lambda r: r["status"]["latency_ms"]["p99"]),
+    ]
+    print(f"vs {baseline.get('meta', {}).get('commit') or 'baseline'}:", file=sys.stderr)
+    for run in results["runs"]:
+        old = old_runs.get(run["mode"])
+        if old is None:
+            continue
+        parts = []
+        for name, get in metrics:
+            new_v, old_v = get(run), get(old)
+            if new_v is None or not old_v:
+                continue
+            parts.append(f"{name} {100.0 * (new_v - old_v) / old_v:+.1f}%")
+        print(f"  {run['mode']:<7} " + ", ".join(parts), file=sys.stderr)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="AINOA ingest / status benchmark")
+    p.add_argument("--url", help="target an already running server instead of spawning one")
+    p.add_argument("--port", type=int, default=0, help="port for the spawned server (default: any free port)")
+    p.add_argument("--workers", type=int, default=1, help="uvicorn --workers for the spawned server")
+    p.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                   help="extra environment for the spawned server (repeatable)")
+    p.add_argument("--server-log", help="append the spawned server's output to this file")
+    p.add_argument("--mode", choices=("single", "batch", "both"), default="both")
+    p.add_argument("--regions", type=int, default=3)
+    p.add_argument("--cells-per-region", type=int, default=20)
+    p.add_argument("--rate", type=float, default=0.0, help="target events/sec (0 = as fast as possible)")
+    p.add_argument("--duration", type=float, default=10.0, help="seconds per mode")
+    p.add_argument("--spike-ratio", type=float, default=0.01, help="share of anomalous samples")
+    p.add_argument("--concurrency", type=int, default=32, help="concurrent async senders")
+    p.add_argument("--batch-size", type=int, default=100, help="events per batch request")
+    p.add_argument("--pollers", type=int, default=4, help="concurrent /status pollers")
+    p.add_argument("--poll-interval", type=float, default=0.5, help="seconds between polls per poller")
+    p.add_argument("--timeout", type=float, default=10.0, help="per-request timeout (s)")
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--output", help="write JSON results here (default: stdout)")
+    p.add_argument("--compare", help="earlier JSON results to print deltas against")
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    cells = build_cells(args.regions, args.cells_per_region)
+    modes = ("single", "batch") if args.mode == "both" else (args.mode,)
+
+    proc = None
+    base_url = args.url
+    if base_url is None:
+        proc, base_url = spawn_server(args)
+    try:
+        runs = [asyncio.run(run_phase(base_url, mode, args, cells)) for mode in modes]
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare", "server_log")}
+    results = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "target": base_url if args.url else "spawned",
+            "config": config,
+        },
+        "runs": runs,
+    }
+
+    print_table(results)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0 if all(run["errors"] == 0 for run in runs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,406 @@
+# binary_ingest.py
+#
+# Compact binary telemetry ingress (TCP + UDP), a local stand-in for the
+# Kinesis / OpenTelemetry receiver on the roadmap.
+#
+# WHY:
+# - Every sample through /telemetry/push pays for HTTP framing, JSON parsing
+#   and pydantic validation before it reaches the store; for a collector
+#   streaming thousands of samples a second that overhead dominates.
+#
+# HOW:
+# - Fixed-layout records, decoded with struct.iter_unpack over the frame (a
+#   C loop, no per-field parsing): 24 bytes per sample.
+# - Cells are interned: a collector DEFINEs ref -> (region, cell_id) once per
+#   connection (per source address for UDP) and samples carry the u32 ref.
+# - TCP: checkpoint/ack. The collector says HELLO <collector id> and gets the
+#   last sequence number the server applied for it. SAMPLES frames are
+#   numbered; each is applied in order and ACKed (cumulative). After a
+#   reconnect the collector resends unacked frames; frames at or below the
+#   checkpoint are acked again without being applied twice. Backpressure is
+#   TCP's own: a frame is not read until the previous one was applied.
+# - UDP: the same frames, one or more per datagram, fire-and-forget.
+#
+# An ACK means the samples are in the in-memory store, through detection,
+# and queued for the WAL's next group commit. Checkpoints live in memory:
+# delivery is exactly-once per server lifetime, at-least-once across restarts.
+#
+# Frame: <u32 big-endian length> <u8 type> body (length covers type + body)
+#   HELLO       C→S  utf-8 collector id                       (TCP)
+#   CHECKPOINT  S→C  <u64 seq>                                 (TCP)
+#   DEFINE      C→S  repeated <u32 ref, u16 len, u16 len> + region + cell_id
+#   SAMPLES     C→S  <u64 seq> + repeated <u32 ref, f32 loss_pct, f32 latency_ms,
+#                    f32 throughput_mbps, u64 epoch_ms>       (seq ignored on UDP)
+#                    NaN/Infinity KPIs are a protocol error (the whole frame)
+#   ACK         S→C  <u64 seq, u32 accepted, u32 anomalies>    (TCP)
+#   ERROR       S→C  utf-8 message, then the server closes     (TCP)
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import math
+import socket
+import struct
+
+
+HELLO = 1
+CHECKPOINT = 2
+DEFINE = 3
+SAMPLES = 4
+ACK = 5
+ERROR = 6
+
+_LENGTH = struct.Struct(">I")
+_SEQ = struct.Struct("<Q")
+_DEFINE = struct.Struct("<IHH")
+_SAMPLE = struct.Struct("<IfffQ")
+_ACK = struct.Struct("<QII")
+
+# (region, cell_id, packet_loss_pct, latency_ms, throughput_mbps, epoch_s)
+Record = Tuple[str, str, float, float, float, float]
+
+# handler(collector, records, reliable) -> (accepted, anomalies)
+Handler = Callable[[str, List[Record], bool], Awaitable[Tuple[int, int]]]
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_frame(kind: int, body: bytes = b"") -> bytes:
+    return _LENGTH.pack(len(body) + 1) + bytes((kind,)) + body
+
+
+def encode_define(cells: Iterable[Tuple[int, str, str]]) -> bytes:
+    """cells: (ref, region, cell_id)"""
+    parts = []
+    for ref, region, cell_id in cells:
+        r = region.encode("utf-8")
+        c = cell_id.encode("utf-8")
+        parts.append(_DEFINE.pack(ref, len(r), len(c)) + r + c)
+    return encode_frame(DEFINE, b"".join(parts))
+
+
+def encode_samples(seq: int, samples: Iterable[Tuple[int, float, float, float, float]]) -> bytes:
+    """samples: (ref, packet_loss_pct, latency_ms, throughput_mbps, epoch_s)"""
+    pack = _SAMPLE.pack
+    body = b"".join(pack(ref, loss, latency, tput, int(epoch_s * 1000))
+                    for ref, loss, latency, tput, epoch_s in samples)
+    return encode_frame(SAMPLES, _SEQ.pack(seq) + body)
+
+
+def _decode_define(body: memoryview, refs: Dict[int, Tuple[str, str]]) -> None:
+    offset = 0
+    while offset < len(body):
+        if offset + _DEFINE.size > len(body):
+            raise ProtocolError("truncated DEFINE entry")
+        ref, rlen, clen = _DEFINE.unpack_from(body, offset)
+        offset += _DEFINE.size
+        if offset + rlen + clen > len(body):
+            raise ProtocolError("truncated DEFINE names")
+        region = bytes(body[offset:offset + rlen]).decode("utf-8")
+        cell_id = bytes(body[offset + rlen:offset + rlen + clen]).decode("utf-8")
+        offset += rlen + clen
+        refs[ref] = (region, cell_id)
+
+
+def _decode_samples(body: memoryview, refs: Dict[int, Tuple[str, str]]) -> Tuple[List[Record], int]:
+    """(records, samples with an unknown ref)"""
+    if len(body) % _SAMPLE.size:
+        raise ProtocolError(f"SAMPLES body is not a multiple of {_SAMPLE.size} bytes")
+    records: List[Record] = []
+    unknown = 0
+    get = refs.get
+    isfinite = math.isfinite
+    for ref, loss, latency, tput, epoch_ms in _SAMPLE.iter_unpack(body):
+        # f32 sums can't overflow a double: non-finite only if an input is
+        if not isfinite(loss + latency + tput):
+            raise ProtocolError(f"non-finite KPI for ref {ref}")
+        cell = get(ref)
+        if cell is None:
+            unknown += 1
+            continue
+        records.append((cell[0], cell[1], loss, latency, tput, epoch_ms / 1000.0))
+    return records, unknown
+
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self, server: "BinaryIngestServer"):
+        self._server = server
+
+    def datagram_received(self, data: bytes, addr: Any) -> None:
+        self._server._on_datagram(data, addr)
+
+
+class BinaryIngestServer:
+    """
+    TCP and/or UDP listener on the running event loop. handler is a coroutine
+    (main.py hands the records to its ingest path on the threadpool).
+    """
+
+    def __init__(self, handler: Handler, host: str = "0.0.0.0", tcp_port: Optional[int] = None,
+                 udp_port: Optional[int] = None, max_frame_bytes: int = 1 << 20,
+                 max_udp_sources: int = 4096):
+        self._handler = handler
+        self.host = host
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+        self.max_frame_bytes = max_frame_bytes
+        self.max_udp_sources = max_udp_sources
+        self.checkpoints: Dict[str, int] = {}  # collector id -> last applied seq
+        self._udp_refs: "OrderedDict[Any, Dict[int, Tuple[str, str]]]" = OrderedDict()
+        self._udp_tasks: Set[asyncio.Task] = set()
+        self._tcp_server: Optional[asyncio.AbstractServer] = None
+        self._udp_transport: Optional[asyncio.DatagramTransport] = None
+
+        # counters
+        self.connections = 0
+        self.frames = 0
+        self.samples = 0
+        self.duplicates = 0       # TCP frames at/below the checkpoint (resends)
+        self.unknown_refs = 0     # UDP samples whose cell was never DEFINEd
+        self.protocol_errors = 0
+        self.handler_errors = 0
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.tcp_port is not None:
+            self._tcp_server = await asyncio.start_server(self._serve_tcp, self.host, self.tcp_port)
+        if self.udp_port is not None:
+            self._udp_transport, _ = await loop.create_datagram_endpoint(
+                lambda: _UdpProtocol(self), local_addr=(self.host, self.udp_port))
+
+    async def stop(self) -> None:
+        if self._tcp_server is not None:
+            self._tcp_server.close()
+            await self._tcp_server.wait_closed()
+            self._tcp_server = None
+        if self._udp_transport is not None:
+            self._udp_transport.close()
+            self._udp_transport = None
+
+    # -- TCP -----------------------------------------------------------------------
+
+    async def _serve_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        peer = writer.get_extra_info("peername")
+        collector = f"tcp:{peer[0]}:{peer[1]}" if peer else "tcp:unknown"
+        refs: Dict[int, Tuple[str, str]] = {}
+        try:
+            while True:
+                (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                if not 1 <= length <= self.max_frame_bytes:
+                    raise ProtocolError(f"frame length {length} out of range")
+                frame = memoryview(await reader.readexactly(length))
+                kind, body = frame[0], frame[1:]
+                self.frames += 1
+
+                if kind == HELLO:
+                    collector = bytes(body).decode("utf-8")
+                    writer.write(encode_frame(CHECKPOINT, _SEQ.pack(self.checkpoints.get(collector, 0))))
+                elif kind == DEFINE:
+                    _decode_define(body, refs)
+                elif kind == SAMPLES:
+                    if len(body) < _SEQ.size:
+                        raise ProtocolError("SAMPLES frame without a sequence number")
+                    (seq,) = _SEQ.unpack_from(body)
+                    if seq <= self.checkpoints.get(collector, 0):
+                        self.duplicates += 1
+                        writer.write(encode_frame(ACK, _ACK.pack(seq, 0, 0)))
+                    else:
+                        records, unknown = _decode_samples(body[_SEQ.size:], refs)
+                        if unknown:
+                            raise ProtocolError(f"{unknown} samples reference undefined cells")
+                        accepted, anomalies = await self._handler(collector, records, True)
+                        self.samples += accepted
+                        self.checkpoints[collector] = seq
+                        writer.write(encode_frame(ACK, _ACK.pack(seq, accepted, anomalies)))
+                else:
+                    raise ProtocolError(f"unexpected frame type {kind}")
+                await writer.drain()
+        except ProtocolError as e:
+            self.protocol_errors += 1
+            writer.write(encode_frame(ERROR, str(e).encode("utf-8")))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            # the handler failed: answer ERROR so the client gives up on the
+            # frame instead of reconnecting and resending it forever
+            self.handler_errors += 1
+            print("[AINOA] binary ingest failed for", collector, ":", repr(e))
+            writer.write(encode_frame(ERROR, f"ingest failed: {type(e).__name__}".encode("utf-8")))
+        finally:
+            writer.close()
+
+    # -- UDP -----------------------------------------------------------------------
+
+    def _on_datagram(self, data: bytes, addr: Any) -> None:
+        refs = self._udp_refs.get(addr)
+        if refs is None:
+            refs = self._udp_refs[addr] = {}
+            if len(self._udp_refs) > self.max_udp_sources:
+                self._udp_refs.popitem(last=False)
+        else:
+            self._udp_refs.move_to_end(addr)
+
+        view = memoryview(data)
+        offset = 0
+        records: List[Record] = []
+        try:
+            while offset < len(view):
+                (length,) = _LENGTH.unpack_from(view, offset)
+                frame = view[offset + _LENGTH.size:offset + _LENGTH.size + length]
+                if length < 1 or len(frame) < length:
+                    raise ProtocolError("truncated datagram")
+                offset += _LENGTH.size + length
+                self.frames += 1
+                kind, body = frame[0], frame[1:]
+                if kind == DEFINE:
+                    _decode_define(body, refs)
+                elif kind == SAMPLES and len(body) >= _SEQ.size:
+                    decoded, unknown = _decode_samples(body[_SEQ.size:], refs)
+                    records.extend(decoded)
+                    self.unknown_refs += unknown
+                else:
+                    raise ProtocolError(f"unexpected frame type {kind}")
+        except (ProtocolError, struct.error):
+            self.protocol_errors += 1  # keep what decoded cleanly before the bad frame
+
+        if records:
+            task = asyncio.ensure_future(self._apply_datagram(f"udp:{addr[0]}", records))
+            self._udp_tasks.add(task)
+            task.add_done_callback(self._udp_tasks.discard)
+
+    async def _apply_datagram(self, collector: str, records: List[Record]) -> None:
+        try:
+            accepted, _ = await self._handler(collector, records, False)
+        except Exception as e:
+            self.handler_errors += 1
+            print("[AINOA] binary ingest failed for", collector, ":", repr(e))
+            return
+        self.samples += accepted
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tcp_port": self.tcp_port,
+            "udp_port": self.udp_port,
+            "connections": self.connections,
+            "frames": self.frames,
+            "samples": self.samples,
+            "duplicates": self.duplicates,
+            "unknown_refs": self.unknown_refs,
+            "protocol_errors": self.protocol_errors,
+            "handler_errors": self.handler_errors,
+            "collectors": len(self.checkpoints),
+        }
+
+
+class BinaryIngestClient:
+    """
+    Blocking TCP collector: interns cells, numbers SAMPLES frames and keeps up
+    to `window` of them unacked. On a dropped connection it reconnects once,
+    re-DEFINEs its cells and resends whatever the server's checkpoint says it
+    has not applied.
+    """
+
+    def __init__(self, host: str, port: int, collector_id: str, window: int = 32,
+                 timeout_s: float = 10.0):
+        self.host = host
+        self.port = port
+        self.collector_id = collector_id
+        self.window = window
+        self.timeout_s = timeout_s
+        self._sock: Optional[socket.socket] = None
+        self._refs: Dict[Tuple[str, str], int] = {}
+        self._unacked: "OrderedDict[int, bytes]" = OrderedDict()
+        self._seq = 0
+        self.accepted = 0
+        self.anomalies = 0
+
+    def _read_frame(self) -> Tuple[int, bytes]:
+        sock = self._sock
+        header = self._recv_exact(sock, _LENGTH.size)
+        (length,) = _LENGTH.unpack(header)
+        frame = self._recv_exact(sock, length)
+        return frame[0], frame[1:]
+
+    @staticmethod
+    def _recv_exact(sock: socket.socket, n: int) -> bytes:
+        chunks: List[bytes] = []
+        while n:
+            chunk = sock.recv(n)
+            if not chunk:
+                raise ConnectionError("server closed the connection")
+            chunks.append(chunk)
+            n -= len(chunk)
+        return b"".join(chunks)
+
+    def connect(self) -> int:
+        """(Re)connect and resync. Returns the server's checkpoint."""
+        self.close()
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout_s)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock.sendall(encode_frame(HELLO, self.collector_id.encode("utf-8")))
+        kind, body = self._read_frame()
+        if kind != CHECKPOINT:
+            raise ProtocolError(f"expected CHECKPOINT, got frame type {kind}")
+        (checkpoint,) = _SEQ.unpack(body)
+        self._seq = max(self._seq, checkpoint)
+        for seq in [s for s in self._unacked if s <= checkpoint]:
+            del self._unacked[seq]
+        resend = [encode_define((ref, region, cell) for (region, cell), ref in self._refs.items())]
+        resend.extend(self._unacked.values())
+        self._sock.sendall(b"".join(resend))
+        return checkpoint
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _read_ack(self) -> None:
+        kind, body = self._read_frame()
+        if kind == ERROR:
+            raise ProtocolError(body.decode("utf-8", "replace"))
+        if kind != ACK:
+            raise ProtocolError(f"expected ACK, got frame type {kind}")
+        seq, accepted, anomalies = _ACK.unpack(body)
+        self.accepted += accepted
+        self.anomalies += anomalies
+        for pending in [s for s in self._unacked if s <= seq]:
+            del self._unacked[pending]
+
+    def send(self, records: Iterable[Record]) -> int:
+        """Queue one SAMPLES frame; blocks only while `window` frames are unacked."""
+        if self._sock is None:
+            self.connect()
+        new_cells = []
+        samples = []
+        for region, cell_id, loss, latency, tput, epoch_s in records:
+            ref = self._refs.get((region, cell_id))
+            if ref is None:
+                ref = self._refs[(region, cell_id)] = len(self._refs) + 1
+                new_cells.append((ref, region, cell_id))
+            samples.append((ref, loss, latency, tput, epoch_s))
+        self._seq += 1
+        frame = encode_samples(self._seq, samples)
+        self._unacked[self._seq] = frame
+        data = (encode_define(new_cells) if new_cells else b"") + frame
+        try:
+            self._sock.sendall(data)
+            while len(self._unacked) >= self.window:
+                self._read_ack()
+        except OSError:
+            self.connect()  # resends DEFINEs + everything unacked
+        return self._seq
+
+    def flush(self) -> None:
+        """Wait until every sent frame is acked."""
+        try:
+            while self._unacked:
+                self._read_ack()
+        except OSError:
+            self.connect()
+            while self._unacked:
+                self._read_ack()
@@ -0,0 +1,301 @@
+# compressed_series.py
+#
+# Compressed per-cell KPI history (Gorilla-style: delta-of-delta timestamps,
+# XOR-encoded floats).
+#
+# WHY:
+# - We want days of raw history per cell for diagnosis context. As dicts
+#   (event.dict()) a sample costs hundreds of bytes; even as four float64
+#   columns it is 32 bytes, so days x thousands of cells does not fit.
+#
+# HOW:
+# - New samples go into a small uncompressed head block (four array('d')
+#   columns). When it holds block_size samples, all but the newest few are
+#   sealed: encoded into one immutable bitstream, column after column:
+#     timestamp  integer microseconds; first raw (64 bits), then the delta of
+#                the delta between consecutive samples: '0' if the feed kept
+#                its cadence, else a 2-5 bit prefix + 14/20/32/64 bit value
+#     KPIs       per column, first raw, then value XOR previous value: '0' if
+#                unchanged; '10' + the meaningful bits if they fit inside the
+#                previous window of leading/trailing zeros; else '11' + 5 bit
+#                leading-zero count + 6 bit length + the meaningful bits
+#   Encoding is lossless (floats bit-exact, timestamps to the microsecond,
+#   which is all a datetime holds).
+# - Retention stays a sample count. The oldest samples are dropped by
+#   advancing a skip offset into the oldest sealed block, and the block is
+#   freed once all of it is skipped, so nothing is ever re-encoded.
+# - Reads decode lazily. Blocks are immutable, so a reader takes a snapshot
+#   of the block list + head under the store lock and decodes outside it;
+#   forward iteration skips sealed blocks wholly outside [start_s, end_s)
+#   without decoding them. The head always keeps the newest head_keep
+#   samples, so newest-first iteration for incident context (last 5) never
+#   decodes a block.
+
+from array import array
+from collections import deque
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+
+Sample = Tuple[float, float, float, float]   # (epoch_s, packet_loss_pct, latency_ms, throughput_mbps)
+
+# delta-of-delta buckets (microseconds): (prefix, prefix bits, value bits)
+_DOD_BUCKETS = ((0b10, 2, 14), (0b110, 3, 20), (0b1110, 4, 32))
+_DOD_ESCAPE = (0b1111, 4, 64)
+
+
+class BitWriter:
+
+    __slots__ = ("_out", "_acc", "_bits")
+
+    def __init__(self):
+        self._out = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value: int, nbits: int) -> None:
+        self._acc = (self._acc << nbits) | (value & ((1 << nbits) - 1))
+        self._bits += nbits
+        if self._bits >= 64:
+            spill = self._bits & 7
+            self._out += (self._acc >> spill).to_bytes(self._bits >> 3, "big")
+            self._acc &= (1 << spill) - 1
+            self._bits = spill
+
+    def getvalue(self) -> bytes:
+        pad = -self._bits & 7
+        tail = (self._acc << pad).to_bytes((self._bits + pad) >> 3, "big")
+        return bytes(self._out + tail)
+
+
+class BitReader:
+
+    __slots__ = ("_data", "_pos")
+
+    def __init__(self, data: bytes):
+        self._data = data + bytes(9)   # a read never runs off the end
+        self._pos = 0
+
+    def read(self, nbits: int) -> int:
+        start = self._pos >> 3
+        window = int.from_bytes(self._data[start:start + 9], "big")
+        value = (window >> (72 - (self._pos & 7) - nbits)) & ((1 << nbits) - 1)
+        self._pos += nbits
+        return value
+
+    def bit(self) -> int:
+        value = (self._data[self._pos >> 3] >> (7 - (self._pos & 7))) & 1
+        self._pos += 1
+        return value
+
+
+def _signed(value: int, nbits: int) -> int:
+    return value - (1 << nbits) if value >> (nbits - 1) else value
+
+
+def _float_bits(column: Sequence[float]) -> Sequence[int]:
+    """IEEE-754 bit patterns of a float column, without a per-value pack()."""
+    return memoryview(array("d", column)).cast("B").cast("Q")
+
+
+def _encode_xor(w: BitWriter, values: Sequence[int]) -> None:
+    """values[0] raw, then each XOR its predecessor (see header)."""
+    prev = values[0]
+    w.write(prev, 64)
+    window_lead, window_trail = -1, 0   # no window yet
+    for i in range(1, len(values)):
+        bits = values[i]
+        x = bits ^ prev
+        prev = bits
+        if not x:
+            w.write(0, 1)
+            continue
+        lead = 64 - x.bit_length()
+        if lead > 31:
+            lead = 31
+        trail = (x & -x).bit_length() - 1
+        if window_lead >= 0 and lead >= window_lead and trail >= window_trail:
+            w.write((0b10 << (64 - window_lead - window_trail)) | (x >> window_trail),
+                    66 - window_lead - window_trail)
+            continue
+        meaningful = 64 - lead - trail
+        # '11', 5 bit leading zeros, 6 bit length (64 stored as 0), then the bits
+        w.write((((0b11 << 5) | lead) << 6) | (meaningful & 63), 13)
+        w.write(x >> trail, meaningful)
+        window_lead, window_trail = lead, trail
+
+
+def _decode_xor(r: BitReader, count: int) -> array:
+    out = array("Q", [r.read(64)])
+    prev, lead, trail = out[0], 0, 0
+    for _ in range(count - 1):
+        if r.bit():
+            if r.bit():
+                lead = r.read(5)
+                meaningful = r.read(6) or 64
+                trail = 64 - lead - meaningful
+            prev ^= r.read(64 - lead - trail) << trail
+        out.append(prev)
+    return out
+
+
+def encode_block(ts_us: Sequence[int], columns: Sequence[Sequence[float]]) -> bytes:
+    """
+    One sealed block: timestamps (integer µs), then each KPI column. Columns
+    are stored one after another (not interleaved), so decoding can run a
+    whole column per call.
+    """
+    w = BitWriter()
+    w.write(ts_us[0], 64)
+    prev_ts, prev_delta = ts_us[0], 0
+    for i in range(1, len(ts_us)):
+        delta = ts_us[i] - prev_ts
+        dod = delta - prev_delta
+        prev_ts, prev_delta = ts_us[i], delta
+        if not dod:
+            w.write(0, 1)
+            continue
+        for prefix, prefix_bits, value_bits in _DOD_BUCKETS:
+            if -(1 << (value_bits - 1)) <= dod < (1 << (value_bits - 1)):
+                break
+        else:
+            prefix, prefix_bits, value_bits = _DOD_ESCAPE
+        w.write((prefix << value_bits) | (dod & ((1 << value_bits) - 1)), prefix_bits + value_bits)
+    for column in columns:
+        _encode_xor(w, _float_bits(column))
+    return w.getvalue()
+
+
+def decode_block(data: bytes, count: int) -> List[Sample]:
+    """Every sample of one sealed block, oldest → newest."""
+    r = BitReader(data)
+    ts = _signed(r.read(64), 64)
+    stamps = [ts / 1e6]
+    delta = 0
+    for _ in range(count - 1):
+        if r.bit():
+            value_bits = 64
+            for _, _, bucket_bits in _DOD_BUCKETS:
+                if not r.bit():
+                    value_bits = bucket_bits
+                    break
+            delta += _signed(r.read(value_bits), value_bits)
+        ts += delta
+        stamps.append(ts / 1e6)
+    columns = [array("d", _decode_xor(r, count).tobytes()) for _ in range(3)]
+    return list(zip(stamps, *columns))
+
+
+class Block(NamedTuple):
+    count: int
+    min_ts: float   # time range, for skipping blocks a query doesn't touch
+    max_ts: float
+    data: bytes
+
+
+class SeriesSnapshot(NamedTuple):
+    """Immutable view of one series; safe to decode without the store lock."""
+    blocks: Tuple[Block, ...]
+    skip: int             # samples of blocks[0] already evicted
+    head: List[Sample]
+
+    def __iter__(self) -> Iterator[Sample]:   # type: ignore[override]
+        return self.iter_range()
+
+    def iter_range(self, start_s: Optional[float] = None, end_s: Optional[float] = None) -> Iterator[Sample]:
+        """Samples oldest → newest, optionally only those with start_s <= ts < end_s."""
+        lo = float("-inf") if start_s is None else start_s
+        hi = float("inf") if end_s is None else end_s
+        for i, block in enumerate(self.blocks):
+            if block.max_ts < lo or block.min_ts >= hi:
+                continue
+            samples = decode_block(block.data, block.count)
+            for sample in samples[self.skip:] if i == 0 else samples:
+                if lo <= sample[0] < hi:
+                    yield sample
+        for sample in self.head:
+            if lo <= sample[0] < hi:
+                yield sample
+
+    def iter_newest(self) -> Iterator[Sample]:
+        """Samples newest → oldest; a sealed block is decoded only if reached."""
+        yield from reversed(self.head)
+        for i in range(len(self.blocks) - 1, -1, -1):
+            block = self.blocks[i]
+            samples = decode_block(block.data, block.count)
+            yield from reversed(samples[self.skip:] if i == 0 else samples)
+
+
+class CompressedSeries:
+    """
+    KPI history of one cell: sealed compressed blocks + an uncompressed head.
+    Not thread-safe on its own; TelemetryStore serializes access.
+    """
+
+    __slots__ = ("capacity", "block_size", "head_keep", "blocks", "skip", "size", "sealed_bytes",
+                 "ts", "loss", "latency", "throughput")
+
+    def __init__(self, capacity: int, block_size: int = 120, head_keep: int = 8):
+        self.capacity = capacity
+        self.block_size = max(2, block_size)
+        self.head_keep = min(head_keep, self.block_size // 2)  # stays uncompressed after a seal
+        self.blocks: "deque[Block]" = deque()
+        self.skip = 0
+        self.size = 0           # retained samples (sealed minus skipped, plus head)
+        self.sealed_bytes = 0
+        self.ts = array("d")
+        self.loss = array("d")
+        self.latency = array("d")
+        self.throughput = array("d")
+
+    def append(self, loss: float, latency: float, throughput: float, ts: float) -> int:
+        """Add one sample; returns how many old samples retention evicted."""
+        self.ts.append(ts)
+        self.loss.append(loss)
+        self.latency.append(latency)
+        self.throughput.append(throughput)
+        self.size += 1
+        if len(self.ts) >= self.block_size + self.head_keep:
+            self._seal()
+        return self._trim()
+
+    def resize(self, capacity: int) -> int:
+        """Change retention; returns how many samples were evicted."""
+        self.capacity = capacity
+        return self._trim()
+
+    def _seal(self) -> None:
+        n = self.block_size
+        ts = self.ts[:n]
+        data = encode_block([round(t * 1e6) for t in ts], (self.loss[:n], self.latency[:n], self.throughput[:n]))
+        self.blocks.append(Block(n, min(ts), max(ts), data))
+        self.sealed_bytes += len(data)
+        for column in (self.ts, self.loss, self.latency, self.throughput):
+            del column[:n]
+
+    def _trim(self) -> int:
+        excess = self.size - self.capacity
+        if excess <= 0:
+            return 0
+        self.size -= excess
+        evicted = excess
+        while excess and self.blocks:
+            left = self.blocks[0].count - self.skip
+            if left > excess:
+                self.skip += excess
+                return evicted
+            self.sealed_bytes -= len(self.blocks.popleft().data)
+            self.skip = 0
+            excess -= left
+        if excess:
+            # retention shorter than what is in the head
+            for column in (self.ts, self.loss, self.latency, self.throughput):
+                del column[:excess]
+        return evicted
+
+    def snapshot(self) -> SeriesSnapshot:
+        head = list(zip(self.ts, self.loss, self.latency, self.throughput))
+        return SeriesSnapshot(tuple(self.blocks), self.skip, head)
+
+    def nbytes(self) -> int:
+        """Encoded payload + head columns (object overhead not counted)."""
+        return self.sealed_bytes + 32 * len(self.ts)
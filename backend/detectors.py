@@ -0,0 +1,211 @@
+# detectors.py
+#
+# Pluggable anomaly detectors for the Observability Layer.
+#
+# - StaticThresholdDetector: the original hackathon rules
+#   (packet_loss_pct > 5 OR latency_ms > 150), same for every cell.
+# - EwmaDetector: per-cell streaming baseline. Keeps an exponentially
+#   weighted mean/variance of each KPI per cell (constant memory, O(1) per
+#   sample) and flags samples that deviate from that cell's own baseline by
+#   more than z standard deviations (and a minimum absolute delta, so very
+#   stable cells don't alert on noise). Cells that are always slow stop
+#   alerting; a normally fast cell creeping upwards gets caught.
+#
+# Both return None (healthy) or a Detection: (triggered rules, severity).
+# Both accept batches via observe_batch().
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import math
+import threading
+
+
+# ("rule_a,rule_b", "warning" | "critical")
+Detection = Tuple[str, str]
+
+# (region, cell_id, packet_loss_pct, latency_ms, throughput_mbps)
+Sample = Tuple[str, str, float, float, float]
+
+
+class StaticThresholdDetector:
+    """
+    Rule: anomaly if packet_loss_pct > 5 OR latency_ms > 150.
+    Severity: "critical" if both rules fired, else "warning".
+    """
+
+    name = "static"
+
+    def __init__(self, loss_threshold_pct: float = 5.0, latency_threshold_ms: float = 150.0):
+        self.loss_threshold_pct = loss_threshold_pct
+        self.latency_threshold_ms = latency_threshold_ms
+
+    def observe(self, region: str, cell_id: str, packet_loss_pct: float,
+                latency_ms: float, throughput_mbps: float) -> Optional[Detection]:
+        triggered_rules = []
+        if packet_loss_pct > self.loss_threshold_pct:
+            triggered_rules.append("high_packet_loss_pct")
+        if latency_ms > self.latency_threshold_ms:
+            triggered_rules.append("high_latency_ms")
+
+        if not triggered_rules:
+            return None
+
+        severity = "critical" if len(triggered_rules) > 1 else "warning"
+        return ",".join(triggered_rules), severity
+
+    def observe_batch(self, samples: Sequence[Sample]) -> List[Optional[Detection]]:
+        observe = self.observe
+        return [observe(*s) for s in samples]
+
+    def describe(self) -> Dict[str, object]:
+        return {
+            "mode": self.name,
+            "loss_threshold_pct": self.loss_threshold_pct,
+            "latency_threshold_ms": self.latency_threshold_ms,
+        }
+
+
+# per-cell EWMA state layout (one flat list per cell)
+_N, _LOSS_MEAN, _LOSS_VAR, _LAT_MEAN, _LAT_VAR, _TP_MEAN, _TP_VAR = range(7)
+
+
+class EwmaDetector:
+    """
+    Per-cell EWMA mean/variance baseline for loss, latency and throughput.
+
+    - High loss / high latency / low throughput vs. the cell's baseline
+      fire "loss_above_baseline" / "latency_above_baseline" /
+      "throughput_below_baseline".
+    - Severity is "critical" if two or more rules fired or any deviation
+      exceeds 2*z, else "warning".
+    - Until a cell has `warmup` samples its baseline isn't trusted and the
+      static thresholds are used instead.
+    - Flagged samples still update the baseline, but at alpha * anomaly_weight,
+      so a permanent level shift slowly becomes the new normal while a
+      short incident doesn't poison the baseline.
+    """
+
+    name = "ewma"
+
+    def __init__(self, alpha: float = 0.05, z_threshold: float = 4.0, warmup: int = 20,
+                 min_loss_delta_pct: float = 1.0, min_latency_delta_ms: float = 20.0,
+                 min_throughput_delta_mbps: float = 20.0, anomaly_weight: float = 0.1,
+                 fallback: Optional[StaticThresholdDetector] = None):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.min_loss_delta_pct = min_loss_delta_pct
+        self.min_latency_delta_ms = min_latency_delta_ms
+        self.min_throughput_delta_mbps = min_throughput_delta_mbps
+        self.anomaly_weight = anomaly_weight
+        self.fallback = fallback or StaticThresholdDetector()
+
+        self._state: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _update(state: List[float], mean_i: int, value: float, alpha: float) -> None:
+        # incremental EWMA mean/variance (West 1979)
+        diff = value - state[mean_i]
+        incr = alpha * diff
+        state[mean_i] += incr
+        state[mean_i + 1] = (1.0 - alpha) * (state[mean_i + 1] + diff * incr)
+
+    def _deviation(self, state: List[float], mean_i: int, delta: float, min_delta: float) -> float:
+        """delta in standard deviations, or 0.0 if it doesn't count as a deviation."""
+        if delta <= min_delta:
+            return 0.0
+        std = math.sqrt(state[mean_i + 1])
+        if std == 0.0:
+            return math.inf
+        z = delta / std
+        return z if z > self.z_threshold else 0.0
+
+    def observe(self, region: str, cell_id: str, packet_loss_pct: float,
+                latency_ms: float, throughput_mbps: float) -> Optional[Detection]:
+        key = (region, cell_id)
+        with self._lock:
+            state = self._state.get(key)
+            if state is None:
+                state = [1.0, packet_loss_pct, 0.0, latency_ms, 0.0, throughput_mbps, 0.0]
+                self._state[key] = state
+                return self.fallback.observe(region, cell_id, packet_loss_pct, latency_ms, throughput_mbps)
+
+            detection: Optional[Detection]
+            if state[_N] < self.warmup:
+                detection = self.fallback.observe(region, cell_id, packet_loss_pct, latency_ms, throughput_mbps)
+            else:
+                rules = []
+                worst = 0.0
+                z = self._deviation(state, _LOSS_MEAN, packet_loss_pct - state[_LOSS_MEAN], self.min_loss_delta_pct)
+                if z:
+                    rules.append("loss_above_baseline")
+                    worst = max(worst, z)
+                z = self._deviation(state, _LAT_MEAN, latency_ms - state[_LAT_MEAN], self.min_latency_delta_ms)
+                if z:
+                    rules.append("latency_above_baseline")
+                    worst = max(worst, z)
+                z = self._deviation(state, _TP_MEAN, state[_TP_MEAN] - throughput_mbps, self.min_throughput_delta_mbps)
+                if z:
+                    rules.append("throughput_below_baseline")
+                    worst = max(worst, z)
+
+                if rules:
+                    critical = len(rules) > 1 or worst > 2 * self.z_threshold
+                    detection = (",".join(rules), "critical" if critical else "warning")
+                else:
+                    detection = None
+
+            # 1/(n+1) early on = plain running mean/variance, so the baseline
+            # converges within the warmup instead of after ~1/alpha samples
+            alpha = max(self.alpha, 1.0 / (state[_N] + 1))
+            if detection:
+                alpha *= self.anomaly_weight
+            self._update(state, _LOSS_MEAN, packet_loss_pct, alpha)
+            self._update(state, _LAT_MEAN, latency_ms, alpha)
+            self._update(state, _TP_MEAN, throughput_mbps, alpha)
+            state[_N] += 1
+            return detection
+
+    def observe_batch(self, samples: Sequence[Sample]) -> List[Optional[Detection]]:
+        # in order: each sample sees the baseline left by the previous one
+        observe = self.observe
+        return [observe(*s) for s in samples]
+
+    def baseline(self, region: str, cell_id: str) -> Optional[Dict[str, float]]:
+        state = self._state.get((region, cell_id))
+        if state is None:
+            return None
+        return {
+            "samples": int(state[_N]),
+            "packet_loss_pct_mean": state[_LOSS_MEAN],
+            "packet_loss_pct_std": math.sqrt(state[_LOSS_VAR]),
+            "latency_ms_mean": state[_LAT_MEAN],
+            "latency_ms_std": math.sqrt(state[_LAT_VAR]),
+            "throughput_mbps_mean": state[_TP_MEAN],
+            "throughput_mbps_std": math.sqrt(state[_TP_VAR]),
+        }
+
+    def describe(self) -> Dict[str, object]:
+        return {
+            "mode": self.name,
+            "alpha": self.alpha,
+            "z_threshold": self.z_threshold,
+            "warmup": self.warmup,
+            "min_loss_delta_pct": self.min_loss_delta_pct,
+            "min_latency_delta_ms": self.min_latency_delta_ms,
+            "min_throughput_delta_mbps": self.min_throughput_delta_mbps,
+            "cells_tracked": len(self._state),
+        }
+
+
+DETECTORS = {
+    StaticThresholdDetector.name: StaticThresholdDetector,
+    EwmaDetector.name: EwmaDetector,
+}
+
+
+def make_detector(mode: str):
+    try:
+        return DETECTORS[mode]()
+    except KeyError:
+        raise ValueError(f"unknown detector mode {mode!r} (expected one of {', '.join(DETECTORS)})")
@@ -8,6 +8,8 @@
 #   2. In another terminal: python feed_demo.py
 #   3. Open dashboard.html in Chrome and talk to judges.
 #
+# normal_payload() / spike_payload() are also used by bench.py (load test).
+#
 # HACKATHON REALITY:
 # - This script replaces AWS Kinesis/OpenTelemetry streaming.
 #
@@ -17,7 +19,6 @@
 
 import time
 import random
-import requests
 from datetime import datetime
 
 BACKEND_URL = "http://localhost:8000/telemetry/push"
@@ -39,34 +40,41 @@ def normal_payload(region: str, cell_id: str):
         "timestamp": datetime.utcnow().isoformat()
     }
 
-def spike_payload():
-    # simulate congestion / backhaul saturation in northwest / cell_12
+def spike_payload(region: str = "northwest", cell_id: str = "cell_12"):
+    # simulate congestion / backhaul saturation (default: northwest / cell_12)
     return {
-        "region": "northwest",
-        "cell_id": "cell_12",
+        "region": region,
+        "cell_id": cell_id,
         "packet_loss_pct": 6.3,        # ~6% loss, bad
         "latency_ms": 180.0,           # ~180ms latency, bad
         "throughput_mbps": 120.0,
         "timestamp": datetime.utcnow().isoformat()
     }
 
-print("[feed_demo] starting telemetry loop against", BACKEND_URL)
+def main():
+    import requests
 
-while True:
-    # send normal readings for each region+cell
-    for r in REGIONS:
-        for c in CELLS[r]:
+    print("[feed_demo] starting telemetry loop against", BACKEND_URL)
+
+    while True:
+        # send normal readings for each region+cell
+        for r in REGIONS:
+            for c in CELLS[r]:
+                try:
+                    requests.post(BACKEND_URL, json=normal_payload(r, c), timeout=2.0)
+                except Exception as e:
+                    print("[feed_demo] normal post failed:", e)
+
+        # ~10% of loops, inject a spike to trigger incident/AI
+        if random.random() < 0.1:
             try:
-                requests.post(BACKEND_URL, json=normal_payload(r, c), timeout=2.0)
+                print("[feed_demo] injecting spike to northwest/cell_12")
+                requests.post(BACKEND_URL, json=spike_payload(), timeout=2.0)
             except Exception as e:
-                print("[feed_demo] normal post failed:", e)
+                print("[feed_demo] spike post failed:", e)
+
+        time.sleep(2)
 
-    # ~10% of loops, inject a spike to trigger incident/AI
-    if random.random() < 0.1:
-        try:
-            print("[feed_demo] injecting spike to northwest/cell_12")
-            requests.post(BACKEND_URL, json=spike_payload(), timeout=2.0)
-        except Exception as e:
-            print("[feed_demo] spike post failed:", e)
 
-    time.sleep(2)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# incident_pipeline.py
+#
+# Background runner for the Cognitive → Decision → Planning chain.
+#
+# WHY:
+# - push_telemetry used to run analyze_incident (the LLM call), the policy
+#   agent and the planner inline, so every anomalous sample blocked ingest
+#   for as long as the model took.
+#
+# HOW:
+# - Ingest calls submit(key, item) and returns immediately. key is the cell.
+# - Triggers are coalesced per key: while a cell is queued or being analyzed,
+#   newer triggers for it just replace the pending item. A cell spiking
+#   hundreds of times a minute therefore costs at most one run in flight plus
+#   one queued follow-up carrying the newest sample.
+# - The ready queue is bounded; when it is full new cells are dropped and
+#   counted instead of growing memory without limit.
+# - N worker tasks on the event loop hand the (sync, possibly slow) handler
+#   to the default thread pool, so the loop itself never blocks.
+
+from typing import Any, Callable, Dict, Hashable, Optional, Set
+import asyncio
+
+
+class CoalescingPipeline:
+
+    def __init__(self, handler: Callable[[Any], None], max_pending: int = 1024, workers: int = 2):
+        self._handler = handler
+        self.max_pending = max_pending
+        self.worker_count = workers
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None     # keys ready to run
+        self._pending: Dict[Hashable, Any] = {}          # key -> newest item
+        self._in_flight: Set[Hashable] = set()
+        self._workers: list = []
+
+        # counters
+        self.submitted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.processed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+    # -- producer side (any thread) ----------------------------------------------
+
+    def submit(self, key: Hashable, item: Any) -> bool:
+        """
+        Schedule handler(item) for key. Returns False if the pipeline isn't
+        running (no event loop yet), so the caller can run the handler inline.
+        """
+        loop = self._loop
+        if loop is None:
+            return False
+        loop.call_soon_threadsafe(self._enqueue, key, item)
+        return True
+
+    def _enqueue(self, key: Hashable, item: Any) -> None:
+        if self._queue is None:
+            return  # stopped between submit() and this callback
+        self.submitted += 1
+        if key in self._pending:
+            # already queued (or waiting behind an in-flight run): keep newest only
+            self._pending[key] = item
+            self.coalesced += 1
+            return
+
+        self._pending[key] = item
+        if key in self._in_flight:
+            return  # the worker re-queues the key when the current run finishes
+        self._ready(key)
+
+    def _ready(self, key: Hashable) -> None:
+        try:
+            self._queue.put_nowait(key)
+        except asyncio.QueueFull:
+            del self._pending[key]
+            self.dropped += 1
+
+    # -- workers (event loop) ------------------------------------------------------
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            key = await self._queue.get()
+            item = self._pending.pop(key, None)
+            if item is None:
+                continue
+            self._in_flight.add(key)
+            try:
+                await loop.run_in_executor(None, self._handler, item)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print("[AINOA] incident pipeline failed for", key, ":", e)
+            finally:
+                self._in_flight.discard(key)
+                if key in self._pending:
+                    # triggers arrived while we were busy; run once more with the newest
+                    self._ready(key)
+
+    def start(self) -> None:
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._workers = [self._loop.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        for task in self._workers:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        self._loop = None
+        self._queue = None
+        self._pending.clear()
+        self._in_flight.clear()
@@ -0,0 +1,343 @@
+# incidents.py
+#
+# Multi-incident tracking engine: one incident per cell, with a lifecycle.
+#
+# WHY:
+# - main.py used to hold exactly one global ACTIVE_INCIDENT that every
+#   anomaly overwrote. With several cells degrading at once incidents were
+#   lost, and a cell that was already known to be bad re-ran the whole
+#   Cognitive/Decision/Planning pipeline on every sample.
+#
+# HOW:
+# - IncidentTable indexes incidents by id, by cell and by state
+#   (open / acknowledged / mitigating / resolved).
+# - An anomaly on a cell with an active incident updates that incident
+#   (sample count, latest + peak KPIs, severity escalation) instead of
+#   creating a new one. A cell whose last incident was resolved within the
+#   dedup window gets that incident reopened.
+# - N consecutive healthy samples auto-resolve a cell's incident.
+# - Each state keeps its incidents in a sorted list of sort keys (worst
+#   severity, then most recently seen), updated by bisect on every
+#   transition or new sample, like status_index.RankedCells. A query merges
+#   the requested states' lists and reads `limit` entries: no per-query
+#   sort, never the telemetry history. Resolved incidents are kept in a
+#   bounded FIFO.
+# - The "headline" incident (what /status shows as active_incident) is the
+#   most recently opened/reopened/escalated one; when it resolves the
+#   worst remaining active incident takes over.
+# - restore() installs an incident exactly as it was logged (WAL replay),
+#   id and state included, over whatever replayed detection re-derived.
+#
+# Not thread-safe on its own: main.py calls it under STATE_LOCK.
+
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import heapq
+import itertools
+
+
+INCIDENT_STATES = ("open", "acknowledged", "mitigating", "resolved")
+ACTIVE_STATES = ("open", "acknowledged", "mitigating")
+
+SEVERITY_RANK = {"warning": 1, "critical": 2}
+
+# allowed operator-driven transitions (auto-resolve uses "resolved" too)
+TRANSITIONS = {
+    "open": ("acknowledged", "mitigating", "resolved"),
+    "acknowledged": ("mitigating", "resolved"),
+    "mitigating": ("resolved",),
+    "resolved": (),
+}
+
+# observe_anomaly() outcomes
+OPENED = "opened"
+REOPENED = "reopened"
+ESCALATED = "escalated"
+UPDATED = "updated"
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+class TrackedIncident:
+
+    __slots__ = ("incident_id", "region", "cell_id", "state", "severity", "rule_triggered",
+                 "opened_at", "last_seen", "resolved_at", "anomaly_count", "healthy_streak",
+                 "packet_loss_pct", "latency_ms", "throughput_mbps",
+                 "peak_packet_loss_pct", "peak_latency_ms",
+                 "diagnosis", "policy", "forecast")
+
+    def __init__(self, incident: Dict[str, Any], seen_at: float):
+        self.incident_id: str = incident["incident_id"]
+        self.region: str = incident["region"]
+        self.cell_id: str = incident["cell_id"]
+        self.state = "open"
+        self.severity: str = incident["severity"]
+        self.rule_triggered: str = incident["rule_triggered"]
+        self.opened_at = seen_at
+        self.last_seen = seen_at
+        self.resolved_at: Optional[float] = None
+        self.anomaly_count = 0
+        self.healthy_streak = 0
+        self.packet_loss_pct = 0.0
+        self.latency_ms = 0.0
+        self.throughput_mbps = 0.0
+        self.peak_packet_loss_pct = 0.0
+        self.peak_latency_ms = 0.0
+        self.diagnosis: Optional[Dict[str, Any]] = None
+        self.policy: Optional[Dict[str, Any]] = None
+        self.forecast: Optional[Dict[str, Any]] = None
+        self.absorb(incident, seen_at)
+
+    def absorb(self, incident: Dict[str, Any], seen_at: float) -> bool:
+        """Fold one more anomalous sample in. Returns True if severity escalated."""
+        self.anomaly_count += 1
+        self.healthy_streak = 0
+        self.last_seen = max(self.last_seen, seen_at)
+        self.packet_loss_pct = incident["packet_loss_pct"]
+        self.latency_ms = incident["latency_ms"]
+        self.throughput_mbps = incident["throughput_mbps"]
+        self.peak_packet_loss_pct = max(self.peak_packet_loss_pct, incident["packet_loss_pct"])
+        self.peak_latency_ms = max(self.peak_latency_ms, incident["latency_ms"])
+        self.rule_triggered = incident["rule_triggered"]
+        escalated = SEVERITY_RANK.get(incident["severity"], 0) > SEVERITY_RANK.get(self.severity, 0)
+        if escalated:
+            self.severity = incident["severity"]
+        return escalated
+
+    @property
+    def cell(self) -> Tuple[str, str]:
+        return (self.region, self.cell_id)
+
+    @property
+    def active(self) -> bool:
+        return self.state != "resolved"
+
+    def sort_key(self) -> Tuple[int, float]:
+        """Worst first: severity, then most recently seen."""
+        return (-SEVERITY_RANK.get(self.severity, 0), -self.last_seen)
+
+    def summary_fields(self) -> Dict[str, Any]:
+        """Fields matching IncidentSummary (minus timestamp, which main.py formats)."""
+        return {
+            "incident_id": self.incident_id,
+            "region": self.region,
+            "cell_id": self.cell_id,
+            "packet_loss_pct": self.packet_loss_pct,
+            "latency_ms": self.latency_ms,
+            "throughput_mbps": self.throughput_mbps,
+            "rule_triggered": self.rule_triggered,
+            "severity": self.severity,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TrackedIncident":
+        """Inverse of to_dict()."""
+        record = cls.__new__(cls)
+        for name in cls.__slots__:
+            if name not in ("diagnosis", "policy", "forecast"):
+                setattr(record, name, data[name])
+        record.diagnosis = data["ai_diagnosis"]
+        record.policy = data["proposed_action"]
+        record.forecast = data["predicted_outcome"]
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **self.summary_fields(),
+            "state": self.state,
+            "opened_at": self.opened_at,
+            "last_seen": self.last_seen,
+            "resolved_at": self.resolved_at,
+            "anomaly_count": self.anomaly_count,
+            "healthy_streak": self.healthy_streak,
+            "peak_packet_loss_pct": self.peak_packet_loss_pct,
+            "peak_latency_ms": self.peak_latency_ms,
+            "ai_diagnosis": self.diagnosis,
+            "proposed_action": self.policy,
+            "predicted_outcome": self.forecast,
+        }
+
+
+class IncidentTable:
+
+    def __init__(self, dedup_window_s: float = 300.0, auto_resolve_after: int = 5,
+                 resolved_retention: int = 1000):
+        self.dedup_window_s = dedup_window_s
+        self.auto_resolve_after = auto_resolve_after
+        self.resolved_retention = resolved_retention
+
+        self._by_id: Dict[str, TrackedIncident] = {}
+        # cell -> its latest incident (active or recently resolved)
+        self._by_cell: Dict[Tuple[str, str], TrackedIncident] = {}
+        # state -> sorted (sort_key..., incident_id); _keys holds each record's current entry
+        self._by_state: Dict[str, List[Tuple[int, float, str]]] = {state: [] for state in INCIDENT_STATES}
+        self._keys: Dict[str, Tuple[int, float, str]] = {}
+        # (incident_id, resolved_at) in resolve order; stale entries (reopened
+        # and possibly re-resolved since) are recognised by resolved_at
+        self._resolved_fifo: Deque[Tuple[str, float]] = deque()
+        self._headline_id: Optional[str] = None
+
+    # -- indexing helpers ----------------------------------------------------------
+
+    def _index(self, record: TrackedIncident) -> None:
+        key = (*record.sort_key(), record.incident_id)
+        insort(self._by_state[record.state], key)
+        self._keys[record.incident_id] = key
+
+    def _unindex(self, record: TrackedIncident) -> None:
+        key = self._keys.pop(record.incident_id)
+        entries = self._by_state[record.state]
+        del entries[bisect_left(entries, key)]
+
+    def _reindex(self, record: TrackedIncident) -> None:
+        """After a change to severity/last_seen."""
+        if self._keys.get(record.incident_id) != (*record.sort_key(), record.incident_id):
+            self._unindex(record)
+            self._index(record)
+
+    def _set_state(self, record: TrackedIncident, state: str, at: Optional[float] = None) -> None:
+        self._unindex(record)
+        record.state = state
+        self._index(record)
+        if state == "resolved":
+            record.resolved_at = at if at is not None else record.last_seen
+            self._resolved_fifo.append((record.incident_id, record.resolved_at))
+            self._trim_resolved()
+            if self._headline_id == record.incident_id:
+                worst = self.active(limit=1)
+                self._headline_id = worst[0].incident_id if worst else None
+        else:
+            record.resolved_at = None
+
+    def _trim_resolved(self) -> None:
+        while len(self._resolved_fifo) > self.resolved_retention:
+            incident_id, resolved_at = self._resolved_fifo.popleft()
+            record = self._by_id.get(incident_id)
+            if record is None or record.state != "resolved" or record.resolved_at != resolved_at:
+                continue  # reopened since; this entry is stale
+            del self._by_id[incident_id]
+            self._unindex(record)
+            if self._by_cell.get(record.cell) is record:
+                del self._by_cell[record.cell]
+
+    # -- ingest-side updates -------------------------------------------------------
+
+    def observe_anomaly(self, incident: Dict[str, Any], seen_at: float) -> Tuple[TrackedIncident, str]:
+        """
+        Fold an anomalous sample (IncidentSummary dict) into the table.
+        Returns (record, outcome) with outcome in OPENED/REOPENED/ESCALATED/UPDATED.
+        """
+        cell = (incident["region"], incident["cell_id"])
+        record = self._by_cell.get(cell)
+
+        if record is not None and record.active:
+            outcome = ESCALATED if record.absorb(incident, seen_at) else UPDATED
+            self._reindex(record)
+            if outcome == ESCALATED:
+                self._headline_id = record.incident_id
+            return record, outcome
+
+        if (record is not None and record.resolved_at is not None
+                and seen_at - record.last_seen <= self.dedup_window_s):
+            record.absorb(incident, seen_at)
+            self._set_state(record, "open")
+            self._headline_id = record.incident_id
+            return record, REOPENED
+
+        record = TrackedIncident(incident, seen_at)
+        self._by_id[record.incident_id] = record
+        self._by_cell[cell] = record
+        self._index(record)
+        self._headline_id = record.incident_id
+        return record, OPENED
+
+    def observe_healthy(self, region: str, cell_id: str, seen_at: float) -> Optional[TrackedIncident]:
+        """Count a healthy sample; returns the incident if this auto-resolved it."""
+        record = self._by_cell.get((region, cell_id))
+        if record is None or not record.active:
+            return None
+        record.healthy_streak += 1
+        if record.healthy_streak >= self.auto_resolve_after:
+            self._set_state(record, "resolved", at=seen_at)
+            return record
+        return None
+
+    def attach_outputs(self, incident_id: str, diagnosis: Dict[str, Any],
+                       policy: Dict[str, Any], forecast: Dict[str, Any]) -> Optional[TrackedIncident]:
+        record = self._by_id.get(incident_id)
+        if record is None:
+            return None
+        record.diagnosis, record.policy, record.forecast = diagnosis, policy, forecast
+        return record
+
+    def restore(self, data: Dict[str, Any], outcome: str) -> TrackedIncident:
+        """
+        Install a logged incident (TrackedIncident.to_dict()) under its own id.
+        outcome is what happened to it when it was logged (OPENED, REOPENED,
+        ESCALATED, or the state it moved to). An active incident that replay
+        re-derived for the same cell under another id is dropped.
+        """
+        record = TrackedIncident.from_dict(data)
+        old = self._by_id.get(record.incident_id)
+        if old is not None:
+            self._unindex(old)
+        current = self._by_cell.get(record.cell)
+        if current is not None and current is not old and current.active:
+            del self._by_id[current.incident_id]
+            self._unindex(current)
+            if self._headline_id == current.incident_id:
+                self._headline_id = None
+
+        self._by_id[record.incident_id] = record
+        self._by_cell[record.cell] = record
+        self._index(record)
+        if record.state == "resolved":
+            self._resolved_fifo.append((record.incident_id, record.resolved_at))
+            self._trim_resolved()
+        if outcome in (OPENED, REOPENED, ESCALATED):
+            self._headline_id = record.incident_id
+        elif self._headline_id is None or (self._headline_id == record.incident_id and not record.active):
+            worst = self.active(limit=1)
+            self._headline_id = worst[0].incident_id if worst else None
+        return record
+
+    # -- operator transitions ------------------------------------------------------
+
+    def transition(self, incident_id: str, state: str, at: Optional[float] = None) -> TrackedIncident:
+        record = self._by_id.get(incident_id)
+        if record is None:
+            raise KeyError(incident_id)
+        if state not in TRANSITIONS[record.state]:
+            raise InvalidTransition(f"cannot move incident from {record.state} to {state}")
+        self._set_state(record, state, at=at)
+        return record
+
+    # -- queries -------------------------------------------------------------------
+
+    def get(self, incident_id: str) -> Optional[TrackedIncident]:
+        return self._by_id.get(incident_id)
+
+    def for_cell(self, region: str, cell_id: str) -> Optional[TrackedIncident]:
+        return self._by_cell.get((region, cell_id))
+
+    def headline(self) -> Optional[TrackedIncident]:
+        return self._by_id.get(self._headline_id) if self._headline_id else None
+
+    def in_states(self, states: Tuple[str, ...], limit: Optional[int] = None) -> List[TrackedIncident]:
+        """Worst first; reads only the first `limit` index entries."""
+        if len(states) == 1:
+            entries = self._by_state[states[0]]
+            keys = entries[:limit] if limit is not None else entries
+        else:
+            keys = itertools.islice(heapq.merge(*(self._by_state[s] for s in states)), limit)
+        return [self._by_id[key[-1]] for key in keys]
+
+    def active(self, limit: Optional[int] = None) -> List[TrackedIncident]:
+        """Active incidents, worst severity first, then most recently seen."""
+        return self.in_states(ACTIVE_STATES, limit)
+
+    def counts(self) -> Dict[str, int]:
+        return {state: len(ids) for state, ids in self._by_state.items()}
@@ -0,0 +1,133 @@
+# llm_cache.py
+#
+# Fingerprinted response cache in front of the Cognitive Layer LLM call.
+#
+# WHY:
+# - A flapping cell produces a fresh prompt (and a fresh model call) per
+#   anomalous sample, even though nothing meaningful changed since the
+#   analysis a few seconds earlier. The raw prompt can't be the cache key:
+#   it embeds fresh timestamps and exact KPI values.
+#
+# HOW:
+# - Key = normalized incident fingerprint: region, cell, severity, sorted
+#   triggered rules, and KPI values bucketed to a configurable width.
+# - Entries expire after ttl_s; the cache is a size-bounded LRU.
+# - invalidate(region, cell_id) is the explicit hook for "something changed
+#   on this cell, re-ask the model" (e.g. after a mitigation was applied).
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import math
+import threading
+import time
+
+
+# (region, cell_id, severity, rules, loss bucket, latency bucket, throughput bucket)
+IncidentFingerprint = Tuple[str, str, str, str, int, int, int]
+
+
+def _bucket(value: float, width: float) -> int:
+    return int(math.floor(value / width)) if width > 0 else 0
+
+
+def incident_fingerprint(region: str, cell_id: str, severity: str, rule_triggered: str,
+                         packet_loss_pct: float, latency_ms: float, throughput_mbps: float,
+                         loss_bucket: float = 1.0, latency_bucket: float = 25.0,
+                         throughput_bucket: float = 50.0) -> IncidentFingerprint:
+    rules = ",".join(sorted(r for r in rule_triggered.split(",") if r))
+    return (
+        region,
+        cell_id,
+        severity,
+        rules,
+        _bucket(packet_loss_pct, loss_bucket),
+        _bucket(latency_ms, latency_bucket),
+        _bucket(throughput_mbps, throughput_bucket),
+    )
+
+
+class DiagnosisCache:
+    """
+    TTL + LRU cache of parsed diagnoses keyed by IncidentFingerprint.
+    Thread-safe (the incident pipeline runs analyses on a thread pool).
+    """
+
+    def __init__(self, ttl_s: float = 120.0, max_entries: int = 2048,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[IncidentFingerprint, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.invalidated = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_s > 0 and self.max_entries > 0
+
+    def get(self, key: IncidentFingerprint) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(value)
+
+    def put(self, key: IncidentFingerprint, value: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_s, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def invalidate(self, region: Optional[str] = None, cell_id: Optional[str] = None) -> int:
+        """
+        Drop cached diagnoses for a cell, a whole region, or everything
+        (no arguments). Returns how many entries were removed.
+        """
+        with self._lock:
+            if region is None and cell_id is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                doomed = [
+                    key for key in self._entries
+                    if (region is None or key[0] == region) and (cell_id is None or key[1] == cell_id)
+                ]
+                for key in doomed:
+                    del self._entries[key]
+                removed = len(doomed)
+            self.invalidated += removed
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "invalidated": self.invalidated,
+        }
@@ -0,0 +1,287 @@
+# llm_client.py
+#
+# Async client for the Cognitive Layer's LLM provider.
+#
+# WHY:
+# - call_llm() is a mock. Swapping in a plain blocking HTTP call would give
+#   every incident analysis a fresh connection, no timeout and no cap on how
+#   many calls pile onto a slow provider (each one holding a pipeline thread).
+#
+# HOW:
+# - One httpx.AsyncClient (persistent keep-alive pool) on a private event
+#   loop thread, so sync callers (the incident pipeline's worker threads,
+#   backtests, scripts) share one pool: complete_sync() submits to that loop
+#   and waits.
+# - Every call has a deadline covering everything: waiting for a slot,
+#   every attempt and every hedge. Past it the call fails with
+#   LLMUnavailable("timeout") and the caller falls back.
+# - A semaphore caps requests in flight to the provider.
+# - Hedging (optional): if the first attempt hasn't answered after
+#   hedge_after_s, a second one is sent and the first answer wins; failed
+#   attempts (connection errors, 429/5xx) are retried, both up to
+#   max_attempts per call and only while the deadline allows. A hedge is only
+#   sent if a slot is free right now, so hedging never queues behind, or
+#   adds to, a saturated provider.
+# - CircuitBreaker: failure_threshold consecutive failed or slow calls open
+#   it; while open, calls fail at once (LLMUnavailable("circuit_open")) with
+#   no network traffic. After reset_after_s one probe call is let through;
+#   its outcome closes or re-opens the breaker.
+#
+# Wire format: OpenAI-style chat completions (POST {"model", "messages"},
+# answer in choices[0].message.content), which most gateways and local
+# model servers speak. mock_llm_server.py implements it for testing.
+
+from typing import Any, Callable, Dict, Optional, Set
+import asyncio
+import threading
+import time
+
+try:
+    import httpx
+except ImportError:  # only needed when a provider URL is configured
+    httpx = None
+
+
+class LLMUnavailable(Exception):
+    """No answer from the provider; reason: circuit_open | timeout | error."""
+
+    def __init__(self, reason: str, detail: str = ""):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+
+
+class _RetryableError(Exception):
+    pass
+
+
+def _consume(task: asyncio.Task) -> None:
+    if not task.cancelled():
+        task.exception()
+
+
+class CircuitBreaker:
+    """closed → open after failure_threshold bad calls → half_open probe → closed/open."""
+
+    def __init__(self, failure_threshold: int = 5, reset_after_s: float = 30.0,
+                 slow_call_s: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_after_s = reset_after_s
+        self.slow_call_s = slow_call_s   # a success slower than this still counts as a failure
+        self._clock = clock
+        self.state = "closed"
+        self.failures = 0                # consecutive
+        self.opened_at = 0.0
+        self.opened = 0                  # times tripped
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "open" and self._clock() - self.opened_at >= self.reset_after_s:
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open":
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+        return self.state == "closed"
+
+    def record(self, ok: bool, latency_s: float) -> None:
+        failed = not ok or (self.slow_call_s is not None and latency_s > self.slow_call_s)
+        if self.state == "half_open":
+            self._probing = False
+            if failed:
+                self._trip()
+            else:
+                self.state = "closed"
+                self.failures = 0
+            return
+        if not failed:
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.state == "closed" and self.failures >= self.failure_threshold:
+            self._trip()
+
+    def _trip(self) -> None:
+        self.state = "open"
+        self.opened_at = self._clock()
+        self.opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.failures, "opened": self.opened}
+
+
+class AsyncLLMClient:
+
+    def __init__(self, url: str, model: str = "", api_key: str = "", timeout_s: float = 8.0,
+                 max_in_flight: int = 4, hedge_after_s: float = 0.0, max_attempts: int = 2,
+                 max_tokens: int = 512, breaker: Optional[CircuitBreaker] = None):
+        if httpx is None:
+            raise RuntimeError("the LLM client needs httpx (pip install httpx)")
+        self.url = url
+        self.model = model
+        self.api_key = api_key
+        self.timeout_s = timeout_s
+        self.max_in_flight = max_in_flight
+        self.hedge_after_s = hedge_after_s   # 0 = no hedging
+        self.max_attempts = max(1, max_attempts)
+        self.max_tokens = max_tokens
+        self.breaker = breaker or CircuitBreaker()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Lock()
+        self._http: Optional["httpx.AsyncClient"] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+
+        # counters
+        self.calls = 0
+        self.succeeded = 0
+        self.failed = {"circuit_open": 0, "timeout": 0, "error": 0}
+        self.hedges = 0
+        self.retries = 0
+
+    # -- sync bridge ---------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._started:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run() -> None:
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name="ainoa-llm", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def complete_sync(self, prompt: str, timeout_s: Optional[float] = None) -> str:
+        """complete() for sync callers: runs on the client's loop thread, blocks until done."""
+        future = asyncio.run_coroutine_threadsafe(self.complete(prompt, timeout_s), self._ensure_loop())
+        return future.result()
+
+    def close(self) -> None:
+        loop = self._loop
+        if loop is None:
+            return
+        if self._http is not None:
+            asyncio.run_coroutine_threadsafe(self._http.aclose(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+        loop.close()
+        self._loop = self._thread = self._http = self._slots = None
+
+    # -- async side (client loop) --------------------------------------------
+
+    async def complete(self, prompt: str, timeout_s: Optional[float] = None) -> str:
+        """The model's reply text, or LLMUnavailable within timeout_s (default self.timeout_s)."""
+        self.calls += 1
+        if not self.breaker.allow():
+            self.failed["circuit_open"] += 1
+            raise LLMUnavailable("circuit_open")
+        if self._http is None:
+            self._http = httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight))
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+
+        started = time.monotonic()
+        deadline = started + (timeout_s if timeout_s is not None else self.timeout_s)
+        try:
+            text = await self._attempts(prompt, deadline)
+        except LLMUnavailable as e:
+            self.failed[e.reason] += 1
+            self.breaker.record(False, time.monotonic() - started)
+            raise
+        self.succeeded += 1
+        self.breaker.record(True, time.monotonic() - started)
+        return text
+
+    async def _attempts(self, prompt: str, deadline: float) -> str:
+        tasks: Set[asyncio.Task] = set()
+        attempts = 0
+        last_error: Optional[BaseException] = None
+
+        def launch() -> None:
+            nonlocal attempts
+            attempts += 1
+            task = asyncio.ensure_future(self._attempt(prompt, deadline))
+            # a losing attempt may still fail after we stopped waiting for it
+            task.add_done_callback(_consume)
+            tasks.add(task)
+
+        launch()
+        try:
+            while tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMUnavailable("timeout", str(last_error or "deadline passed"))
+                hedge = bool(self.hedge_after_s) and attempts < self.max_attempts
+                wait_s = min(remaining, self.hedge_after_s) if hedge else remaining
+                done, _ = await asyncio.wait(tasks, timeout=wait_s, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if hedge and wait_s < remaining and not self._slots.locked():
+                        self.hedges += 1
+                        launch()
+                    continue
+                for task in done:
+                    tasks.discard(task)
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    last_error = error
+                if not tasks and isinstance(last_error, _RetryableError) and attempts < self.max_attempts:
+                    self.retries += 1
+                    launch()
+            raise LLMUnavailable("error", str(last_error))
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _attempt(self, prompt: str, deadline: float) -> str:
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                return await self._post(prompt, deadline)
+            finally:
+                self.in_flight -= 1
+
+    async def _post(self, prompt: str, deadline: float) -> str:
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None
+        body = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.max_tokens,
+            "temperature": 0,
+        }
+        try:
+            response = await self._http.post(self.url, json=body, headers=headers,
+                                             timeout=max(0.001, deadline - time.monotonic()))
+        except httpx.TransportError as e:   # connect errors, resets, timeouts
+            raise _RetryableError(f"{type(e).__name__}: {e}") from e
+        if response.status_code == 429 or response.status_code >= 500:
+            raise _RetryableError(f"HTTP {response.status_code}")
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        try:
+            return response.json()["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise RuntimeError(f"unexpected response: {response.text[:200]}") from e
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "calls": self.calls,
+            "succeeded": self.succeeded,
+            "failed": dict(self.failed),
+            "hedges": self.hedges,
+            "retries": self.retries,
+            "breaker": self.breaker.stats(),
+        }
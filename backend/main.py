@@ -3,13 +3,38 @@
 # AINOA Core Service (Hackathon Version)
 #
 # WHAT'S REAL (hackathon / works today):
-# - FastAPI app with in-memory telemetry store
+# - FastAPI app with in-memory telemetry store (per-cell compressed history, telemetry_store.py)
 # - /telemetry/push ingests telemetry
-# - Simple anomaly detection (packet_loss_pct >5 OR latency_ms >150)
+# - /telemetry/push/batch ingests a JSON array or NDJSON stream in one request
+# - Ingest admission control: per-source (peer address) / per-region rate limits and a
+#   bounded queue (429 + Retry-After); anomalous samples are shed last
+# - Optional binary TCP/UDP ingress (AINOA_BINARY_TCP_PORT / _UDP_PORT):
+#   struct-packed records in length-prefixed frames, checkpoint/ack over TCP
+# - Simple anomaly detection (packet_loss_pct >5 OR latency_ms >150), or a
+#   per-cell streaming EWMA baseline detector (AINOA_DETECTOR=ewma)
 # - Cognitive Layer: analyze_incident() builds LLM prompt and returns structured JSON
-# - Decision Layer: converts AI suggestion into machine-actionable policy JSON
-# - Planning Agent: simulates before/after QoS impact
-# - /status returns everything for the dashboard
+#   (responses cached per incident fingerprint with TTL + LRU, llm_cache.py)
+#   optional real provider (AINOA_LLM_URL) via a pooled async client with
+#   deadlines, a concurrency cap, hedged retries and a circuit breaker
+# - Decision Layer: converts AI suggestion into machine-actionable policy JSON,
+#   offloading to the healthy neighbor with most headroom (topology.json)
+# - Planning Agent: simulates before/after QoS impact over a ranked what-if
+#   grid of offload targets and percentages
+# - /status returns everything for the dashboard (ETag / 304 when unchanged)
+#   filtered views: ?region=, ?offset=&limit=, ?worst=k&by=latency|loss, ?summary=true
+# - /telemetry/query: per-cell min/max/avg/p95 over time from rollup tiers
+#   (10s / 1m / 15m buckets) maintained at ingest
+# - /telemetry/samples: raw per-cell history, kept Gorilla-compressed in memory
+# - /metrics: Prometheus per-stage latency histograms, ingest/anomaly counters,
+#   pipeline queue depth and state sizes
+# - /status/stream pushes a snapshot + coalesced deltas to the dashboard (SSE)
+# - Cognitive/Decision/Planning run on background workers, coalesced per cell
+# - Incident table: one incident per cell, open → acknowledged → mitigating →
+#   resolved, auto-resolve after N healthy samples (/incidents endpoints)
+# - Optional write-ahead log (AINOA_WAL_DIR) replayed on startup, so restarts
+#   and --reload keep history, incidents and the dashboard state
+# - Optional sharding across uvicorn workers (AINOA_SHARDS): cells are hashed
+#   to an owning worker, ingest is forwarded there, reads merge all shards
 #
 # WHAT'S ROADMAP (what we tell judges is next):
 # - Replace manual POST ingestion with AWS Kinesis / OpenTelemetry
@@ -20,6 +45,7 @@
 # Local dev:
 #   1. Activate venv
 #   2. python -m uvicorn main:app --reload --port 8000
+#      (multi-core: AINOA_SHARDS=4 python -m uvicorn main:app --workers 4)
 #   3. In a second terminal: python feed_demo.py
 #
 # Demo story:
@@ -27,14 +53,49 @@
 #   - spike triggers anomaly -> AI diagnosis -> policy action -> forecast
 #   - /status exposes that whole brain to the frontend dashboard
 
-from fastapi import FastAPI, Body
+from fastapi import FastAPI, Body, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from starlette.concurrency import run_in_threadpool
+from typing import Callable, List, Dict, Iterator, Optional, Any, Set, Tuple
+from contextlib import asynccontextmanager
 from datetime import datetime
+import asyncio
+import hashlib
+import heapq
+import itertools
+import os
+import threading
+import time
 import uuid
 import random
 import json
+import math
+
+from admission import (
+    BULK, HIGH, PRIORITY_NAMES, AdmissionQueue, Overloaded, RateLimiter, parse_rate, retry_after_header,
+)
+from binary_ingest import BinaryIngestServer, Record as BinaryRecord
+from detectors import Detection, StaticThresholdDetector, make_detector
+from incident_pipeline import CoalescingPipeline
+from incidents import (
+    ACTIVE_STATES, INCIDENT_STATES, OPENED, SEVERITY_RANK, UPDATED,
+    IncidentTable, InvalidTransition, TrackedIncident,
+)
+from llm_cache import DiagnosisCache, IncidentFingerprint, incident_fingerprint
+from llm_client import AsyncLLMClient, CircuitBreaker, LLMUnavailable
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Registry, merge_families, render
+from planning import Planner, Scenario
+from rollups import RollupStore, parse_tiers
+from sharding import HashRing, ShardClient, ShardError, ShardServer, claim_shard
+from status_index import CellOrder, RankedCells
+from status_stream import StatusBroadcaster, sse_frame
+from telemetry_store import TelemetryStore, from_epoch, to_epoch
+from telemetry_wal import KIND_INCIDENT, KIND_PIPELINE, TelemetryWAL, encode_json, encode_telemetry
+from topology import Topology
 
 # -----------------------------------------------------------------------------
 # FastAPI app
@@ -55,18 +116,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(RequestValidationError)
+async def request_validation_error(request: Request, exc: RequestValidationError):
+    # FastAPI's default 422 echoes each bad input back, and a NaN/Infinity
+    # KPI (valid JSON to Python, rejected by TelemetryEvent) can't be encoded
+    errors = [{k: v for k, v in error.items() if k not in ("input", "ctx")} for error in exc.errors()]
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
+
 # -----------------------------------------------------------------------------
 # In-memory runtime state (hackathon-real, not production)
 # -----------------------------------------------------------------------------
 
-# raw rolling telemetry samples (we keep last ~200)
-TELEMETRY_HISTORY: List[Dict[str, Any]] = []
+# raw telemetry samples: compressed history per cell (see telemetry_store.py,
+# compressed_series.py). Retention is per cell; AINOA_RETENTION_PER_CELL sets
+# the default (1800 samples = 1h at the demo feed's one sample per 2s; at
+# ~25 bytes a sample, a day per cell is ~1 MB)
+TELEMETRY_RETENTION_PER_CELL = int(os.getenv("AINOA_RETENTION_PER_CELL", "1800"))
+TELEMETRY_STORE = TelemetryStore(
+    default_capacity=TELEMETRY_RETENTION_PER_CELL,
+    block_size=int(os.getenv("AINOA_HISTORY_BLOCK_SAMPLES", "120")),
+)
+
+# min/max/avg/p95 per cell at several resolutions, updated at ingest and
+# served by /telemetry/query (see rollups.py). "seconds:buckets kept" pairs.
+TELEMETRY_ROLLUPS = RollupStore(parse_tiers(os.getenv("AINOA_ROLLUP_TIERS", "10:360,60:360,900:192")))
+
+# guards LATEST_BY_CELL, REGION_AGGREGATES, INCIDENTS and the cached
+# incident outputs (sync handlers run concurrently in FastAPI's threadpool)
+STATE_LOCK = threading.Lock()
+
+# bumped on every change visible in /status; drives the ETag + payload cache.
+# BOOT_ID keeps ETags from a previous process from matching after a restart.
+STATE_VERSION = 0
+BOOT_ID = uuid.uuid4().hex[:8]
+
+# (state version, serialized StatusResponse) of the last /status build
+_STATUS_CACHE: Tuple[int, bytes] = (-1, b"")
 
 # snapshot of most recent reading per cell
 # key: "region:cell_id" -> value: latest TelemetryEvent as dict
 LATEST_BY_CELL: Dict[str, Dict[str, Any]] = {}
 
-# active incident (only most recent, 1 at a time for demo simplicity)
+# every incident, indexed by id / cell / state (see incidents.py).
+# A repeat anomaly within an open incident updates it; N healthy samples
+# auto-resolve it; a resolved incident that re-fires within the dedup
+# window is reopened rather than duplicated.
+INCIDENT_DEDUP_WINDOW_S = float(os.getenv("AINOA_INCIDENT_DEDUP_WINDOW_S", "300"))
+INCIDENT_AUTO_RESOLVE_SAMPLES = int(os.getenv("AINOA_INCIDENT_AUTO_RESOLVE_SAMPLES", "5"))
+INCIDENT_RESOLVED_RETENTION = int(os.getenv("AINOA_INCIDENT_RESOLVED_RETENTION", "1000"))
+INCIDENTS = IncidentTable(
+    dedup_window_s=INCIDENT_DEDUP_WINDOW_S,
+    auto_resolve_after=INCIDENT_AUTO_RESOLVE_SAMPLES,
+    resolved_retention=INCIDENT_RESOLVED_RETENTION,
+)
+
+# headline incident for /status (mirrors INCIDENTS.headline(), see _sync_headline)
 ACTIVE_INCIDENT: Optional[Dict[str, Any]] = None
 
 # cached cognitive layer output for ACTIVE_INCIDENT
@@ -79,6 +184,50 @@ POLICY_ACTION: Optional[Dict[str, Any]] = None
 PLANNING_PROJECTION: Optional[Dict[str, Any]] = None
 
 
+# -----------------------------------------------------------------------------
+# Instrumentation (metrics.py), exported at /metrics
+#
+# Per-stage latency histograms around the hot path and the incident chain,
+# plus ingest/anomaly/incident counters. State sizes and queue depth are
+# gauges read at scrape time, so they cost nothing per sample.
+# -----------------------------------------------------------------------------
+
+METRICS = Registry()
+
+PIPELINE_STAGES = (
+    "push", "ingest_batch", "validate_batch",     # request level
+    "store", "serialize", "snapshot",             # _store_events
+    "detect", "detect_batch", "track",            # Observability Layer
+    "pipeline", "analyze", "llm", "plan", "policy", "forecast",  # incident chain
+    "region_health", "status_build",              # /status
+)
+STAGE_LATENCY = {
+    stage: METRICS.histogram("ainoa_stage_latency_seconds",
+                             "Wall time per processing stage", {"stage": stage})
+    for stage in PIPELINE_STAGES
+}
+
+EVENTS_INGESTED = METRICS.counter("ainoa_events_ingested_total", "Telemetry samples stored")
+ANOMALIES_DETECTED = METRICS.counter("ainoa_anomalies_detected_total", "Samples flagged by the detector")
+INCIDENT_EVENTS = {
+    outcome: METRICS.counter("ainoa_incident_events_total", "Incident table outcomes", {"outcome": outcome})
+    for outcome in ("opened", "reopened", "escalated", "updated", "resolved")
+}
+LLM_FALLBACKS = {
+    reason: METRICS.counter("ainoa_llm_fallback_total", "Diagnoses that fell back to the canned answer",
+                            {"reason": reason})
+    for reason in ("circuit_open", "timeout", "error", "bad_json")
+}
+STATUS_RESPONSES = {
+    code: METRICS.counter("ainoa_status_responses_total", "/status responses by code", {"code": code})
+    for code in ("200", "304")
+}
+
+
+def _observe(stage: str, started: float) -> None:
+    STAGE_LATENCY[stage].observe(time.perf_counter() - started)
+
+
 # -----------------------------------------------------------------------------
 # Pydantic models
 # -----------------------------------------------------------------------------
@@ -86,12 +235,22 @@ PLANNING_PROJECTION: Optional[Dict[str, Any]] = None
 class TelemetryEvent(BaseModel):
     region: str = Field(..., example="northwest")
     cell_id: str = Field(..., example="cell_12")
-    packet_loss_pct: float = Field(..., example=6.3)
-    latency_ms: float = Field(..., example=182.0)
-    throughput_mbps: float = Field(..., example=125.4)
+    packet_loss_pct: float = Field(..., allow_inf_nan=False, example=6.3)
+    latency_ms: float = Field(..., allow_inf_nan=False, example=182.0)
+    throughput_mbps: float = Field(..., allow_inf_nan=False, example=125.4)
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
+class RetentionRequest(BaseModel):
+    region: str = Field(..., example="northwest")
+    cell_id: str = Field(..., example="cell_12")
+    samples: int = Field(..., gt=0, example=7200)
+
+
+class DetectorConfig(BaseModel):
+    mode: str = Field(..., example="ewma")
+
+
 class IncidentSummary(BaseModel):
     incident_id: str
     region: str
@@ -112,9 +271,10 @@ class AIDiagnosis(BaseModel):
 
 
 class PolicyAction(BaseModel):
-    action_type: str               # e.g. "TRAFFIC_OFFLOAD"
+    action_type: str               # "NO_ACTION" | "TRAFFIC_OFFLOAD" | "ESCALATE"
     source_cell: str
-    target_cell: str
+    target_cell: Optional[str]     # bare cell id like source_cell; None without a target
+    target_region: Optional[str] = None  # the target may sit across a region border
     offload_percent: float
     rationale: str
     can_execute_automatically: bool
@@ -125,6 +285,7 @@ class PlanningProjection(BaseModel):
     before: Dict[str, float]
     after: Dict[str, float]
     explanation: str
+    alternatives: List[Dict[str, Any]] = []  # ranked what-if scenarios, best first
 
 
 class RegionHealth(BaseModel):
@@ -132,6 +293,7 @@ class RegionHealth(BaseModel):
     avg_latency_ms: float
     avg_packet_loss_pct: float
     avg_throughput_mbps: float
+    cell_count: int = 0
     cells: List[Dict[str, Any]]
 
 
@@ -143,25 +305,28 @@ class StatusResponse(BaseModel):
     predicted_outcome: Optional[PlanningProjection]
 
 
+class StatusView(StatusResponse):
+    """Filtered /status (region / offset+limit / worst / summary)."""
+    worst: Optional[List[Dict[str, Any]]] = None  # worst=k: cells (with region), worst first
+    page: Optional[Dict[str, int]] = None         # offset/limit applied to each region's cells
+
+
 # -----------------------------------------------------------------------------
 # Observability Layer: anomaly detection
 #
-# Rule: anomaly if packet_loss_pct > 5 OR latency_ms > 150.
-# Severity: "critical" if both rules fired, else "warning".
+# Pluggable detector (detectors.py), chosen with AINOA_DETECTOR or
+# POST /detector:
+# - "static" (default): anomaly if packet_loss_pct > 5 OR latency_ms > 150.
+#   Severity: "critical" if both rules fired, else "warning".
+# - "ewma": per-cell streaming baseline (EWMA mean/variance, O(1) per sample);
+#   flags deviations from each cell's own normal.
 # -----------------------------------------------------------------------------
 
-def detect_anomaly(event: TelemetryEvent) -> Optional[IncidentSummary]:
-    triggered_rules = []
-    if event.packet_loss_pct > 5.0:
-        triggered_rules.append("high_packet_loss_pct")
-    if event.latency_ms > 150.0:
-        triggered_rules.append("high_latency_ms")
-
-    if not triggered_rules:
-        return None
+ANOMALY_DETECTOR = make_detector(os.getenv("AINOA_DETECTOR", "static"))
 
-    severity = "critical" if len(triggered_rules) > 1 else "warning"
 
+def _incident_from_detection(event: TelemetryEvent, detection: Detection) -> IncidentSummary:
+    rule_triggered, severity = detection
     return IncidentSummary(
         incident_id=str(uuid.uuid4()),
         region=event.region,
@@ -170,27 +335,92 @@ def detect_anomaly(event: TelemetryEvent) -> Optional[IncidentSummary]:
         packet_loss_pct=event.packet_loss_pct,
         latency_ms=event.latency_ms,
         throughput_mbps=event.throughput_mbps,
-        rule_triggered=",".join(triggered_rules),
+        rule_triggered=rule_triggered,
         severity=severity
     )
 
 
+def detect_anomaly(event: TelemetryEvent) -> Optional[IncidentSummary]:
+    started = time.perf_counter()
+    detection = ANOMALY_DETECTOR.observe(
+        event.region, event.cell_id,
+        event.packet_loss_pct, event.latency_ms, event.throughput_mbps,
+    )
+    _observe("detect", started)
+    if detection is None:
+        return None
+    ANOMALIES_DETECTED.inc()
+    return _incident_from_detection(event, detection)
+
+
+def detect_anomalies(events: List[TelemetryEvent]) -> List[Optional[IncidentSummary]]:
+    """Batch form of detect_anomaly(); results line up with `events`."""
+    started = time.perf_counter()
+    detections = ANOMALY_DETECTOR.observe_batch([
+        (e.region, e.cell_id, e.packet_loss_pct, e.latency_ms, e.throughput_mbps)
+        for e in events
+    ])
+    _observe("detect_batch", started)
+    incidents = [
+        _incident_from_detection(event, detection) if detection else None
+        for event, detection in zip(events, detections)
+    ]
+    flagged = len(incidents) - incidents.count(None)
+    if flagged:
+        ANOMALIES_DETECTED.inc(flagged)
+    return incidents
+
+
 # -----------------------------------------------------------------------------
 # Cognitive Layer: analyze_incident()
 #
 # For hackathon:
 # - We build a prompt with telemetry context.
-# - We call call_llm(), which is mocked here to return deterministic JSON.
+# - We call call_llm(), which is mocked here to return deterministic JSON
+#   unless AINOA_LLM_URL points at a provider (see llm_client.py: pooled
+#   async client with deadlines, a concurrency cap, hedged retries and a
+#   circuit breaker; mock_llm_server.py simulates a slow/failing provider).
 #
 # For roadmap:
 # - call_llm() would call Bedrock/SageMaker with a telco-tuned model.
 # -----------------------------------------------------------------------------
 
+# OpenAI-style chat completions endpoint; empty = built-in mock
+LLM_URL = os.getenv("AINOA_LLM_URL", "")
+LLM_CLIENT: Optional[AsyncLLMClient] = None
+if LLM_URL:
+    LLM_CLIENT = AsyncLLMClient(
+        LLM_URL,
+        model=os.getenv("AINOA_LLM_MODEL", ""),
+        api_key=os.getenv("AINOA_LLM_API_KEY", ""),
+        timeout_s=float(os.getenv("AINOA_LLM_TIMEOUT_S", "8")),        # whole call, incl. retries
+        max_in_flight=int(os.getenv("AINOA_LLM_MAX_IN_FLIGHT", "4")),
+        hedge_after_s=float(os.getenv("AINOA_LLM_HEDGE_AFTER_S", "0")),  # 0 = no hedging
+        max_attempts=int(os.getenv("AINOA_LLM_MAX_ATTEMPTS", "2")),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("AINOA_LLM_BREAKER_FAILURES", "5")),
+            reset_after_s=float(os.getenv("AINOA_LLM_BREAKER_RESET_S", "30")),
+            slow_call_s=float(os.getenv("AINOA_LLM_SLOW_CALL_S", "0")) or None,
+        ),
+    )
+
+# what the Cognitive Layer reports when the model gives nothing usable
+FALLBACK_DIAGNOSIS = {
+    "issue_summary": "Network degradation detected.",
+    "probable_cause": "Unknown cause.",
+    "suggested_action": "Escalate to NOC engineer.",
+    "risk_level": "high"
+}
+
+
 def call_llm(prompt: str) -> str:
     """
-    MOCK LLM CALL for hackathon.
-    Returns a JSON string. In prod: replace with Bedrock/Anthropic/OpenAI call.
+    MOCK LLM CALL for hackathon, unless AINOA_LLM_URL is set.
+    Returns a JSON string; raises LLMUnavailable if the provider timed out,
+    failed, or its circuit breaker is open.
     """
+    if LLM_CLIENT is not None:
+        return LLM_CLIENT.complete_sync(prompt)
     fake = {
         "issue_summary": "Severe congestion detected in northwest / cell_12 causing high latency (~180ms) and elevated packet loss (~6%).",
         "probable_cause": "Backhaul saturation due to heavy user load and limited available capacity.",
@@ -200,12 +430,38 @@ def call_llm(prompt: str) -> str:
     return json.dumps(fake)
 
 
+# Diagnosis cache in front of call_llm, keyed by incident fingerprint (see
+# llm_cache.py). TTL 0 disables it. Bucket widths decide which KPI changes
+# are "the same incident" as far as the model is concerned.
+LLM_CACHE_TTL_S = float(os.getenv("AINOA_LLM_CACHE_TTL_S", "120"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("AINOA_LLM_CACHE_MAX_ENTRIES", "2048"))
+LLM_CACHE_LOSS_BUCKET_PCT = float(os.getenv("AINOA_LLM_CACHE_LOSS_BUCKET_PCT", "1.0"))
+LLM_CACHE_LATENCY_BUCKET_MS = float(os.getenv("AINOA_LLM_CACHE_LATENCY_BUCKET_MS", "25"))
+LLM_CACHE_THROUGHPUT_BUCKET_MBPS = float(os.getenv("AINOA_LLM_CACHE_THROUGHPUT_BUCKET_MBPS", "50"))
+
+LLM_CACHE = DiagnosisCache(ttl_s=LLM_CACHE_TTL_S, max_entries=LLM_CACHE_MAX_ENTRIES)
+
+
+def _incident_fingerprint(incident: IncidentSummary) -> IncidentFingerprint:
+    return incident_fingerprint(
+        incident.region, incident.cell_id, incident.severity, incident.rule_triggered,
+        incident.packet_loss_pct, incident.latency_ms, incident.throughput_mbps,
+        loss_bucket=LLM_CACHE_LOSS_BUCKET_PCT,
+        latency_bucket=LLM_CACHE_LATENCY_BUCKET_MS,
+        throughput_bucket=LLM_CACHE_THROUGHPUT_BUCKET_MBPS,
+    )
+
+
 def analyze_incident(incident: IncidentSummary) -> AIDiagnosis:
+    # Same cell + severity + rules + bucketed KPIs analyzed recently → reuse it
+    fingerprint = _incident_fingerprint(incident)
+    cached = LLM_CACHE.get(fingerprint)
+    if cached is not None:
+        return AIDiagnosis(**cached)
+
     # Grab recent telemetry for that cell/region to give LLM context
-    recent_context = [
-        t for t in TELEMETRY_HISTORY
-        if t["region"] == incident.region and t["cell_id"] == incident.cell_id
-    ][-5:]
+    # (newest-first lazy read: served from the uncompressed head, no block decode)
+    recent_context = TELEMETRY_STORE.recent(incident.region, incident.cell_id, 5)
 
     prompt = f"""
 You are AINOA, an AI network operations assistant for a telecom.
@@ -226,57 +482,104 @@ Explain likely root cause and recommend an action like traffic offload, capacity
 or backhaul relief.
 """.strip()
 
-    raw_llm = call_llm(prompt)
+    started = time.perf_counter()
+    try:
+        raw_llm = call_llm(prompt)
+    except LLMUnavailable as e:
+        raw_llm = None
+        LLM_FALLBACKS[e.reason].inc()
+    _observe("llm", started)
 
     try:
+        if raw_llm is None:
+            raise ValueError("no model answer")
         parsed = json.loads(raw_llm)
-    except json.JSONDecodeError:
-        parsed = {
-            "issue_summary": "Network degradation detected.",
-            "probable_cause": "Unknown cause.",
-            "suggested_action": "Escalate to NOC engineer.",
-            "risk_level": "high"
-        }
-
-    return AIDiagnosis(
+        if not isinstance(parsed, dict):
+            raise ValueError("model answer is not a JSON object")
+        cacheable = True
+    except ValueError:  # includes json.JSONDecodeError
+        if raw_llm is not None:
+            LLM_FALLBACKS["bad_json"].inc()
+        parsed = dict(FALLBACK_DIAGNOSIS)
+        # fallback is not cached: the next trigger should ask the model again
+        cacheable = False
+
+    diagnosis = AIDiagnosis(
         issue_summary=parsed.get("issue_summary", "Network degradation detected."),
         probable_cause=parsed.get("probable_cause", "Unknown cause."),
         suggested_action=parsed.get("suggested_action", "Escalate to NOC engineer."),
         risk_level=parsed.get("risk_level", "high")
     )
+    if cacheable:
+        LLM_CACHE.put(fingerprint, diagnosis.dict())
+    return diagnosis
 
 
 # -----------------------------------------------------------------------------
 # Decision Layer / Policy Agent
 #
 # Hackathon reality:
-# - We parse the AI suggestion. If it says "offload", we emit TRAFFIC_OFFLOAD.
+# - We parse the AI suggestion. If it says "offload", we emit TRAFFIC_OFFLOAD
+#   with the best-scoring target/percentage from the what-if grid.
+# - ESCALATE: offload was advised but no neighbor can take it, so a human
+#   (NOC) has to act; nothing is auto-executed and there is no target.
 #
 # Roadmap story:
 # - This becomes an RLlib-trained policy agent that autonomously chooses
 #   offload vs. capacity add vs. spectrum shift, etc.
 # -----------------------------------------------------------------------------
 
-def decision_layer_policy(diagnosis: AIDiagnosis, incident: IncidentSummary) -> PolicyAction:
+# cell adjacency + capacity (topology.py); without a file nothing is adjacent
+TOPOLOGY_FILE = os.getenv("AINOA_TOPOLOGY_FILE",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "topology.json"))
+TOPOLOGY = Topology.load(TOPOLOGY_FILE) if os.path.exists(TOPOLOGY_FILE) else Topology()
+
+# what-if grid (planning.py): no-action + top targets x 5..50% offload
+PLANNER = Planner()
+PLAN_TARGETS = int(os.getenv("AINOA_PLAN_TARGETS", "4"))
+PLAN_TOP_K = int(os.getenv("AINOA_PLAN_TOP_K", "3"))
+
+
+def plan_scenarios(incident: IncidentSummary) -> List[Scenario]:
+    """Ranked projections for the incident cell's current state, best first."""
+    targets = TOPOLOGY.top_neighbors(f"{incident.region}:{incident.cell_id}", PLAN_TARGETS)
+    return PLANNER.plan(incident.packet_loss_pct, incident.latency_ms, incident.throughput_mbps,
+                        targets, top_k=PLAN_TOP_K)
+
+
+def decision_layer_policy(diagnosis: AIDiagnosis, incident: IncidentSummary,
+                          scenarios: Optional[List[Scenario]] = None) -> PolicyAction:
     action_type = "NO_ACTION"
     source_cell = incident.cell_id
-    target_cell = "cell_15"  # pretend known neighbor
+    target_cell: Optional[str] = None
+    target_region: Optional[str] = None
     offload_percent = 0.0
     rationale = "No automated mitigation required."
     can_execute_automatically = False
     confidence = 0.5
 
     if "offload" in diagnosis.suggested_action.lower():
-        action_type = "TRAFFIC_OFFLOAD"
-        offload_percent = 20.0
-        rationale = diagnosis.suggested_action
-        can_execute_automatically = True
-        confidence = 0.82  # pretend RL policy Q-value
+        if scenarios is None:
+            scenarios = plan_scenarios(incident)
+        best = scenarios[0]
+        if best.action_type == "TRAFFIC_OFFLOAD":
+            action_type = "TRAFFIC_OFFLOAD"
+            target_region, target_cell = best.target_region, best.target_cell
+            offload_percent = best.offload_percent
+            rationale = (f"Offload {offload_percent:g}% of {source_cell} traffic to {best.target} "
+                         f"(best projected outcome of the what-if grid). {diagnosis.suggested_action}")
+            can_execute_automatically = True
+            confidence = 0.82  # pretend RL policy Q-value
+        else:
+            action_type = "ESCALATE"
+            rationale = (f"{diagnosis.suggested_action} No healthy neighbor has spare capacity; "
+                         f"escalating to NOC.")
 
     return PolicyAction(
         action_type=action_type,
         source_cell=source_cell,
         target_cell=target_cell,
+        target_region=target_region,
         offload_percent=offload_percent,
         rationale=rationale,
         can_execute_automatically=can_execute_automatically,
@@ -288,32 +591,46 @@ def decision_layer_policy(diagnosis: AIDiagnosis, incident: IncidentSummary) ->
 # Planning Agent / Capacity Forecaster
 #
 # Hackathon:
-# - We simulate improved KPIs after offload.
+# - We simulate improved KPIs after offload, for every scenario in the grid.
 #
 # Roadmap:
 # - We'd drive ns-3 / TIP OpenRAN to predict KPI after reroute/scale.
 # -----------------------------------------------------------------------------
 
-def planning_agent_forecast(incident: IncidentSummary, action: PolicyAction) -> PlanningProjection:
+def planning_agent_forecast(incident: IncidentSummary, action: PolicyAction,
+                            scenarios: Optional[List[Scenario]] = None) -> PlanningProjection:
+    """
+    Projection for the chosen action, plus the ranked alternatives it was
+    compared against. The grid is memoized, so re-planning here is cheap.
+    """
+    if scenarios is None:
+        scenarios = plan_scenarios(incident)
     before_loss = incident.packet_loss_pct
     before_latency = incident.latency_ms
 
     # default (no improvement)
     after_loss = before_loss
     after_latency = before_latency
-
-    if action.action_type == "TRAFFIC_OFFLOAD" and action.offload_percent >= 10.0:
-        # pretend offload drops congestion dramatically
-        after_loss = max(0.5, before_loss * 0.2)       # e.g. 6.3 -> ~1.26
-        after_latency = max(60.0, before_latency - 60) # e.g. 180 -> ~120, floor 60ms
-
     explanation = (
-        f"By offloading {action.offload_percent}% of traffic from {action.source_cell} "
-        f"to {action.target_cell}, we reduce congestion and predict improved QoS "
-        f"(loss {before_loss:.1f}%→{after_loss:.1f}%, "
-        f"latency {before_latency:.0f}ms→{after_latency:.0f}ms)."
+        f"No traffic change planned; {action.source_cell} is expected to stay at "
+        f"loss {before_loss:.1f}%, latency {before_latency:.0f}ms."
     )
 
+    if action.action_type == "TRAFFIC_OFFLOAD":
+        for scenario in scenarios:
+            if (scenario.target_cell == action.target_cell
+                    and scenario.target_region == action.target_region
+                    and scenario.offload_percent == action.offload_percent):
+                after_loss = scenario.packet_loss_pct
+                after_latency = scenario.latency_ms
+                break
+        explanation = (
+            f"By offloading {action.offload_percent:g}% of traffic from {action.source_cell} "
+            f"to {action.target_cell}, we reduce congestion and predict improved QoS "
+            f"(loss {before_loss:.1f}%→{after_loss:.1f}%, "
+            f"latency {before_latency:.0f}ms→{after_latency:.0f}ms)."
+        )
+
     return PlanningProjection(
         before={
             "packet_loss_pct": before_loss,
@@ -325,53 +642,350 @@ def planning_agent_forecast(incident: IncidentSummary, action: PolicyAction) ->
             "latency_ms": after_latency,
             "throughput_mbps": incident.throughput_mbps
         },
-        explanation=explanation
+        explanation=explanation,
+        alternatives=[scenario.summary() for scenario in scenarios]
     )
 
 
 # -----------------------------------------------------------------------------
 # Region health snapshot for /status
+#
+# Per-region running sums are updated at ingest when a cell's latest sample is
+# replaced, so /status just divides instead of regrouping LATEST_BY_CELL.
+# Subtract-then-add accumulates float rounding error, so the sums are
+# recomputed exactly (fsum over `cells`) once every max(RESUM_EVERY, cells)
+# replacements: still amortized O(1) per sample.
+# Cell entries are rendered (incl. isoformat) once per sample, not per poll.
 # -----------------------------------------------------------------------------
 
+class RegionAggregate:
+    """
+    Running KPI sums over the latest sample of every cell in one region, plus
+    the ordered indexes behind filtered /status views (status_index.py).
+    """
+
+    RESUM_EVERY = 1024
+
+    __slots__ = ("region", "sum_latency_ms", "sum_packet_loss_pct", "sum_throughput_mbps", "cells",
+                 "order", "by_latency", "by_loss", "replacements")
+
+    def __init__(self, region: str):
+        self.region = region
+        self.sum_latency_ms = 0.0
+        self.sum_packet_loss_pct = 0.0
+        self.sum_throughput_mbps = 0.0
+        # cell_id -> rendered cell entry for RegionHealth.cells
+        self.cells: Dict[str, Dict[str, Any]] = {}
+        self.order = CellOrder()
+        self.by_latency = RankedCells()
+        self.by_loss = RankedCells()
+        self.replacements = 0   # since the sums were last recomputed
+
+    def replace(self, previous: Optional[Dict[str, Any]], latest: Dict[str, Any]) -> None:
+        if previous is not None:
+            self.sum_latency_ms -= previous["latency_ms"]
+            self.sum_packet_loss_pct -= previous["packet_loss_pct"]
+            self.sum_throughput_mbps -= previous["throughput_mbps"]
+        else:
+            self.order.add(latest["cell_id"])
+        self.by_latency.update(latest["cell_id"], latest["latency_ms"])
+        self.by_loss.update(latest["cell_id"], latest["packet_loss_pct"])
+        self.sum_latency_ms += latest["latency_ms"]
+        self.sum_packet_loss_pct += latest["packet_loss_pct"]
+        self.sum_throughput_mbps += latest["throughput_mbps"]
+        self.cells[latest["cell_id"]] = {
+            "cell_id": latest["cell_id"],
+            "latency_ms": latest["latency_ms"],
+            "packet_loss_pct": latest["packet_loss_pct"],
+            "throughput_mbps": latest["throughput_mbps"],
+            "timestamp": latest["timestamp"].isoformat()
+        }
+        if previous is not None:
+            self.replacements += 1
+            if self.replacements >= max(self.RESUM_EVERY, len(self.cells)):
+                self.resum()
+
+    def resum(self) -> None:
+        """Recompute the running sums from the cell entries, dropping accumulated drift."""
+        cells = self.cells.values()
+        self.sum_latency_ms = math.fsum(c["latency_ms"] for c in cells)
+        self.sum_packet_loss_pct = math.fsum(c["packet_loss_pct"] for c in cells)
+        self.sum_throughput_mbps = math.fsum(c["throughput_mbps"] for c in cells)
+        self.replacements = 0
+
+    def averages(self) -> Dict[str, Any]:
+        n = len(self.cells) or 1
+        return {
+            "region": self.region,
+            "avg_latency_ms": round(self.sum_latency_ms / n, 2),
+            "avg_packet_loss_pct": round(self.sum_packet_loss_pct / n, 2),
+            "avg_throughput_mbps": round(self.sum_throughput_mbps / n, 2),
+            "cell_count": len(self.cells),
+        }
+
+
+# key: region -> running aggregate over LATEST_BY_CELL entries of that region
+REGION_AGGREGATES: Dict[str, RegionAggregate] = {}
+
+
 def compute_region_health() -> List[RegionHealth]:
-    regions: Dict[str, Dict[str, Any]] = {}
-
-    # Group latest cells by region
-    for _, cell_data in LATEST_BY_CELL.items():
-        rname = cell_data["region"]
-        if rname not in regions:
-            regions[rname] = {"cells": []}
-        regions[rname]["cells"].append(cell_data)
-
-    result: List[RegionHealth] = []
-    for region_name, data in regions.items():
-        cells = data["cells"]
-        if not cells:
-            continue
+    started = time.perf_counter()
+    with STATE_LOCK:
+        snapshot = [(agg.averages(), list(agg.cells.values()))
+                    for agg in REGION_AGGREGATES.values() if agg.cells]
 
-        avg_latency = sum(c["latency_ms"] for c in cells) / len(cells)
-        avg_loss = sum(c["packet_loss_pct"] for c in cells) / len(cells)
-        avg_tp = sum(c["throughput_mbps"] for c in cells) / len(cells)
-
-        region_health = RegionHealth(
-            region=region_name,
-            avg_latency_ms=round(avg_latency, 2),
-            avg_packet_loss_pct=round(avg_loss, 2),
-            avg_throughput_mbps=round(avg_tp, 2),
-            cells=[
-                {
-                    "cell_id": c["cell_id"],
-                    "latency_ms": c["latency_ms"],
-                    "packet_loss_pct": c["packet_loss_pct"],
-                    "throughput_mbps": c["throughput_mbps"],
-                    "timestamp": c["timestamp"].isoformat()
-                }
-                for c in cells
-            ]
-        )
-        result.append(region_health)
+    regions = [RegionHealth(cells=cells, **averages) for averages, cells in snapshot]
+    _observe("region_health", started)
+    return regions
+
+
+# -----------------------------------------------------------------------------
+# Server-push status stream for the dashboard (/status/stream)
+#
+# One full snapshot on connect, then coalesced deltas: changed cells + their
+# region averages, changed incidents (incl. resolved ones), and the headline
+# incident + its diagnosis/policy/forecast when they changed (null = cleared).
+# Each delta is serialized once for all viewers. Snapshot and deltas carry
+# the STATE_VERSION they were built at: a client subscribes before its
+# snapshot is built, so it drops deltas whose version is not newer.
+# -----------------------------------------------------------------------------
+
+# how often dirty state is flushed to subscribers, and the idle keepalive
+STATUS_STREAM_INTERVAL_S = float(os.getenv("AINOA_STREAM_INTERVAL_S", "0.5"))
+STATUS_STREAM_KEEPALIVE_S = 15.0
+
+def _status_delta(take_dirty: Callable[[], Tuple[Set[Tuple[str, str]], Set[str]]]) -> Optional[Dict[str, Any]]:
+    cells: List[Dict[str, Any]] = []
+    touched_regions: Set[str] = set()
+    with STATE_LOCK:
+        # drained under the lock the marks are made under: `version` covers them exactly
+        dirty_cells, dirty_incidents = take_dirty()
+        if not (dirty_cells or dirty_incidents):
+            return None
+        for region, cell_id in dirty_cells:
+            agg = REGION_AGGREGATES.get(region)
+            entry = agg.cells.get(cell_id) if agg else None
+            if entry is not None:
+                cells.append(dict(entry, region=region))
+                touched_regions.add(region)
+        delta: Dict[str, Any] = {
+            "version": STATE_VERSION,
+            "telemetry_samples": len(TELEMETRY_STORE),
+            "regions": [REGION_AGGREGATES[r].averages() for r in sorted(touched_regions)],
+            "cells": cells,
+        }
+        if dirty_incidents:
+            # the headline and its outputs are swapped under STATE_LOCK too
+            delta["incidents"] = [_incident_json(r) for r in map(INCIDENTS.get, sorted(dirty_incidents)) if r]
+            delta["active_incident"] = jsonable_encoder(ACTIVE_INCIDENT)
+            delta["ai_diagnosis"] = AI_DIAGNOSIS
+            delta["proposed_action"] = POLICY_ACTION
+            delta["predicted_outcome"] = PLANNING_PROJECTION
+    return delta
+
+
+STATUS_STREAM = StatusBroadcaster(_status_delta, interval=STATUS_STREAM_INTERVAL_S)
+
+
+def _status_snapshot_frame() -> bytes:
+    # reuse the cached /status bytes instead of serializing the snapshot again
+    version, body = status_payload()
+    head = f'{{"version":{version},"telemetry_samples":{len(TELEMETRY_STORE)},"status":'
+    return sse_frame("snapshot", head.encode("utf-8") + body + b"}")
+
+
+@app.on_event("startup")
+async def start_status_stream():
+    STATUS_STREAM.start()
+
+
+@app.on_event("shutdown")
+async def stop_status_stream():
+    await STATUS_STREAM.stop()
+
+
+# -----------------------------------------------------------------------------
+# Sharding across uvicorn workers (sharding.py)
+#
+# Off unless AINOA_SHARDS > 1; then run uvicorn with --workers AINOA_SHARDS.
+# Each worker claims one shard and owns the cells the hash ring maps to it
+# (store, detector baselines, incidents, pipeline). Ingest for other cells
+# is forwarded to their owner; /status, /incidents etc. fan out to every
+# shard and merge, so whichever worker answers returns the same view.
+# -----------------------------------------------------------------------------
+
+SHARDS = max(1, int(os.getenv("AINOA_SHARDS", "1")))
+SHARD_BASE_PORT = int(os.getenv("AINOA_SHARD_BASE_PORT", "9700"))
+SHARDED = SHARDS > 1
+SHARD_RING = HashRing(SHARDS)
+
+# set when this worker claims its shard at startup
+SHARD_INDEX = 0
+SHARD_CLIENTS: Dict[int, ShardClient] = {}
+SHARD_SERVER: Optional[ShardServer] = None
+
+
+def shard_of(region: str, cell_id: str) -> int:
+    return SHARD_RING.owner(f"{region}:{cell_id}") if SHARDED else 0
+
+
+def _call_shard_op(op: str, args: Dict[str, Any]) -> Any:
+    """Run one of this worker's SHARD_OPS; the result is JSON-ready."""
+    fn = SHARD_OPS.get(op)
+    if fn is None:
+        raise ShardError(400, f"unknown shard op {op!r}")
+    try:
+        return jsonable_encoder(fn(**args))
+    except HTTPException as e:
+        raise ShardError(e.status_code, str(e.detail))
+
+
+def _on_shard(shard: int, op: str, args: Dict[str, Any]) -> Any:
+    """Run a shard op here or on the worker owning `shard`; failures become HTTP errors."""
+    try:
+        if shard == SHARD_INDEX:
+            return _call_shard_op(op, args)
+        return SHARD_CLIENTS[shard].call(op, args, idempotent=op in SHARD_READ_OPS)
+    except ShardError as e:
+        raise HTTPException(status_code=e.status, detail=e.detail)
+
+
+def _on_all_shards(op: str, args: Dict[str, Any]) -> List[Any]:
+    """Results indexed by shard."""
+    return [_on_shard(shard, op, args) for shard in range(SHARDS)]
+
+
+@app.on_event("startup")
+def claim_state_shard():
+    # before the WAL opens: the shard index picks this worker's WAL directory
+    global SHARD_INDEX, SHARD_SERVER
+    if not SHARDED:
+        return
+    SHARD_INDEX, sock = claim_shard(SHARDS, SHARD_BASE_PORT)
+    SHARD_SERVER = ShardServer(sock, _call_shard_op)
+    SHARD_CLIENTS.update({
+        shard: ShardClient(SHARD_BASE_PORT + shard)
+        for shard in range(SHARDS) if shard != SHARD_INDEX
+    })
+    print(f"[AINOA] worker {os.getpid()} owns shard {SHARD_INDEX}/{SHARDS}")
+
+
+# -----------------------------------------------------------------------------
+# Durability: append-only telemetry log (telemetry_wal.py)
+#
+# Off unless AINOA_WAL_DIR is set. Accepted telemetry, pipeline outputs and
+# incident changes (opened, reopened, escalated, resolved, operator
+# transitions) are group-committed to segment files; on startup the segments
+# are replayed through the normal store → detect → track path (no LLM
+# calls), so the store, snapshots, aggregates, detector baselines and
+# incidents come back. Each logged incident record is restored as logged,
+# overriding what replayed detection re-derived, so incident ids and
+# operator decisions survive a restart.
+# Sharded workers each log to AINOA_WAL_DIR/shard-<index>; keep AINOA_SHARDS
+# fixed for a given WAL directory.
+# -----------------------------------------------------------------------------
+
+WAL_DIR = os.getenv("AINOA_WAL_DIR")
+TELEMETRY_WAL: Optional[TelemetryWAL] = None
 
-    return result
+# True while the WAL is being replayed: no re-logging, no pipeline, no narration
+_REPLAYING = False
+
+
+def _pipeline_wal_record(record: TrackedIncident) -> Dict[str, Any]:
+    return {
+        "incident_id": record.incident_id,
+        "region": record.region,
+        "cell_id": record.cell_id,
+        "ai_diagnosis": record.diagnosis,
+        "proposed_action": record.policy,
+        "predicted_outcome": record.forecast,
+    }
+
+
+def _replay_telemetry(region: str, cell_id: str, epoch_s: float,
+                      packet_loss_pct: float, latency_ms: float, throughput_mbps: float) -> None:
+    # already validated when it was first accepted
+    event = TelemetryEvent.construct(
+        region=region, cell_id=cell_id, timestamp=from_epoch(epoch_s),
+        packet_loss_pct=packet_loss_pct, latency_ms=latency_ms, throughput_mbps=throughput_mbps,
+    )
+    _store_event(event)
+    _track_detection(event, detect_anomaly(event))
+
+
+def _log_incident(record: TrackedIncident, outcome: str) -> None:
+    """WAL the incident's state after a change; call under STATE_LOCK."""
+    if TELEMETRY_WAL is not None and not _REPLAYING:
+        TELEMETRY_WAL.append_json(KIND_INCIDENT, {"outcome": outcome, "incident": record.to_dict()})
+
+
+def _replay_record(kind: int, data: Dict[str, Any]) -> None:
+    with STATE_LOCK:
+        if kind == KIND_INCIDENT:
+            INCIDENTS.restore(data["incident"], data["outcome"])
+        elif kind == KIND_PIPELINE:
+            # segments written before pipeline records carried the id: by cell
+            record = (INCIDENTS.get(data["incident_id"]) if "incident_id" in data
+                      else INCIDENTS.for_cell(data["region"], data["cell_id"]))
+            if record is None or not record.active:
+                return
+            INCIDENTS.attach_outputs(record.incident_id, data["ai_diagnosis"],
+                                     data["proposed_action"], data["predicted_outcome"])
+        else:
+            return
+        _sync_headline()
+        _bump_state_version()
+
+
+def _snapshot_wal_records() -> Iterator[bytes]:
+    """Current in-memory state as WAL records, in replay order (for compaction)."""
+    per_cell = TELEMETRY_STORE.export()
+    for region, cell_id, epoch_s, loss, latency, tput in heapq.merge(*per_cell, key=lambda s: s[2]):
+        yield encode_telemetry(region, cell_id, epoch_s, loss, latency, tput)
+    with STATE_LOCK:
+        headline = INCIDENTS.headline()
+        # oldest first, so each cell's latest incident is restored last
+        records = sorted(INCIDENTS.in_states(INCIDENT_STATES), key=lambda r: r.opened_at)
+        incidents = [{"outcome": OPENED if r is headline else r.state, "incident": r.to_dict()}
+                     for r in records]
+    for incident in incidents:
+        yield encode_json(KIND_INCIDENT, incident)
+
+
+@app.on_event("startup")
+def open_telemetry_wal():
+    global TELEMETRY_WAL, _REPLAYING
+    if not WAL_DIR:
+        return
+
+    TELEMETRY_WAL = TelemetryWAL(
+        os.path.join(WAL_DIR, f"shard-{SHARD_INDEX}") if SHARDED else WAL_DIR,
+        segment_bytes=int(float(os.getenv("AINOA_WAL_SEGMENT_MB", "64")) * (1 << 20)),
+        commit_interval_s=float(os.getenv("AINOA_WAL_COMMIT_MS", "50")) / 1000.0,
+        fsync=os.getenv("AINOA_WAL_FSYNC", "1") != "0",
+        retention_s=float(os.getenv("AINOA_WAL_RETENTION_H", "24")) * 3600,
+        compact_after_segments=int(os.getenv("AINOA_WAL_COMPACT_AFTER_SEGMENTS", "4")),
+    )
+    TELEMETRY_WAL.apply_retention()
+    _REPLAYING = True
+    try:
+        stats = TELEMETRY_WAL.replay(_replay_telemetry, _replay_record)
+    finally:
+        _REPLAYING = False
+    print("[AINOA] WAL replayed:", stats)
+
+    if TELEMETRY_WAL.needs_compaction():
+        count = TELEMETRY_WAL.compact(_snapshot_wal_records())
+        print("[AINOA] WAL compacted into one segment:", count, "records")
+
+    TELEMETRY_WAL.start()
+
+
+@app.on_event("shutdown")
+def close_telemetry_wal():
+    if TELEMETRY_WAL is not None:
+        TELEMETRY_WAL.close()
 
 
 # -----------------------------------------------------------------------------
@@ -385,13 +999,692 @@ def health():
     """
     return {
         "status": "AINOA online",
-        "telemetry_samples": len(TELEMETRY_HISTORY),
-        "active_incident": ACTIVE_INCIDENT["incident_id"] if ACTIVE_INCIDENT else None
+        "telemetry_samples": len(TELEMETRY_STORE),
+        "active_incident": ACTIVE_INCIDENT["incident_id"] if ACTIVE_INCIDENT else None,
+        "incidents": INCIDENTS.counts(),
+        "stream_subscribers": STATUS_STREAM.subscriber_count,
+        "incident_pipeline": INCIDENT_PIPELINE.stats(),
+        "wal": TELEMETRY_WAL.stats() if TELEMETRY_WAL is not None else None,
+        "admission": dict(INGEST_QUEUE.stats(), rate_limited=INGEST_RATE_LIMITS.refused),
+        "binary_ingest": BINARY_INGEST.stats() if BINARY_INGEST is not None else None,
+        "llm": LLM_CLIENT.stats() if LLM_CLIENT is not None else None,
+        "shard": {
+            "index": SHARD_INDEX,
+            "shards": SHARDS,
+            "requests_served": SHARD_SERVER.requests if SHARD_SERVER is not None else 0,
+        } if SHARDED else None
+    }
+
+
+def _incident_counts() -> Dict[str, int]:
+    with STATE_LOCK:
+        return INCIDENTS.counts()
+
+
+def _pipeline_counts() -> Dict[str, int]:
+    stats = INCIDENT_PIPELINE.stats()
+    return {k: stats[k] for k in ("submitted", "coalesced", "dropped", "processed", "failed")}
+
+
+# gauges: read when /metrics is scraped, never on the ingest path
+METRICS.gauge("ainoa_telemetry_samples", "Raw samples held in per-cell history", lambda: len(TELEMETRY_STORE))
+METRICS.gauge("ainoa_telemetry_history_bytes", "Raw sample history held, compressed blocks + heads",
+              TELEMETRY_STORE.nbytes)
+METRICS.gauge("ainoa_cells_tracked", "Cells with telemetry history", TELEMETRY_STORE.cell_count)
+METRICS.gauge("ainoa_rollup_cells", "Cells with KPI rollups", TELEMETRY_ROLLUPS.cell_count)
+METRICS.gauge("ainoa_incidents", "Incidents in the table by state", _incident_counts, label="state")
+METRICS.gauge("ainoa_pipeline_queue_depth", "Incidents waiting for the Cognitive/Decision/Planning chain",
+              lambda: INCIDENT_PIPELINE.queue_depth)
+METRICS.gauge("ainoa_pipeline_in_flight", "Incident chains currently running", lambda: INCIDENT_PIPELINE.in_flight)
+METRICS.gauge("ainoa_pipeline_items_total", "Incident pipeline submissions by outcome",
+              _pipeline_counts, label="outcome", kind="counter")
+METRICS.gauge("ainoa_llm_cache_entries", "Cached diagnoses", lambda: LLM_CACHE.stats()["entries"])
+METRICS.gauge("ainoa_llm_cache_lookups_total", "Diagnosis cache lookups by result",
+              lambda: {"hit": LLM_CACHE.hits, "miss": LLM_CACHE.misses}, label="result", kind="counter")
+METRICS.gauge("ainoa_plan_memo_lookups_total", "What-if grid row lookups by result",
+              lambda: {"hit": PLANNER.hits, "miss": PLANNER.misses}, label="result", kind="counter")
+if LLM_CLIENT is not None:
+    METRICS.gauge("ainoa_llm_in_flight", "Requests in flight to the LLM provider", lambda: LLM_CLIENT.in_flight)
+    METRICS.gauge("ainoa_llm_breaker_open", "LLM circuit breaker not closed (1 = open or probing)",
+                  lambda: int(LLM_CLIENT.breaker.state != "closed"))
+    METRICS.gauge("ainoa_llm_calls_total", "LLM provider calls by outcome",
+                  lambda: dict(LLM_CLIENT.failed, ok=LLM_CLIENT.succeeded), label="outcome", kind="counter")
+METRICS.gauge("ainoa_stream_subscribers", "Connected /status/stream clients", lambda: STATUS_STREAM.subscriber_count)
+METRICS.gauge("ainoa_wal_pending_records", "WAL records buffered for the next group commit",
+              lambda: TELEMETRY_WAL.pending if TELEMETRY_WAL is not None else 0)
+METRICS.gauge("ainoa_wal_commit_errors_total", "WAL group commits that failed (the group is retried)",
+              lambda: TELEMETRY_WAL.commit_errors if TELEMETRY_WAL is not None else 0, kind="counter")
+METRICS.gauge("ainoa_state_version", "Changes visible in /status since start", lambda: STATE_VERSION)
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus scrape endpoint (text format): per-stage latency histograms,
+    ingest / anomaly / incident counters, queue depth and state sizes.
+    Sharded: every shard's series, labelled shard="<index>".
+    """
+    if SHARDED:
+        families = merge_families(_on_all_shards("metrics", {}))
+    else:
+        families = METRICS.collect()
+    return Response(content=render(families), media_type=METRICS_CONTENT_TYPE)
+
+
+def _bump_state_version() -> None:
+    global STATE_VERSION
+    STATE_VERSION += 1
+
+
+def _store_event(event: TelemetryEvent) -> Dict[str, Any]:
+    """
+    Observability Layer storage step for one sample:
+    append to the cell's ring buffer and update the per-cell snapshot.
+    """
+    return _store_events([event])[0]
+
+
+def _store_events(events: List[TelemetryEvent]) -> List[Dict[str, Any]]:
+    """
+    Storage step shared by every ingest path. A batch takes STATE_LOCK and
+    bumps STATE_VERSION once, and each stage is timed once per call.
+    """
+    # 1. append to the cells' history (bounded ring, O(1), no copying)
+    started = time.perf_counter()
+    wal = TELEMETRY_WAL if not _REPLAYING else None
+    for event in events:
+        TELEMETRY_STORE.append(
+            event.region, event.cell_id,
+            event.packet_loss_pct, event.latency_ms, event.throughput_mbps,
+            event.timestamp,
+        )
+        epoch_s = to_epoch(event.timestamp)
+        TELEMETRY_ROLLUPS.add(
+            event.region, event.cell_id, epoch_s,
+            event.packet_loss_pct, event.latency_ms, event.throughput_mbps,
+        )
+        if wal is not None:
+            # buffered only; the WAL writer thread group-commits to disk
+            wal.append_telemetry(
+                event.region, event.cell_id, epoch_s,
+                event.packet_loss_pct, event.latency_ms, event.throughput_mbps,
+            )
+    _observe("store", started)
+
+    started = time.perf_counter()
+    event_dicts = [event.dict() for event in events]
+    _observe("serialize", started)
+
+    # 2. update snapshots for these cells + their regions' running aggregates
+    started = time.perf_counter()
+    with STATE_LOCK:
+        for event, event_dict in zip(events, event_dicts):
+            cell_key = f"{event.region}:{event.cell_id}"
+            previous = LATEST_BY_CELL.get(cell_key)
+            LATEST_BY_CELL[cell_key] = event_dict
+
+            agg = REGION_AGGREGATES.get(event.region)
+            if agg is None:
+                agg = REGION_AGGREGATES[event.region] = RegionAggregate(event.region)
+            agg.replace(previous, event_dict)
+        STATUS_STREAM.mark_cells((event.region, event.cell_id) for event in events)
+        _bump_state_version()
+    _observe("snapshot", started)
+    EVENTS_INGESTED.inc(len(events))
+    return event_dicts
+
+
+def _incident_json(record: TrackedIncident) -> Dict[str, Any]:
+    data = record.to_dict()
+    for key in ("opened_at", "last_seen", "resolved_at"):
+        if data[key] is not None:
+            data[key] = from_epoch(data[key]).isoformat()
+    return data
+
+
+def _sync_headline() -> None:
+    """
+    Point the /status globals at the incident table's headline incident.
+    Caller holds STATE_LOCK.
+    """
+    global ACTIVE_INCIDENT, AI_DIAGNOSIS, POLICY_ACTION, PLANNING_PROJECTION
+
+    record = INCIDENTS.headline()
+    if record is None:
+        ACTIVE_INCIDENT = AI_DIAGNOSIS = POLICY_ACTION = PLANNING_PROJECTION = None
+        return
+    ACTIVE_INCIDENT = dict(record.summary_fields(), timestamp=from_epoch(record.last_seen))
+    AI_DIAGNOSIS = record.diagnosis
+    POLICY_ACTION = record.policy
+    PLANNING_PROJECTION = record.forecast
+
+
+def _track_anomaly(incident_obj: IncidentSummary) -> bool:
+    """
+    Fold a detected anomaly into the incident table (ingest path, cheap).
+    incident_obj.incident_id is rewritten to the tracked incident's id.
+    Returns True if the incident is new, reopened or escalated, i.e. the
+    Cognitive/Decision/Planning chain should (re)run for it.
+    """
+    with STATE_LOCK:
+        record, outcome = INCIDENTS.observe_anomaly(incident_obj.dict(), to_epoch(incident_obj.timestamp))
+        incident_obj.incident_id = record.incident_id
+        if outcome != UPDATED:
+            _log_incident(record, outcome)
+        _sync_headline()
+        _bump_state_version()
+        STATUS_STREAM.mark_incident(record.incident_id)
+    INCIDENT_EVENTS[outcome].inc()
+
+    if outcome == UPDATED or _REPLAYING:
+        return False
+
+    # console log for live demo narration
+    print(f"[AINOA] Incident {outcome}:",
+          incident_obj.region,
+          incident_obj.cell_id,
+          "loss=", incident_obj.packet_loss_pct,
+          "latency=", incident_obj.latency_ms,
+          "severity=", record.severity)
+    return True
+
+
+def _track_healthy(event: TelemetryEvent) -> bool:
+    """
+    Healthy sample: may auto-resolve the cell's incident.
+    Returns True while the cell still has an active incident.
+    """
+    with STATE_LOCK:
+        current = INCIDENTS.for_cell(event.region, event.cell_id)
+        if current is None:
+            return False
+        record = INCIDENTS.observe_healthy(event.region, event.cell_id, to_epoch(event.timestamp))
+        if record is None:
+            return current.active
+        _log_incident(record, record.state)
+        _sync_headline()
+        _bump_state_version()
+        STATUS_STREAM.mark_incident(record.incident_id)
+    INCIDENT_EVENTS["resolved"].inc()
+    if not _REPLAYING:
+        print("[AINOA] Incident resolved:", record.region, record.cell_id, record.incident_id)
+    return False
+
+
+def _run_incident_pipeline(incident_obj: IncidentSummary) -> None:
+    """
+    Cognitive → Decision → Planning chain for a tracked incident.
+    Runs on INCIDENT_PIPELINE workers (off the ingest request path).
+    Outputs are attached to the incident; if it is the headline incident
+    they also become what /status shows.
+    """
+    pipeline_started = started = time.perf_counter()
+
+    # 4a. Cognitive Layer
+    diagnosis = analyze_incident(incident_obj)
+    _observe("analyze", started)
+
+    # 4b. What-if grid, then Decision Layer / Policy Agent picks from it
+    started = time.perf_counter()
+    scenarios = plan_scenarios(incident_obj)
+    _observe("plan", started)
+    started = time.perf_counter()
+    policy = decision_layer_policy(diagnosis, incident_obj, scenarios)
+    _observe("policy", started)
+
+    # 4c. Planning Agent / Capacity Forecaster
+    started = time.perf_counter()
+    forecast = planning_agent_forecast(incident_obj, policy, scenarios)
+    _observe("forecast", started)
+    _observe("pipeline", pipeline_started)
+
+    with STATE_LOCK:
+        record = INCIDENTS.attach_outputs(incident_obj.incident_id, diagnosis.dict(), policy.dict(), forecast.dict())
+        if record is None:
+            return  # incident aged out of the table meanwhile
+        _sync_headline()
+        _bump_state_version()
+        STATUS_STREAM.mark_incident(incident_obj.incident_id)
+
+    if TELEMETRY_WAL is not None:
+        TELEMETRY_WAL.append_json(KIND_PIPELINE, _pipeline_wal_record(record))
+
+
+# background Cognitive/Decision/Planning runner, coalesced per cell
+PIPELINE_WORKERS = int(os.getenv("AINOA_PIPELINE_WORKERS", "2"))
+PIPELINE_MAX_PENDING = int(os.getenv("AINOA_PIPELINE_MAX_PENDING", "1024"))
+INCIDENT_PIPELINE = CoalescingPipeline(
+    _run_incident_pipeline, max_pending=PIPELINE_MAX_PENDING, workers=PIPELINE_WORKERS
+)
+
+
+def _submit_incident(incident_obj: IncidentSummary) -> None:
+    """
+    Hand the slow chain to the background pipeline.
+    Without a running event loop (scripts, direct calls) it runs inline.
+    """
+    cell_key = f"{incident_obj.region}:{incident_obj.cell_id}"
+    if not INCIDENT_PIPELINE.submit(cell_key, incident_obj):
+        _run_incident_pipeline(incident_obj)
+
+
+def _track_detection(event: TelemetryEvent, incident_obj: Optional[IncidentSummary]) -> bool:
+    """Feed one detection result to the incident table; True = pipeline needed."""
+    started = time.perf_counter()
+    if incident_obj is None:
+        troubled = _track_healthy(event)
+        run_pipeline = False
+    else:
+        troubled = True
+        run_pipeline = _track_anomaly(incident_obj)
+    # neighbors' offload candidates: troubled cells are never offered
+    TOPOLOGY.observe(f"{event.region}:{event.cell_id}", event.throughput_mbps, troubled)
+    _observe("track", started)
+    return run_pipeline
+
+
+@app.on_event("startup")
+async def start_incident_pipeline():
+    INCIDENT_PIPELINE.start()
+
+
+@app.on_event("shutdown")
+async def stop_incident_pipeline():
+    await INCIDENT_PIPELINE.stop()
+    if LLM_CLIENT is not None:
+        await run_in_threadpool(LLM_CLIENT.close)
+
+
+@app.get("/detector")
+def get_detector():
+    """Current anomaly detector and its parameters."""
+    return ANOMALY_DETECTOR.describe()
+
+
+def _set_detector(mode: str) -> Dict[str, Any]:
+    global ANOMALY_DETECTOR
+    try:
+        ANOMALY_DETECTOR = make_detector(mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ANOMALY_DETECTOR.describe()
+
+
+@app.post("/detector")
+def set_detector(config: DetectorConfig = Body(...)):
+    """
+    Switch anomaly detector ("static" | "ewma"). A new EWMA detector starts
+    with empty baselines (static rules cover each cell's warmup).
+    Sharded: every shard switches.
+    """
+    if SHARDED:
+        return _on_all_shards("detector", {"mode": config.mode})[SHARD_INDEX]
+    return _set_detector(config.mode)
+
+
+@app.get("/incidents/active")
+def active_incidents(limit: int = 50):
+    """
+    Open / acknowledged / mitigating incidents, worst severity first,
+    then most recently seen. Served from the incident table's state index.
+    """
+    incidents = _incidents_in_states(ACTIVE_STATES, limit)
+    return {"count": len(incidents), "incidents": incidents}
+
+
+@app.get("/incidents")
+def list_incidents(state: Optional[str] = None, limit: int = 100):
+    """
+    Incidents in one state (?state=open|acknowledged|mitigating|resolved),
+    or all active ones by default.
+    """
+    if state is not None and state not in INCIDENT_STATES:
+        raise HTTPException(status_code=400, detail=f"state must be one of {', '.join(INCIDENT_STATES)}")
+    incidents = _incidents_in_states((state,) if state else ACTIVE_STATES, limit)
+    return {"count": len(incidents), "incidents": incidents}
+
+
+def _local_incidents(states: List[str], limit: Optional[int]) -> List[Dict[str, Any]]:
+    with STATE_LOCK:
+        return [_incident_json(r) for r in INCIDENTS.in_states(tuple(states), limit=limit)]
+
+
+def _incidents_in_states(states: Tuple[str, ...], limit: int) -> List[Dict[str, Any]]:
+    """Same order as IncidentTable.in_states(); sharded: merged over all shards."""
+    if not SHARDED:
+        return _local_incidents(list(states), limit)
+    merged = [i for part in _on_all_shards("incidents", {"states": list(states), "limit": limit}) for i in part]
+    # worst severity first, then most recently seen (ISO timestamps sort as text)
+    merged.sort(key=lambda i: i["last_seen"], reverse=True)
+    merged.sort(key=lambda i: SEVERITY_RANK.get(i["severity"], 0), reverse=True)
+    return merged[:limit]
+
+
+def _local_incident(incident_id: str) -> Dict[str, Any]:
+    with STATE_LOCK:
+        record = INCIDENTS.get(incident_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="incident not found")
+        return _incident_json(record)
+
+
+def _on_incident_shard(op: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    """Incident ids don't encode their cell: ask each shard until one has it."""
+    for shard in range(SHARDS):
+        try:
+            return _on_shard(shard, op, args)
+        except HTTPException as e:
+            if e.status_code != 404:
+                raise
+    raise HTTPException(status_code=404, detail="incident not found")
+
+
+@app.get("/incidents/{incident_id}")
+def get_incident(incident_id: str):
+    if SHARDED:
+        return _on_incident_shard("incident", {"incident_id": incident_id})
+    return _local_incident(incident_id)
+
+
+def _transition_incident(incident_id: str, state: str) -> Dict[str, Any]:
+    with STATE_LOCK:
+        try:
+            record = INCIDENTS.transition(incident_id, state, at=time.time())
+        except KeyError:
+            raise HTTPException(status_code=404, detail="incident not found")
+        except InvalidTransition as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        _log_incident(record, state)
+        _sync_headline()
+        _bump_state_version()
+        STATUS_STREAM.mark_incident(incident_id)
+        data = _incident_json(record)
+    return data
+
+
+def _route_transition(incident_id: str, state: str) -> Dict[str, Any]:
+    if SHARDED:
+        return _on_incident_shard("transition", {"incident_id": incident_id, "state": state})
+    return _transition_incident(incident_id, state)
+
+
+@app.post("/incidents/{incident_id}/acknowledge")
+def acknowledge_incident(incident_id: str):
+    """NOC engineer has seen it."""
+    return _route_transition(incident_id, "acknowledged")
+
+
+@app.post("/incidents/{incident_id}/mitigate")
+def mitigate_incident(incident_id: str):
+    """Mitigation (e.g. the proposed offload) is being applied."""
+    return _route_transition(incident_id, "mitigating")
+
+
+@app.post("/incidents/{incident_id}/resolve")
+def resolve_incident(incident_id: str):
+    """Close it by hand (healthy samples also auto-resolve)."""
+    return _route_transition(incident_id, "resolved")
+
+
+@app.get("/llm/cache")
+def llm_cache_stats():
+    """
+    Cognitive Layer diagnosis cache: size, TTL, hit/miss counters
+    (sharded: summed over every shard's cache).
+    """
+    if not SHARDED:
+        return LLM_CACHE.stats()
+    parts = _on_all_shards("llm_cache_stats", {})
+    merged = dict(parts[0])
+    for key in ("entries", "max_entries", "hits", "misses", "expired", "evicted", "invalidated"):
+        merged[key] = sum(p[key] for p in parts)
+    lookups = merged["hits"] + merged["misses"]
+    merged["hit_ratio"] = round(merged["hits"] / lookups, 4) if lookups else 0.0
+    return merged
+
+
+@app.delete("/llm/cache")
+def llm_cache_invalidate(region: Optional[str] = None, cell_id: Optional[str] = None):
+    """
+    Explicit invalidation hook: drop cached diagnoses for one cell
+    (?region=&cell_id=), a region (?region=) or everything (no params).
+    """
+    if SHARDED:
+        args = {"region": region, "cell_id": cell_id}
+        if region is not None and cell_id is not None:
+            removed = _on_shard(shard_of(region, cell_id), "llm_cache_invalidate", args)
+        else:
+            removed = sum(_on_all_shards("llm_cache_invalidate", args))
+    else:
+        removed = LLM_CACHE.invalidate(region=region, cell_id=cell_id)
+    return {"status": "ok", "invalidated": removed}
+
+
+# most buckets one /telemetry/query may return
+QUERY_MAX_BUCKETS = 2000
+
+
+def _query_rollups(region: str, cell_id: str, start_s: float, end_s: float, step_s: float) -> Dict[str, Any]:
+    result = TELEMETRY_ROLLUPS.query(region, cell_id, start_s, end_s, step_s)
+    if result is None:
+        raise HTTPException(status_code=404, detail="no telemetry for this cell")
+    for bucket in result["buckets"]:
+        bucket["start"] = from_epoch(bucket["start"]).isoformat()
+    return {
+        "region": region,
+        "cell_id": cell_id,
+        "from": from_epoch(start_s).isoformat(),
+        "to": from_epoch(end_s).isoformat(),
+        **result,
+    }
+
+
+@app.get("/telemetry/query")
+def query_telemetry(region: str, cell_id: str,
+                    from_: Optional[datetime] = Query(None, alias="from"),
+                    to: Optional[datetime] = None,
+                    step: float = 60.0):
+    """
+    KPI history for one cell: ?region=&cell_id=&from=&to=&step=
+    (from/to ISO-8601 or epoch seconds, default the last hour; step in
+    seconds, default 60).
+
+    Each bucket has count and min/max/avg/p95 per KPI. Answered from the
+    coarsest precomputed rollup tier that resolves `step` (step is raised
+    to that tier's width if finer), never from raw samples; empty buckets
+    are left out. p95 is a histogram estimate within ~2.5%.
+    """
+    end_s = to_epoch(to) if to is not None else time.time()
+    start_s = to_epoch(from_) if from_ is not None else end_s - 3600.0
+    if step <= 0:
+        raise HTTPException(status_code=400, detail="step must be > 0")
+    if end_s <= start_s:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    if (end_s - start_s) / max(step, TELEMETRY_ROLLUPS.tiers[0][0]) > QUERY_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"more than {QUERY_MAX_BUCKETS} buckets; raise step")
+
+    args = {"region": region, "cell_id": cell_id, "start_s": start_s, "end_s": end_s, "step_s": step}
+    owner = shard_of(region, cell_id)
+    if owner != SHARD_INDEX:
+        return _on_shard(owner, "query", args)
+    return _query_rollups(**args)
+
+
+# most raw samples one /telemetry/samples may return
+SAMPLES_MAX = 5000
+
+
+def _query_samples(region: str, cell_id: str, start_s: float, end_s: float, limit: int) -> Dict[str, Any]:
+    # decoded a block at a time; blocks outside [start_s, end_s) are skipped
+    rows = TELEMETRY_STORE.iter_samples(region, cell_id, start_s, end_s)
+    samples = list(itertools.islice(rows, limit + 1))
+    for sample in samples:
+        sample["timestamp"] = sample["timestamp"].isoformat()
+        del sample["region"], sample["cell_id"]
+    return {
+        "region": region,
+        "cell_id": cell_id,
+        "from": from_epoch(start_s).isoformat(),
+        "to": from_epoch(end_s).isoformat(),
+        "truncated": len(samples) > limit,
+        "samples": samples[:limit],
     }
 
 
+@app.get("/telemetry/samples")
+def telemetry_samples(region: str, cell_id: str,
+                      from_: Optional[datetime] = Query(None, alias="from"),
+                      to: Optional[datetime] = None,
+                      limit: int = Query(1000, ge=1, le=SAMPLES_MAX)):
+    """
+    Raw retained samples for one cell, oldest first: ?region=&cell_id=&from=&to=&limit=
+    (default the last hour). "truncated" is true if more than `limit`
+    samples fall in the range; narrow it or use /telemetry/query rollups.
+    """
+    end_s = to_epoch(to) if to is not None else time.time()
+    start_s = to_epoch(from_) if from_ is not None else end_s - 3600.0
+    if end_s <= start_s:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+
+    args = {"region": region, "cell_id": cell_id, "start_s": start_s, "end_s": end_s, "limit": limit}
+    owner = shard_of(region, cell_id)
+    if owner != SHARD_INDEX:
+        return _on_shard(owner, "samples", args)
+    return _query_samples(**args)
+
+
+@app.post("/telemetry/retention")
+def set_retention(req: RetentionRequest = Body(...)):
+    """
+    Change how many raw samples are kept for one cell.
+    Applies immediately (newest samples kept) and to cells not seen yet.
+    """
+    owner = shard_of(req.region, req.cell_id)
+    if owner != SHARD_INDEX:
+        return _on_shard(owner, "retention", req.dict())
+    return _set_retention(req.region, req.cell_id, req.samples)
+
+
+def _set_retention(region: str, cell_id: str, samples: int) -> Dict[str, Any]:
+    TELEMETRY_STORE.set_retention(region, cell_id, samples)
+    return {
+        "status": "ok",
+        "region": region,
+        "cell_id": cell_id,
+        "samples": TELEMETRY_STORE.retention(region, cell_id)
+    }
+
+
+# -----------------------------------------------------------------------------
+# Ingest admission control (admission.py)
+#
+# Token buckets per source and per region, then a bounded queue in front of
+# the ingest threads. The source is the peer address (or, behind a trusted
+# proxy, the header named by AINOA_CLIENT_IP_HEADER); X-Collector-Id is
+# client-chosen, so it only labels the 429 and never picks a bucket.
+# Sharded, shard 0 holds the buckets for every worker ("admit" op), so the
+# limits stay global instead of multiplying by the worker count.
+# Samples over the static thresholds are HIGH priority whatever detector is
+# active: exempt from the rate limits (but charged) and allowed into the part
+# of the queue bulk samples can't fill. Refused → 429 + Retry-After.
+# Each sample costs one token, so the defaults are sized for batch
+# collectors: a collector's burst holds two 10k-event batches and its rate
+# sustains one per second; a region's allows a few such collectors.
+# -----------------------------------------------------------------------------
+
+INGEST_RATE_LIMITS = RateLimiter({
+    "collector": parse_rate(os.getenv("AINOA_RATE_LIMIT_COLLECTOR", "10000:20000")),
+    "region": parse_rate(os.getenv("AINOA_RATE_LIMIT_REGION", "50000:100000")),
+})
+INGEST_QUEUE = AdmissionQueue(
+    max_in_flight=int(os.getenv("AINOA_INGEST_MAX_IN_FLIGHT", "16")),  # threadpool is 40
+    max_queued=int(os.getenv("AINOA_INGEST_MAX_QUEUED", "256")),
+    bulk_share=float(os.getenv("AINOA_INGEST_BULK_QUEUE_SHARE", "0.5")),
+)
+PRIORITY_RULES = StaticThresholdDetector()
+
+INGEST_SHED = {
+    (reason, priority): METRICS.counter("ainoa_ingest_shed_total", "Telemetry samples refused by admission control",
+                                        {"reason": reason, "priority": PRIORITY_NAMES[priority]})
+    for reason, priority in (("rate_limited", BULK), ("queue_full", BULK), ("queue_full", HIGH))
+}
+METRICS.gauge("ainoa_ingest_in_flight", "Ingest requests holding a worker thread", lambda: INGEST_QUEUE.in_flight)
+METRICS.gauge("ainoa_ingest_queued", "Ingest requests waiting for admission", lambda: INGEST_QUEUE.queued)
+
+# e.g. "x-forwarded-for"; only set when a proxy you run always sets it
+CLIENT_IP_HEADER = os.getenv("AINOA_CLIENT_IP_HEADER", "").strip().lower()
+
+
+def _ingest_source(request: Request) -> str:
+    """Rate-limit key: who sent it as far as the transport can tell."""
+    if CLIENT_IP_HEADER:
+        forwarded = request.headers.get(CLIENT_IP_HEADER, "")
+        if forwarded:
+            # the proxy appends the address it saw; earlier entries are the client's word
+            return forwarded.rsplit(",", 1)[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _rate_limited(request: Request, source: str, wait: float) -> HTTPException:
+    collector = request.headers.get("x-collector-id")
+    who = f"collector {collector!r} at {source}" if collector else source
+    return _too_many(f"rate limit exceeded for {who} or its region", wait)
+
+
+def _ingest_priority(event: TelemetryEvent) -> int:
+    looks_anomalous = PRIORITY_RULES.observe(event.region, event.cell_id, event.packet_loss_pct,
+                                             event.latency_ms, event.throughput_mbps)
+    return HIGH if looks_anomalous else BULK
+
+
+def _admit(source: str, regions: List[str], exempt: List[bool]) -> Dict[str, Any]:
+    """Charge this worker's buckets (shard 0's serve every worker when sharded)."""
+    admitted, wait = INGEST_RATE_LIMITS.admit([
+        ((("collector", source), ("region", region)), is_exempt)
+        for region, is_exempt in zip(regions, exempt)
+    ])
+    return {"admitted": admitted, "wait": wait}
+
+
+async def _rate_limit(source: str, events: List[TelemetryEvent],
+                      priorities: List[int]) -> Tuple[List[bool], float]:
+    """Per-event admitted flags + suggested Retry-After; refused ones are counted."""
+    args = {"source": source, "regions": [event.region for event in events],
+            "exempt": [priority == HIGH for priority in priorities]}
+    if SHARDED:
+        result = await run_in_threadpool(_on_shard, 0, "admit", args)
+    else:
+        result = _admit(**args)
+    admitted, wait = result["admitted"], result["wait"]
+    refused = admitted.count(False)
+    if refused:
+        INGEST_SHED[("rate_limited", BULK)].inc(refused)
+    return admitted, wait
+
+
+def _too_many(detail: str, retry_after_s: float) -> HTTPException:
+    return HTTPException(status_code=429, detail=detail,
+                         headers={"Retry-After": retry_after_header(retry_after_s)})
+
+
+@asynccontextmanager
+async def _ingest_slot(priorities: List[int]):
+    """Hold one INGEST_QUEUE slot, at the best priority in the request."""
+    priority = min(priorities, default=BULK)
+    try:
+        await INGEST_QUEUE.acquire(priority)
+    except Overloaded as e:
+        for p in priorities:
+            INGEST_SHED[("queue_full", p)].inc()
+        raise _too_many("ingest queue full, retry later", e.retry_after_s)
+    try:
+        yield
+    finally:
+        INGEST_QUEUE.release()
+
+
 @app.post("/telemetry/push")
-def push_telemetry(event: TelemetryEvent = Body(...)):
+async def push_telemetry(request: Request, event: TelemetryEvent = Body(...)):
     """
     Observability Layer ingress.
     (Prod version could be Kinesis consumer / OpenTelemetry receiver.)
@@ -400,88 +1693,359 @@ def push_telemetry(event: TelemetryEvent = Body(...)):
     1. Store telemetry
     2. Update per-cell snapshot
     3. Run anomaly detection
-    4. If anomaly: run Cognitive, Decision, Planning → cache results
+    4. Track it in the incident table (repeats update the cell's open incident,
+       healthy samples count towards auto-resolve)
+    5. New/reopened/escalated incident: queue Cognitive, Decision, Planning
+       (background) → results attached to the incident
+
+    Returns as soon as the sample is stored and detection has run.
+    Sharded: forwarded to the worker that owns the cell.
+    429 + Retry-After when the collector/region is over its rate limit or the
+    ingest queue is full (anomalous samples are refused last).
     """
-    global TELEMETRY_HISTORY, LATEST_BY_CELL
-    global ACTIVE_INCIDENT, AI_DIAGNOSIS, POLICY_ACTION, PLANNING_PROJECTION
+    priorities = [_ingest_priority(event)]
+    source = _ingest_source(request)
+    admitted, wait = await _rate_limit(source, [event], priorities)
+    if not admitted[0]:
+        raise _rate_limited(request, source, wait)
+    async with _ingest_slot(priorities):
+        return await run_in_threadpool(_route_push, event)
+
 
-    # 1. append to rolling history
-    event_dict = event.dict()
-    TELEMETRY_HISTORY.append(event_dict)
+def _route_push(event: TelemetryEvent) -> Dict[str, Any]:
+    owner = shard_of(event.region, event.cell_id)
+    if owner != SHARD_INDEX:
+        return _on_shard(owner, "push", {"event": jsonable_encoder(event)})
+    return _push_event(event)
 
-    # keep history bounded
-    if len(TELEMETRY_HISTORY) > 200:
-        TELEMETRY_HISTORY = TELEMETRY_HISTORY[-200:]
 
-    # 2. update snapshot for this cell
-    cell_key = f"{event.region}:{event.cell_id}"
-    LATEST_BY_CELL[cell_key] = event_dict
+def _push_event(event: TelemetryEvent) -> Dict[str, Any]:
+    started = time.perf_counter()
+    event_dict = _store_event(event)
 
     # 3. anomaly detection
     incident_obj = detect_anomaly(event)
 
-    if incident_obj:
-        # set ACTIVE_INCIDENT
-        ACTIVE_INCIDENT = incident_obj.dict()
+    if _track_detection(event, incident_obj):
+        _submit_incident(incident_obj)
+    _observe("push", started)
+
+    return {
+        "status": "ok",
+        "stored": event_dict,
+        "anomaly_detected": bool(incident_obj),
+        "incident_id": incident_obj.incident_id if incident_obj else None,
+        "active_incident_id": ACTIVE_INCIDENT.get("incident_id") if ACTIVE_INCIDENT else None
+    }
 
-        # console log for live demo narration
-        print("[AINOA] Incident detected:",
-              ACTIVE_INCIDENT["region"],
-              ACTIVE_INCIDENT["cell_id"],
-              "loss=", ACTIVE_INCIDENT["packet_loss_pct"],
-              "latency=", ACTIVE_INCIDENT["latency_ms"],
-              "severity=", ACTIVE_INCIDENT["severity"])
 
-        # 4a. Cognitive Layer
-        diagnosis = analyze_incident(incident_obj)
-        AI_DIAGNOSIS = diagnosis.dict()
+# max validation errors echoed back per batch (the counts are always exact)
+BATCH_MAX_REPORTED_ERRORS = 50
 
-        # 4b. Decision Layer / Policy Agent
-        policy = decision_layer_policy(diagnosis, incident_obj)
-        POLICY_ACTION = policy.dict()
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
 
-        # 4c. Planning Agent / Capacity Forecaster
-        forecast = planning_agent_forecast(incident_obj, policy)
-        PLANNING_PROJECTION = forecast.dict()
+
+def _validate_batch(items: List[Any]) -> Tuple[List[TelemetryEvent], List[Dict[str, Any]]]:
+    """
+    Validate a whole batch up front, before anything touches the store.
+    Bad items are reported by index; good items are kept in arrival order.
+    """
+    started = time.perf_counter()
+    events: List[TelemetryEvent] = []
+    errors: List[Dict[str, Any]] = []
+    for index, item in enumerate(items):
+        try:
+            events.append(TelemetryEvent.parse_obj(item))
+        except (ValidationError, TypeError) as e:
+            errors.append({"index": index, "error": str(e)})
+    _observe("validate_batch", started)
+    return events, errors
+
+
+def _ingest_batch(events: List[TelemetryEvent]) -> Dict[str, Any]:
+    """
+    Store every event, run the detector over the whole batch, then track the
+    results in order. The incident pipeline is submitted once per incident
+    that needed it, with the newest sample.
+    "incidents" lists each incident the batch touched once, newest last.
+    """
+    started = time.perf_counter()
+    _store_events(events)
+
+    anomalies = 0
+    touched: Dict[str, IncidentSummary] = {}
+    to_run: Dict[str, IncidentSummary] = {}
+    for event, incident_obj in zip(events, detect_anomalies(events)):
+        run_pipeline = _track_detection(event, incident_obj)
+        if incident_obj is None:
+            continue
+        anomalies += 1
+        touched.pop(incident_obj.incident_id, None)  # re-insert so dict order = recency
+        touched[incident_obj.incident_id] = incident_obj
+        if run_pipeline or incident_obj.incident_id in to_run:
+            to_run[incident_obj.incident_id] = incident_obj
+
+    for incident_obj in to_run.values():
+        _submit_incident(incident_obj)
+    _observe("ingest_batch", started)
+
+    return {
+        "accepted": len(events),
+        "anomalies": anomalies,
+        "incidents": [i.dict() for i in touched.values()],
+    }
+
+
+def _route_batch(events: List[TelemetryEvent]) -> Dict[str, Any]:
+    """
+    Sharded batch ingest: split by owning shard (arrival order is kept within
+    each cell) and ingest each part on its owner. Incidents are listed per
+    shard, so "newest last" only holds within one shard's part.
+    """
+    parts: Dict[int, List[TelemetryEvent]] = {}
+    for event in events:
+        parts.setdefault(shard_of(event.region, event.cell_id), []).append(event)
+
+    merged: Dict[str, Any] = {"accepted": 0, "anomalies": 0, "incidents": []}
+    for shard, part in sorted(parts.items()):
+        if shard == SHARD_INDEX:
+            result = _ingest_batch(part)
+        else:
+            result = _on_shard(shard, "ingest", {"events": jsonable_encoder([e.dict() for e in part])})
+        merged["accepted"] += result["accepted"]
+        merged["anomalies"] += result["anomalies"]
+        merged["incidents"].extend(result["incidents"])
+    return merged
+
+
+async def _read_ndjson(request: Request) -> List[Any]:
+    """
+    Parse a streamed NDJSON body line by line as chunks arrive, so a large
+    upload never has to be buffered as one string. Unparseable lines are kept
+    as raw strings and rejected by validation with their line index.
+    application/json-seq (RFC 7464) records start with an RS (0x1E) byte,
+    which is dropped.
+    """
+    items: List[Any] = []
+    pending = b""
+
+    def parse_line(line: bytes) -> None:
+        line = line.strip().lstrip(b"\x1e")
+        if not line:
+            return
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError:
+            items.append(line.decode("utf-8", errors="replace"))
+
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            parse_line(line)
+    parse_line(pending)
+    return items
+
+
+@app.post("/telemetry/push/batch")
+async def push_telemetry_batch(request: Request):
+    """
+    Batch Observability Layer ingress for collectors.
+
+    Body is either a JSON array of TelemetryEvent objects or an NDJSON stream
+    (Content-Type: application/x-ndjson), one event per line.
+
+    Same store/snapshot/anomaly semantics as /telemetry/push, but the whole
+    batch is validated in one pass and invalid items are reported by index
+    instead of failing the request.
+
+    Admission: healthy samples over the collector/region rate limit are shed
+    (counted in "shed", with "retry_after_s"); anomalous ones are always
+    kept. 429 if nothing was admitted, or the ingest queue is full.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in NDJSON_CONTENT_TYPES:
+        items = await _read_ndjson(request)
+    else:
+        try:
+            items = json.loads(await request.body())
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"invalid JSON body: {e}")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="expected a JSON array of telemetry events")
+
+    events, errors = _validate_batch(items)
+
+    priorities = [_ingest_priority(event) for event in events]
+    source = _ingest_source(request)
+    admitted, wait = await _rate_limit(source, events, priorities)
+    shed = admitted.count(False)
+    if shed:
+        if shed == len(events):
+            raise _rate_limited(request, source, wait)
+        events = [event for event, ok in zip(events, admitted) if ok]
+        priorities = [priority for priority, ok in zip(priorities, admitted) if ok]
+
+    # storage + detection are CPU-bound; keep them off the event loop
+    ingest = _route_batch if SHARDED else _ingest_batch
+    async with _ingest_slot(priorities):
+        result = await run_in_threadpool(ingest, events)
 
     return {
         "status": "ok",
-        "stored": event_dict,
-        "anomaly_detected": bool(incident_obj),
+        "received": len(items),
+        "accepted": result["accepted"],
+        "rejected": len(errors),
+        "shed": shed,
+        "retry_after_s": round(wait, 3) if shed else None,
+        "anomalies": result["anomalies"],
+        "incidents": result["incidents"],
+        "errors": errors[:BATCH_MAX_REPORTED_ERRORS],
         "active_incident_id": ACTIVE_INCIDENT.get("incident_id") if ACTIVE_INCIDENT else None
     }
 
 
-@app.get("/status", response_model=StatusResponse)
-def get_status():
+# -----------------------------------------------------------------------------
+# Binary ingress (binary_ingest.py)
+#
+# Off unless AINOA_BINARY_TCP_PORT and/or AINOA_BINARY_UDP_PORT is set.
+# Decoded records skip HTTP, JSON and pydantic validation (struct already
+# typed them; _decode_samples rejects NaN/Infinity as TelemetryEvent does)
+# and enter the same _ingest_batch path as /telemetry/push/batch, behind
+# the same admission queue. TCP never sheds: a full queue just delays
+# the frame's ACK (backpressure). UDP has no way to say "retry", so it is
+# rate limited and shed like HTTP. Sharded: only shard 0 listens and
+# _route_batch forwards to the owners.
+# -----------------------------------------------------------------------------
+
+def _optional_port(name: str) -> Optional[int]:
+    value = os.getenv(name, "").strip()
+    return int(value) if value else None
+
+
+BINARY_HOST = os.getenv("AINOA_BINARY_HOST", "127.0.0.1")
+BINARY_TCP_PORT = _optional_port("AINOA_BINARY_TCP_PORT")
+BINARY_UDP_PORT = _optional_port("AINOA_BINARY_UDP_PORT")
+BINARY_INGEST: Optional[BinaryIngestServer] = None
+
+
+class PretypedEvent:
+    """
+    TelemetryEvent stand-in for samples whose types are already guaranteed
+    (struct-decoded binary records): same attributes and dict(), without
+    pydantic's construction cost.
     """
-    Powers the AINOA Console dashboard.
-    Frontend polls this every ~2s.
 
-    Returns:
-    - regions: snapshot health per region
-    - active_incident: most recent triggered incident
-    - ai_diagnosis: Cognitive Layer human-readable reasoning
-    - proposed_action: Decision Layer machine-actionable intent
-    - predicted_outcome: Planning Agent forecast
+    __slots__ = ("region", "cell_id", "packet_loss_pct", "latency_ms", "throughput_mbps", "timestamp")
+
+    def __init__(self, region: str, cell_id: str, packet_loss_pct: float, latency_ms: float,
+                 throughput_mbps: float, timestamp: datetime):
+        self.region = region
+        self.cell_id = cell_id
+        self.packet_loss_pct = packet_loss_pct
+        self.latency_ms = latency_ms
+        self.throughput_mbps = throughput_mbps
+        self.timestamp = timestamp
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            "region": self.region,
+            "cell_id": self.cell_id,
+            "packet_loss_pct": self.packet_loss_pct,
+            "latency_ms": self.latency_ms,
+            "throughput_mbps": self.throughput_mbps,
+            "timestamp": self.timestamp,
+        }
+
+
+def _binary_events(records: List[BinaryRecord]) -> List[PretypedEvent]:
+    return [
+        PretypedEvent(region, cell_id, loss, latency, tput, from_epoch(epoch_s))
+        for region, cell_id, loss, latency, tput, epoch_s in records
+    ]
+
+
+async def _ingest_binary(collector: str, records: List[BinaryRecord], reliable: bool) -> Tuple[int, int]:
+    events = _binary_events(records)
+    priorities = [_ingest_priority(event) for event in events]
+    if not reliable:
+        # UDP collectors are "udp:<address>": limited per address
+        admitted, _ = await _rate_limit(collector.split(":", 1)[1], events, priorities)
+        events = [event for event, ok in zip(events, admitted) if ok]
+        priorities = [priority for priority, ok in zip(priorities, admitted) if ok]
+    if not events:
+        return 0, 0
+
+    while True:
+        try:
+            await INGEST_QUEUE.acquire(min(priorities))
+            break
+        except Overloaded as e:
+            if not reliable:
+                for p in priorities:
+                    INGEST_SHED[("queue_full", p)].inc()
+                return 0, 0
+            await asyncio.sleep(e.retry_after_s)
+    try:
+        ingest = _route_batch if SHARDED else _ingest_batch
+        result = await run_in_threadpool(ingest, events)
+    finally:
+        INGEST_QUEUE.release()
+    return result["accepted"], result["anomalies"]
+
+
+@app.on_event("startup")
+async def start_binary_ingest():
+    global BINARY_INGEST
+    if BINARY_TCP_PORT is None and BINARY_UDP_PORT is None:
+        return
+    if SHARDED and SHARD_INDEX != 0:
+        return
+    BINARY_INGEST = BinaryIngestServer(_ingest_binary, host=BINARY_HOST,
+                                       tcp_port=BINARY_TCP_PORT, udp_port=BINARY_UDP_PORT)
+    await BINARY_INGEST.start()
+    print(f"[AINOA] Binary ingest listening on {BINARY_HOST} (tcp={BINARY_TCP_PORT}, udp={BINARY_UDP_PORT})")
+
+
+@app.on_event("shutdown")
+async def stop_binary_ingest():
+    if BINARY_INGEST is not None:
+        await BINARY_INGEST.stop()
+
+
+METRICS.gauge("ainoa_binary_samples_total", "Samples applied from the binary TCP/UDP ingress",
+              lambda: BINARY_INGEST.samples if BINARY_INGEST is not None else 0, kind="counter")
+
+
+def build_status() -> StatusResponse:
     """
-    regions_health = compute_region_health()
+    Assemble the full /status document from the cached layer outputs.
+    """
+    return _status_model(compute_region_health(), ACTIVE_INCIDENT,
+                         AI_DIAGNOSIS, POLICY_ACTION, PLANNING_PROJECTION)
+
 
+def _status_model(regions_health: List[RegionHealth],
+                  active_incident: Optional[Dict[str, Any]],
+                  ai_diagnosis: Optional[Dict[str, Any]],
+                  proposed_action: Optional[Dict[str, Any]],
+                  predicted_outcome: Optional[Dict[str, Any]]) -> StatusResponse:
     active_incident_model: Optional[IncidentSummary] = None
-    if ACTIVE_INCIDENT:
-        active_incident_model = IncidentSummary(**ACTIVE_INCIDENT)
+    if active_incident:
+        active_incident_model = IncidentSummary(**active_incident)
 
     ai_diag_model: Optional[AIDiagnosis] = None
-    if AI_DIAGNOSIS:
-        ai_diag_model = AIDiagnosis(**AI_DIAGNOSIS)
+    if ai_diagnosis:
+        ai_diag_model = AIDiagnosis(**ai_diagnosis)
 
     policy_model: Optional[PolicyAction] = None
-    if POLICY_ACTION:
-        policy_model = PolicyAction(**POLICY_ACTION)
+    if proposed_action:
+        policy_model = PolicyAction(**proposed_action)
 
     planning_model: Optional[PlanningProjection] = None
-    if PLANNING_PROJECTION:
-        planning_model = PlanningProjection(**PLANNING_PROJECTION)
+    if predicted_outcome:
+        planning_model = PlanningProjection(**predicted_outcome)
 
     return StatusResponse(
         regions=regions_health,
@@ -492,6 +2056,372 @@ def get_status():
     )
 
 
+def status_payload() -> Tuple[int, bytes]:
+    """
+    Serialized StatusResponse for the current STATE_VERSION, built at most
+    once per version. The version is read *before* building, so a cached
+    payload is never older than the version it is filed under.
+    """
+    global _STATUS_CACHE
+    version = STATE_VERSION
+    cached_version, cached_body = _STATUS_CACHE
+    if cached_version == version:
+        return version, cached_body
+
+    started = time.perf_counter()
+    body = build_status().json().encode("utf-8")
+    _observe("status_build", started)
+    _STATUS_CACHE = (version, body)
+    return version, body
+
+
+def _status_etag(version: int) -> str:
+    return f'"{BOOT_ID}-{version}"'
+
+
+def _status_part(known: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """
+    This shard's share of /status: raw region sums (so averages can be
+    merged exactly), rendered cells and its headline incident + outputs.
+    `known` = [boot_id, version] the caller already holds → version only.
+    """
+    with STATE_LOCK:
+        part: Dict[str, Any] = {"boot": BOOT_ID, "version": STATE_VERSION}
+        if known == [BOOT_ID, STATE_VERSION]:
+            return part
+        part["regions"] = [
+            {
+                "region": agg.region,
+                "sums": [agg.sum_latency_ms, agg.sum_packet_loss_pct, agg.sum_throughput_mbps],
+                "cells": list(agg.cells.values()),
+            }
+            for agg in REGION_AGGREGATES.values() if agg.cells
+        ]
+        part["headline"] = _headline_part()
+    part["telemetry_samples"] = len(TELEMETRY_STORE)
+    return part
+
+
+def _headline_part() -> Optional[Dict[str, Any]]:
+    """This shard's headline incident + outputs. Caller holds STATE_LOCK."""
+    record = INCIDENTS.headline()
+    return None if record is None else {
+        # cross-shard pick: worst severity, then most recently seen
+        "rank": [SEVERITY_RANK.get(record.severity, 0), record.last_seen],
+        "active_incident": jsonable_encoder(ACTIVE_INCIDENT),
+        "ai_diagnosis": AI_DIAGNOSIS,
+        "proposed_action": POLICY_ACTION,
+        "predicted_outcome": PLANNING_PROJECTION,
+    }
+
+
+# last status_part seen per shard, and the merged document built from them:
+# (etag, summed version, telemetry samples, serialized StatusResponse).
+# /status runs in the threadpool: the lock covers reading and replacing both,
+# never the shard calls or the merge.
+_SHARD_STATUS_PARTS: Dict[int, Dict[str, Any]] = {}
+_MERGED_STATUS: Tuple[str, int, int, bytes] = ("", -1, 0, b"")
+_SHARD_STATUS_LOCK = threading.Lock()
+
+
+def sharded_status() -> Tuple[str, int, int, bytes]:
+    """
+    /status across all shards. Each shard only resends its part when its
+    version moved, and the merged body is rebuilt only when some part did.
+    """
+    global _MERGED_STATUS
+    parts: List[Dict[str, Any]] = []
+    for shard in range(SHARDS):
+        with _SHARD_STATUS_LOCK:
+            cached = _SHARD_STATUS_PARTS.get(shard)
+        known = [cached["boot"], cached["version"]] if cached else None
+        part = _on_shard(shard, "status_part", {"known": known})
+        if "regions" in part:
+            with _SHARD_STATUS_LOCK:
+                # a concurrent request may have stored a newer part meanwhile
+                latest = _SHARD_STATUS_PARTS.get(shard)
+                if latest is None or latest["boot"] != part["boot"] or latest["version"] <= part["version"]:
+                    _SHARD_STATUS_PARTS[shard] = latest = part
+            cached = latest
+        parts.append(cached)
+
+    key = "|".join(f"{p['boot']}-{p['version']}" for p in parts)
+    etag = '"' + hashlib.blake2b(key.encode("ascii"), digest_size=8).hexdigest() + '"'
+    with _SHARD_STATUS_LOCK:
+        merged = _MERGED_STATUS
+    if merged[0] == etag:
+        return merged
+
+    aggs: Dict[str, RegionAggregate] = {}
+    for part in parts:
+        for region in part["regions"]:
+            agg = aggs.get(region["region"])
+            if agg is None:
+                agg = aggs[region["region"]] = RegionAggregate(region["region"])
+            agg.sum_latency_ms += region["sums"][0]
+            agg.sum_packet_loss_pct += region["sums"][1]
+            agg.sum_throughput_mbps += region["sums"][2]
+            agg.cells.update((cell["cell_id"], cell) for cell in region["cells"])
+    regions_health = [RegionHealth(cells=list(agg.cells.values()), **agg.averages()) for agg in aggs.values()]
+
+    headlines = [p["headline"] for p in parts if p["headline"]]
+    head = max(headlines, key=lambda h: h["rank"]) if headlines else {}
+    body = _status_model(regions_health, head.get("active_incident"), head.get("ai_diagnosis"),
+                         head.get("proposed_action"), head.get("predicted_outcome")).json().encode("utf-8")
+
+    merged = (etag, sum(p["version"] for p in parts), sum(p["telemetry_samples"] for p in parts), body)
+    with _SHARD_STATUS_LOCK:
+        _MERGED_STATUS = merged
+    return merged
+
+
+# -----------------------------------------------------------------------------
+# Filtered /status views
+#
+# ?region= (repeatable or comma-separated), ?offset=&limit= (cells per
+# region, in cell_id order), ?worst=k&by=latency|loss (the k worst cells
+# across the selected regions, per-region cell lists omitted) and
+# ?summary=true (region averages only). Pages and worst-k are read from the
+# RegionAggregate indexes: O(page + k log regions), no per-request sort.
+# Sharded: each shard answers for its cells (its first offset+limit ids,
+# its worst k) and the parts are merged the same way.
+# -----------------------------------------------------------------------------
+
+STATUS_MAX_PAGE = 1000
+STATUS_MAX_WORST = 1000
+WORST_INDEXES = {"latency": "by_latency", "loss": "by_loss"}
+
+
+def _status_view_part(regions: Optional[List[str]], first: int, worst: int, by: str,
+                      cells: bool) -> Dict[str, Any]:
+    """
+    This shard's share of a view: region sums + counts, each region's first
+    `first` cells in cell_id order (if `cells`), its `worst` worst cells.
+    """
+    with STATE_LOCK:
+        aggs = [agg for agg in REGION_AGGREGATES.values()
+                if agg.cells and (regions is None or agg.region in regions)]
+        part: Dict[str, Any] = {"boot": BOOT_ID, "version": STATE_VERSION, "regions": []}
+        for agg in aggs:
+            entry: Dict[str, Any] = {
+                "region": agg.region,
+                "sums": [agg.sum_latency_ms, agg.sum_packet_loss_pct, agg.sum_throughput_mbps],
+                "count": len(agg.cells),
+            }
+            if cells:
+                entry["cells"] = [agg.cells[cell_id] for cell_id in agg.order.page(0, first)]
+            part["regions"].append(entry)
+        if worst:
+            ranked = heapq.merge(*(getattr(agg, WORST_INDEXES[by]).entries(agg.region) for agg in aggs))
+            part["worst"] = [
+                [neg_value, cell_id, dict(REGION_AGGREGATES[region].cells[cell_id], region=region)]
+                for neg_value, cell_id, region in itertools.islice(ranked, worst)
+            ]
+        part["headline"] = _headline_part()
+    return part
+
+
+def _status_view(parts: List[Dict[str, Any]], offset: int, limit: Optional[int], worst: int,
+                 cells: bool, summary_only: bool) -> bytes:
+    merged: Dict[str, Dict[str, Any]] = {}
+    for part in parts:
+        for entry in part["regions"]:
+            into = merged.get(entry["region"])
+            if into is None:
+                into = merged[entry["region"]] = {"sums": [0.0, 0.0, 0.0], "count": 0, "cells": []}
+            into["sums"] = [a + b for a, b in zip(into["sums"], entry["sums"])]
+            into["count"] += entry["count"]
+            into["cells"].append(entry.get("cells", []))
+
+    regions_health = []
+    for region, into in merged.items():
+        n = into["count"] or 1
+        page: List[Dict[str, Any]] = []
+        if cells:
+            ordered = heapq.merge(*into["cells"], key=lambda cell: cell["cell_id"])
+            end = offset + limit if limit is not None else None
+            page = list(itertools.islice(ordered, offset, end))
+        regions_health.append(RegionHealth(
+            region=region,
+            avg_latency_ms=round(into["sums"][0] / n, 2),
+            avg_packet_loss_pct=round(into["sums"][1] / n, 2),
+            avg_throughput_mbps=round(into["sums"][2] / n, 2),
+            cell_count=into["count"],
+            cells=page,
+        ))
+
+    worst_cells = None
+    if worst:
+        ranked = heapq.merge(*(part.get("worst", []) for part in parts), key=lambda w: (w[0], w[1]))
+        worst_cells = [cell for _, _, cell in itertools.islice(ranked, worst)]
+
+    headlines = [p["headline"] for p in parts if p["headline"]]
+    head = max(headlines, key=lambda h: h["rank"]) if headlines else {}
+    base = _status_model(regions_health, head.get("active_incident"), head.get("ai_diagnosis"),
+                         head.get("proposed_action"), head.get("predicted_outcome"))
+    view = StatusView(**dict(base), worst=worst_cells,
+                      page={"offset": offset, "limit": limit} if limit is not None else None)
+    exclude = None if cells else {"regions": {"__all__": {"cells"}}}
+    return view.json(exclude=exclude).encode("utf-8")
+
+
+def _view_etag(version_key: str, params: str) -> str:
+    digest = hashlib.blake2b(f"{version_key}?{params}".encode("utf-8"), digest_size=8).hexdigest()
+    return f'"v-{digest}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # weak comparison: W/"x" matches "x"
+    return "*" in candidates or any(tag.replace("W/", "", 1) == etag for tag in candidates)
+
+
+@app.get("/status", response_model=StatusResponse)
+def get_status(request: Request,
+               region: Optional[List[str]] = Query(None, description="only these regions (repeatable / comma list)"),
+               offset: int = Query(0, ge=0, description="skip this many cells per region (cell_id order)"),
+               limit: Optional[int] = Query(None, ge=1, le=STATUS_MAX_PAGE, description="cells per region"),
+               worst: Optional[int] = Query(None, ge=1, le=STATUS_MAX_WORST,
+                                            description="k worst cells across the selected regions"),
+               by: str = Query("latency", pattern="^(latency|loss)$", description="worst=k ranking KPI"),
+               summary: bool = Query(False, description="region averages only, no cell lists")):
+    """
+    Powers the AINOA Console dashboard.
+    Frontend polls this every ~2s.
+
+    Returns:
+    - regions: snapshot health per region
+    - active_incident: most recent triggered incident
+    - ai_diagnosis: Cognitive Layer human-readable reasoning
+    - proposed_action: Decision Layer machine-actionable intent
+    - predicted_outcome: Planning Agent forecast
+
+    The body is cached per state version and carries an ETag; a poll with a
+    matching If-None-Match gets an empty 304 Not Modified.
+    Sharded: merged from every shard (the ETag covers all shard versions).
+
+    Filtered views (StatusView) instead of the full document:
+    - region=a&region=b (or region=a,b): only those regions
+    - offset / limit: a page of each region's cells, in cell_id order
+    - worst=k&by=latency|loss: "worst" lists the k worst cells across the
+      selected regions; per-region cell lists are omitted
+    - summary=true: region averages and cell counts only
+    """
+    if region or offset or limit is not None or worst or summary:
+        return _get_status_view(request, region, offset, limit, worst, by, summary)
+    if SHARDED:
+        etag, _, _, body = sharded_status()
+    else:
+        etag = _status_etag(STATE_VERSION)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        STATUS_RESPONSES["304"].inc()
+        return Response(status_code=304, headers=headers)
+
+    STATUS_RESPONSES["200"].inc()
+    if not SHARDED:
+        version, body = status_payload()
+        headers["ETag"] = _status_etag(version)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _get_status_view(request: Request, region: Optional[List[str]], offset: int, limit: Optional[int],
+                     worst: Optional[int], by: str, summary: bool) -> Response:
+    regions = sorted({name.strip() for item in region for name in item.split(",") if name.strip()}) \
+        if region else None
+    cells = not (summary or worst)
+    params = f"{regions}|{offset}|{limit}|{worst}|{by}|{cells}"
+    if_none_match = request.headers.get("if-none-match")
+
+    first = offset + limit if limit is not None else STATUS_MAX_PAGE * 1000
+    args = {"regions": regions, "first": first, "worst": worst or 0, "by": by, "cells": cells}
+    if SHARDED:
+        parts = _on_all_shards("status_view", args)
+        etag = _view_etag("|".join(f"{p['boot']}-{p['version']}" for p in parts), params)
+    else:
+        # version first: a matching poll never builds the view
+        etag = _view_etag(f"{BOOT_ID}-{STATE_VERSION}", params)
+        parts = None
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        STATUS_RESPONSES["304"].inc()
+        return Response(status_code=304, headers=headers)
+
+    if parts is None:
+        parts = [_status_view_part(**args)]
+        headers["ETag"] = _view_etag(f"{BOOT_ID}-{parts[0]['version']}", params)
+    started = time.perf_counter()
+    body = _status_view(parts, offset, limit, worst or 0, cells, summary)
+    _observe("status_build", started)
+    STATUS_RESPONSES["200"].inc()
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/status/stream")
+async def status_stream():
+    """
+    Server-Sent Events feed for the AINOA Console.
+
+    event: snapshot  → {"version", "telemetry_samples", "status": <StatusResponse>}
+    event: delta     → {"version", "telemetry_samples", "regions", "cells",
+                        optional "active_incident", "ai_diagnosis",
+                        "proposed_action", "predicted_outcome"}
+
+    Deltas queued while the snapshot was being built may predate it;
+    clients ignore any delta with version <= the snapshot's.
+
+    Sharded: changes happen in other workers too, so instead of deltas a
+    fresh merged snapshot is sent whenever the merged /status changes.
+    """
+    if SHARDED:
+        return StreamingResponse(
+            _sharded_status_events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    queue = STATUS_STREAM.subscribe()
+
+    async def events():
+        try:
+            yield await run_in_threadpool(_status_snapshot_frame)
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout=STATUS_STREAM_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if frame is None:  # dropped as a slow consumer or shutting down
+                    break
+                yield frame
+        finally:
+            STATUS_STREAM.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _sharded_status_events():
+    last_etag = None
+    idle_s = 0.0
+    while True:
+        etag, version, samples, body = await run_in_threadpool(sharded_status)
+        if etag != last_etag:
+            last_etag, idle_s = etag, 0.0
+            head = f'{{"version":{version},"telemetry_samples":{samples},"status":'
+            yield sse_frame("snapshot", head.encode("utf-8") + body + b"}")
+        elif idle_s >= STATUS_STREAM_KEEPALIVE_S:
+            idle_s = 0.0
+            yield b": keepalive\n\n"
+        await asyncio.sleep(STATUS_STREAM_INTERVAL_S)
+        idle_s += STATUS_STREAM_INTERVAL_S
+
+
 @app.post("/demo/spike")
 def demo_spike():
     """
@@ -505,7 +2435,7 @@ def demo_spike():
         latency_ms=180.0,          # >150ms = bad
         throughput_mbps=120.0,
     )
-    return push_telemetry(spike_event)
+    return _route_push(spike_event)
 
 
 @app.post("/demo/normal")
@@ -521,4 +2451,45 @@ def demo_normal():
         latency_ms=55.0,
         throughput_mbps=150.0,
     )
-    return push_telemetry(normal_event)
+    return _route_push(normal_event)
+
+
+# -----------------------------------------------------------------------------
+# Shard ops: what other workers may ask this one to do for its cells
+# (args arrive as JSON; results are sent back through jsonable_encoder)
+# -----------------------------------------------------------------------------
+
+SHARD_OPS = {
+    "push": lambda event: _push_event(TelemetryEvent.parse_obj(event)),
+    "ingest": lambda events: _ingest_batch([TelemetryEvent.parse_obj(e) for e in events]),
+    "status_part": _status_part,
+    "status_view": _status_view_part,
+    "incidents": _local_incidents,
+    "incident": _local_incident,
+    "transition": _transition_incident,
+    "detector": _set_detector,
+    "retention": _set_retention,
+    "query": _query_rollups,
+    "samples": _query_samples,
+    "metrics": lambda: METRICS.collect({"shard": str(SHARD_INDEX)}),
+    "admit": _admit,
+    "llm_cache_stats": LLM_CACHE.stats,
+    "llm_cache_invalidate": LLM_CACHE.invalidate,
+}
+
+# safe to resend after a connection reset; the rest change state
+SHARD_READ_OPS = frozenset({"status_part", "status_view", "incidents", "incident",
+                            "query", "samples", "metrics", "llm_cache_stats"})
+
+
+@app.on_event("startup")
+async def serve_state_shard():
+    # last startup hook: WAL replay and the pipeline are up before peers call in
+    if SHARD_SERVER is not None:
+        await SHARD_SERVER.start()
+
+
+@app.on_event("shutdown")
+async def stop_state_shard():
+    if SHARD_SERVER is not None:
+        await SHARD_SERVER.stop()
@@ -0,0 +1,185 @@
+# metrics.py
+#
+# Minimal Prometheus instrumentation for the hot path (no client library).
+#
+# - Counter: monotonically increasing, optional fixed label set (name it
+#   "..._total"; the family and sample share one name).
+# - Histogram: cumulative-bucket latency histogram (seconds); observe() is a
+#   bisect + three increments under a per-histogram lock, a few hundred ns.
+# - Gauges are callbacks evaluated at scrape time, so state sizes (history
+#   length, cells tracked, queue depth) cost nothing on the ingest path.
+#
+# Registry.collect() returns plain JSON-ready families, so sharded workers
+# can ship theirs to whichever worker is being scraped; render() turns a
+# list of families into the text exposition format (version 0.0.4).
+
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import math
+import threading
+
+
+# 5µs .. 10s: the detector runs in microseconds, an LLM call in seconds
+LATENCY_BUCKETS_S = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# (sample name suffix, labels, value)
+Sample = Tuple[str, Dict[str, str], float]
+
+
+class Counter:
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.help = help_text
+        self.labels = labels or {}
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self) -> List[Sample]:
+        return [("", self.labels, self.value)]
+
+
+class Histogram:
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Optional[Dict[str, str]] = None,
+                 buckets: Sequence[float] = LATENCY_BUCKETS_S):
+        self.name = name
+        self.help = help_text
+        self.labels = labels or {}
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot = +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        out: List[Sample] = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (math.inf,), counts):
+            cumulative += n
+            out.append(("_bucket", dict(self.labels, le=_format_value(bound)), cumulative))
+        out.append(("_sum", self.labels, total))
+        out.append(("_count", self.labels, count))
+        return out
+
+
+class Gauge:
+
+    def __init__(self, name: str, help_text: str,
+                 read: Callable[[], Any], label: Optional[str] = None, kind: str = "gauge"):
+        """
+        read() returns a number, or with `label` set a {label value: number}
+        dict (one sample per entry, e.g. incidents per state).
+        kind="counter" exposes a count some component already keeps.
+        """
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._read = read
+        self._label = label
+
+    def samples(self) -> List[Sample]:
+        value = self._read()
+        if self._label is None:
+            return [("", {}, float(value))]
+        return [("", {self._label: str(k)}, float(v)) for k, v in value.items()]
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric: Any) -> Any:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Optional[Dict[str, str]] = None) -> Counter:
+        return self._add(Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Optional[Dict[str, str]] = None,
+                  buckets: Sequence[float] = LATENCY_BUCKETS_S) -> Histogram:
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], Any],
+              label: Optional[str] = None, kind: str = "gauge") -> Gauge:
+        return self._add(Gauge(name, help_text, read, label, kind))
+
+    def collect(self, extra_labels: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Families in registration order: {"name", "type", "help", "samples"}."""
+        families: Dict[str, Dict[str, Any]] = {}
+        for metric in list(self._metrics):
+            family = families.get(metric.name)
+            if family is None:
+                family = families[metric.name] = {"name": metric.name, "type": metric.kind,
+                                                   "help": metric.help, "samples": []}
+            for suffix, labels, value in metric.samples():
+                if extra_labels:
+                    labels = dict(labels, **extra_labels)
+                family["samples"].append([metric.name + suffix, labels, value])
+        return list(families.values())
+
+
+def merge_families(parts: Iterable[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Concatenate samples of same-named families from several collect() calls."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for families in parts:
+        for family in families:
+            into = merged.get(family["name"])
+            if into is None:
+                merged[family["name"]] = dict(family, samples=list(family["samples"]))
+            else:
+                into["samples"].extend(family["samples"])
+    return list(merged.values())
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render(families: Iterable[Dict[str, Any]]) -> str:
+    """Prometheus text exposition format."""
+    lines: List[str] = []
+    for family in families:
+        lines.append(f"# HELP {family['name']} {family['help']}")
+        lines.append(f"# TYPE {family['name']} {family['type']}")
+        for name, labels, value in family["samples"]:
+            if labels:
+                label_text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
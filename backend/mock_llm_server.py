@@ -0,0 +1,141 @@
+# mock_llm_server.py
+#
+# Local stand-in for the LLM provider, for exercising llm_client.py (pool,
+# deadlines, hedging, circuit breaker) without a real model.
+#
+# WHAT IT DOES:
+# - Serves OpenAI-style POST /v1/chat/completions. The reply is a diagnosis
+#   JSON for the region/cell named in the prompt, like call_llm()'s mock.
+# - Every request waits latency_ms +- jitter_ms, then with the configured
+#   probabilities: hangs (hang_s, longer than any sane client deadline),
+#   answers 503, or answers text that is not JSON.
+# - GET /config shows the behaviour, POST /config changes any part of it at
+#   runtime (e.g. flip to 100% errors to watch the breaker open), GET /stats
+#   counts requests by outcome.
+#
+# HOW TO USE:
+#   python mock_llm_server.py --port 8088 --latency-ms 300 --jitter-ms 200 --error-rate 0.1
+#   AINOA_LLM_URL=http://127.0.0.1:8088/v1/chat/completions uvicorn main:app
+#   curl -X POST localhost:8088/config -H 'content-type: application/json' -d '{"error_rate": 1}'
+
+import argparse
+import asyncio
+import json
+import random
+import re
+from typing import Any, Dict, List, Optional
+
+from fastapi import Body, FastAPI
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="AINOA mock LLM")
+
+CONFIG: Dict[str, float] = {
+    "latency_ms": 200.0,
+    "jitter_ms": 100.0,
+    "error_rate": 0.0,      # 503
+    "hang_rate": 0.0,       # no answer for hang_s
+    "bad_json_rate": 0.0,   # 200 with prose instead of JSON
+    "hang_s": 60.0,
+}
+STATS: Dict[str, int] = {"requests": 0, "ok": 0, "error": 0, "hang": 0, "bad_json": 0, "in_flight": 0}
+
+
+def _field(prompt: str, name: str) -> str:
+    match = re.search(rf"^{name}=(.*)$", prompt, re.MULTILINE)
+    return match.group(1).strip() if match else "unknown"
+
+
+def _diagnosis(prompt: str) -> Dict[str, str]:
+    region, cell = _field(prompt, "region"), _field(prompt, "cell_id")
+    latency, loss = _field(prompt, "latency_ms"), _field(prompt, "packet_loss_pct")
+    return {
+        "issue_summary": f"Congestion in {region} / {cell}: latency {latency} ms, packet loss {loss}%.",
+        "probable_cause": "Backhaul saturation due to heavy user load and limited available capacity.",
+        "suggested_action": f"Offload ~20% traffic from {cell} to a neighboring cell with headroom.",
+        "risk_level": "high",
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: Dict[str, Any] = Body(...)):
+    STATS["requests"] += 1
+    STATS["in_flight"] += 1
+    try:
+        delay = CONFIG["latency_ms"] + random.uniform(-CONFIG["jitter_ms"], CONFIG["jitter_ms"])
+        await asyncio.sleep(max(0.0, delay) / 1000.0)
+
+        roll = random.random()
+        if roll < CONFIG["hang_rate"]:
+            STATS["hang"] += 1
+            await asyncio.sleep(CONFIG["hang_s"])
+            return JSONResponse({"error": "hung"}, status_code=504)
+        roll -= CONFIG["hang_rate"]
+        if roll < CONFIG["error_rate"]:
+            STATS["error"] += 1
+            return JSONResponse({"error": {"message": "overloaded"}}, status_code=503)
+        roll -= CONFIG["error_rate"]
+
+        messages: List[Dict[str, Any]] = body.get("messages") or [{}]
+        prompt = str(messages[-1].get("content", ""))
+        if roll < CONFIG["bad_json_rate"]:
+            STATS["bad_json"] += 1
+            content = "Sure! The cell looks congested, you may want to offload some traffic."
+        else:
+            STATS["ok"] += 1
+            content = json.dumps(_diagnosis(prompt))
+        return {
+            "id": f"mock-{STATS['requests']}",
+            "object": "chat.completion",
+            "model": body.get("model") or "mock",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+        }
+    finally:
+        STATS["in_flight"] -= 1
+
+
+@app.get("/config")
+def get_config():
+    return CONFIG
+
+
+@app.post("/config")
+def set_config(update: Dict[str, float] = Body(...)):
+    unknown = set(update) - set(CONFIG)
+    if unknown:
+        return JSONResponse({"error": f"unknown keys: {sorted(unknown)}"}, status_code=400)
+    CONFIG.update({k: float(v) for k, v in update.items()})
+    return CONFIG
+
+
+@app.get("/stats")
+def get_stats():
+    return STATS
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Mock LLM provider with injectable latency and failures")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8088)
+    p.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"])
+    p.add_argument("--jitter-ms", type=float, default=CONFIG["jitter_ms"])
+    p.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 503")
+    p.add_argument("--hang-rate", type=float, default=0.0, help="share of requests that never answer in time")
+    p.add_argument("--bad-json-rate", type=float, default=0.0, help="share answered with non-JSON text")
+    p.add_argument("--hang-s", type=float, default=CONFIG["hang_s"])
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import uvicorn
+
+    args = parse_args(argv)
+    CONFIG.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                  hang_rate=args.hang_rate, bad_json_rate=args.bad_json_rate, hang_s=args.hang_s)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,142 @@
+# planning.py
+#
+# What-if scenario grid for the Planning Agent.
+#
+# WHY:
+# - planning_agent_forecast() projected exactly one hard-coded scenario
+#   (loss x 0.2, latency - 60 ms) for whatever the decision layer had already
+#   picked, so there was nothing to compare the pick against.
+#
+# HOW:
+# - plan() scores the whole grid in one columnar pass: no-action plus every
+#   candidate target x OFFLOAD_GRID percentages (5..50%). Per-percent terms
+#   (relief curve, disruption, share moved) are computed once per Planner;
+#   per-target terms (usable headroom) once per row; a row is then a handful
+#   of list comprehensions, no per-scenario model call.
+# - Rows are memoized per (quantized cell state, target, quantized headroom)
+#   in a bounded LRU, so re-planning an unchanged cell (the pipeline re-runs
+#   on every escalation, the forecast step re-reads the decision's grid) is
+#   a dict lookup. Inputs are quantized before evaluation, so a hit returns
+#   exactly what a fresh evaluation would.
+# - Ranking is heapq.nlargest: O(n log k) for the top-k.
+#
+# Model (a toy, like the one it replaces): relief ramps linearly to full at
+# 20% offload, where it matches the old fixed scenario (loss x0.2 floored at
+# 0.5%, latency -60 ms floored at 60 ms). Moving more adds only disruption.
+# Traffic beyond 80% of the target's headroom is overflow: it would congest
+# the target, so it is penalized far above anything offloading can gain.
+
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import heapq
+import threading
+
+
+OFFLOAD_GRID = (5.0, 10.0, 15.0, 20.0, 25.0, 30.0, 40.0, 50.0)
+
+FULL_RELIEF_PERCENT = 20.0
+LOSS_RELIEF = 0.8          # loss x (1 - 0.8) at full relief
+LATENCY_RELIEF_MS = 60.0
+LOSS_FLOOR_PCT = 0.5
+LATENCY_FLOOR_MS = 60.0
+HEADROOM_USE = 0.8         # never plan to fill the target beyond this
+
+# score = benefit - cost, in "points"
+LOSS_WEIGHT = 10.0         # per loss percentage point removed
+LATENCY_WEIGHT = 0.1       # per ms removed
+DISRUPTION_WEIGHT = 0.05   # per percent of traffic moved
+OVERFLOW_WEIGHT = 5.0      # per percent of source traffic that would not fit
+
+
+class Scenario(NamedTuple):
+    action_type: str       # "NO_ACTION" | "TRAFFIC_OFFLOAD"
+    target: str            # "region:cell_id", "" for no action
+    offload_percent: float
+    packet_loss_pct: float  # projected, source cell
+    latency_ms: float
+    overflow_mbps: float
+    score: float
+
+    @property
+    def target_region(self) -> Optional[str]:
+        return self.target.split(":", 1)[0] if self.target else None
+
+    @property
+    def target_cell(self) -> Optional[str]:
+        """Bare cell id, as in PolicyAction; pair it with target_region."""
+        return self.target.split(":", 1)[1] if self.target else None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "action_type": self.action_type,
+            "target_region": self.target_region,
+            "target_cell": self.target_cell,
+            "offload_percent": self.offload_percent,
+            "packet_loss_pct": round(self.packet_loss_pct, 3),
+            "latency_ms": round(self.latency_ms, 1),
+            "overflow_mbps": round(self.overflow_mbps, 1),
+            "score": round(self.score, 2),
+        }
+
+
+def _quantize_state(loss: float, latency: float, throughput: float) -> Tuple[float, float, float]:
+    return round(loss, 1), round(latency), round(throughput)
+
+
+class Planner:
+    """Thread-safe (pipeline workers plan concurrently)."""
+
+    def __init__(self, percents: Sequence[float] = OFFLOAD_GRID, max_rows: int = 4096):
+        self.percents = tuple(sorted(percents))
+        self.max_rows = max_rows
+        # per-percent columns, shared by every row
+        self._relief = [min(1.0, p / FULL_RELIEF_PERCENT) for p in self.percents]
+        self._disruption = [DISRUPTION_WEIGHT * p for p in self.percents]
+        self._share = [p / 100.0 for p in self.percents]
+        self._rows: "OrderedDict[tuple, List[Scenario]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _row(self, loss: float, latency: float, throughput: float,
+             target: str, headroom: float) -> List[Scenario]:
+        """Every grid percentage for one target, as columns."""
+        after_loss = [max(LOSS_FLOOR_PCT, loss * (1 - LOSS_RELIEF * r)) for r in self._relief]
+        after_latency = [max(LATENCY_FLOOR_MS, latency - LATENCY_RELIEF_MS * r) for r in self._relief]
+        usable = HEADROOM_USE * max(0.0, headroom)
+        overflow = [max(0.0, throughput * s - usable) for s in self._share]
+        per_pct = 100.0 / throughput if throughput > 0 else 0.0
+        score = [
+            LOSS_WEIGHT * (loss - al) + LATENCY_WEIGHT * (latency - at) - d - OVERFLOW_WEIGHT * o * per_pct
+            for al, at, d, o in zip(after_loss, after_latency, self._disruption, overflow)
+        ]
+        return [Scenario("TRAFFIC_OFFLOAD", target, p, al, at, o, s)
+                for p, al, at, o, s in zip(self.percents, after_loss, after_latency, overflow, score)]
+
+    def plan(self, loss: float, latency: float, throughput: float,
+             targets: Sequence[Tuple[str, float]], top_k: int = 3) -> List[Scenario]:
+        """
+        Rank no-action and every (target, percent) for a cell in this state.
+        targets: (neighbor key, headroom_mbps) pairs. Best first, at most top_k.
+        """
+        loss, latency, throughput = state = _quantize_state(loss, latency, throughput)
+        scenarios = [Scenario("NO_ACTION", "", 0.0, loss, latency, 0.0, 0.0)]
+        for target, headroom in targets:
+            key = state + (target, round(headroom))
+            with self._lock:
+                row = self._rows.get(key)
+                if row is not None:
+                    self._rows.move_to_end(key)
+                    self.hits += 1
+            if row is None:
+                row = self._row(loss, latency, throughput, target, key[-1])
+                with self._lock:
+                    self.misses += 1
+                    self._rows[key] = row
+                    if len(self._rows) > self.max_rows:
+                        self._rows.popitem(last=False)
+            scenarios.extend(row)
+        return heapq.nlargest(top_k, scenarios, key=lambda s: s.score)
+
+    def stats(self) -> Dict[str, int]:
+        return {"rows": len(self._rows), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,215 @@
+# rollups.py
+#
+# Multi-resolution KPI rollups per cell, for /telemetry/query.
+#
+# WHY:
+# - Charting a cell over the last hour (or day) from raw samples means
+#   scanning history on every request, and raw history is capped by the
+#   per-cell ring retention anyway.
+#
+# HOW:
+# - Each cell keeps a few tiers (default 10s / 1m / 15m buckets). Every
+#   ingested sample is folded into the current bucket of each tier at once:
+#   count, min, max, sum and a sparse log-scale histogram per KPI.
+# - The histogram (relative accuracy ~ +-2.5%, DDSketch-style bins) makes
+#   p95 mergeable: a query bucket spanning several tier buckets just adds
+#   the bin counts. The estimate is clamped to the exact min/max.
+# - Buckets live in a dict keyed by bucket number, so lookups are O(1) and a
+#   query touches O(query buckets x tier buckets per query bucket), never
+#   raw samples. Buckets older than the tier's horizon are evicted.
+
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+import math
+import threading
+
+
+KPIS = ("packet_loss_pct", "latency_ms", "throughput_mbps")
+
+# (bucket seconds, buckets kept): 1h of 10s, 6h of 1m, 48h of 15m
+DEFAULT_TIERS: Tuple[Tuple[int, int], ...] = ((10, 360), (60, 360), (900, 192))
+
+_RELATIVE_ACCURACY = 0.025
+_GAMMA = (1 + _RELATIVE_ACCURACY) / (1 - _RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+_MIN_POSITIVE = 1e-6
+_ZERO_BIN = -(1 << 30)  # values <= _MIN_POSITIVE (loss is often exactly 0)
+
+
+def _bin(value: float) -> int:
+    if value <= _MIN_POSITIVE:
+        return _ZERO_BIN
+    return math.ceil(math.log(value) / _LOG_GAMMA)
+
+
+def _bin_value(index: int) -> float:
+    if index == _ZERO_BIN:
+        return 0.0
+    # midpoint of (gamma^(i-1), gamma^i] in relative terms
+    return 2.0 * _GAMMA ** index / (_GAMMA + 1.0)
+
+
+def parse_tiers(spec: str) -> Tuple[Tuple[int, int], ...]:
+    """"10:360,60:360,900:192" → ((10, 360), (60, 360), (900, 192))"""
+    tiers = []
+    for item in spec.split(","):
+        step, keep = item.split(":")
+        tiers.append((int(step), int(keep)))
+    if not tiers or any(step <= 0 or keep <= 0 for step, keep in tiers):
+        raise ValueError(f"invalid rollup tiers {spec!r}")
+    return tuple(sorted(tiers))
+
+
+class Bucket:
+
+    __slots__ = ("count", "mins", "maxs", "sums", "hists")
+
+    def __init__(self):
+        self.count = 0
+        self.mins = [math.inf] * len(KPIS)
+        self.maxs = [-math.inf] * len(KPIS)
+        self.sums = [0.0] * len(KPIS)
+        self.hists: List[Dict[int, int]] = [{} for _ in KPIS]
+
+    def add(self, values: Sequence[float], bins: Sequence[int]) -> None:
+        self.count += 1
+        mins, maxs, sums, hists = self.mins, self.maxs, self.sums, self.hists
+        for k, value in enumerate(values):
+            if value < mins[k]:
+                mins[k] = value
+            if value > maxs[k]:
+                maxs[k] = value
+            sums[k] += value
+            hist = hists[k]
+            b = bins[k]
+            hist[b] = hist.get(b, 0) + 1
+
+    def merge(self, other: "Bucket") -> None:
+        self.count += other.count
+        for k in range(len(KPIS)):
+            self.mins[k] = min(self.mins[k], other.mins[k])
+            self.maxs[k] = max(self.maxs[k], other.maxs[k])
+            self.sums[k] += other.sums[k]
+            hist = self.hists[k]
+            for b, n in other.hists[k].items():
+                hist[b] = hist.get(b, 0) + n
+
+    def quantile(self, k: int, q: float) -> float:
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for b in sorted(self.hists[k]):
+            seen += self.hists[k][b]
+            if seen >= rank:
+                return min(max(_bin_value(b), self.mins[k]), self.maxs[k])
+        return self.maxs[k]
+
+    def summary(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"count": self.count}
+        for k, kpi in enumerate(KPIS):
+            out[kpi] = {
+                "min": self.mins[k],
+                "max": self.maxs[k],
+                "avg": round(self.sums[k] / self.count, 4),
+                "p95": round(self.quantile(k, 0.95), 4),
+            }
+        return out
+
+
+class RollupTier:
+    """One resolution for one cell: bucket number -> Bucket, bounded horizon."""
+
+    __slots__ = ("step_s", "keep", "buckets", "order", "newest")
+
+    def __init__(self, step_s: int, keep: int):
+        self.step_s = step_s
+        self.keep = keep
+        self.buckets: Dict[int, Bucket] = {}
+        self.order: Deque[int] = deque()  # bucket numbers in creation order
+        self.newest = -math.inf
+
+    def add(self, epoch_s: float, values: Sequence[float], bins: Sequence[int]) -> None:
+        number = int(epoch_s // self.step_s)
+        if number <= self.newest - self.keep:
+            return  # older than the horizon
+        bucket = self.buckets.get(number)
+        if bucket is None:
+            bucket = self.buckets[number] = Bucket()
+            self.order.append(number)
+            if number > self.newest:
+                self.newest = number
+                self._evict()
+        bucket.add(values, bins)
+
+    def _evict(self) -> None:
+        horizon = self.newest - self.keep
+        order, buckets = self.order, self.buckets
+        while order and (order[0] <= horizon or len(order) > self.keep):
+            buckets.pop(order.popleft(), None)
+
+    def oldest_start(self) -> float:
+        return (self.newest - self.keep + 1) * self.step_s
+
+
+class RollupStore:
+    """Per-cell rollup tiers. Thread-safe."""
+
+    def __init__(self, tiers: Sequence[Tuple[int, int]] = DEFAULT_TIERS):
+        self.tiers = tuple(sorted(tiers))
+        self._cells: Dict[Tuple[str, str], List[RollupTier]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, region: str, cell_id: str, epoch_s: float,
+            packet_loss_pct: float, latency_ms: float, throughput_mbps: float) -> None:
+        values = (packet_loss_pct, latency_ms, throughput_mbps)
+        bins = (_bin(packet_loss_pct), _bin(latency_ms), _bin(throughput_mbps))  # once, not per tier
+        key = (region, cell_id)
+        with self._lock:
+            tiers = self._cells.get(key)
+            if tiers is None:
+                tiers = self._cells[key] = [RollupTier(step, keep) for step, keep in self.tiers]
+            for tier in tiers:
+                tier.add(epoch_s, values, bins)
+
+    def _pick_tier(self, tiers: List[RollupTier], start_s: float, step_s: float) -> RollupTier:
+        """
+        Coarsest tier that still resolves `step_s` (preferring tiers that
+        divide it evenly) and still holds data back to `start_s`.
+        """
+        usable = [t for t in tiers if t.step_s <= step_s] or [tiers[0]]
+        even = [t for t in usable if step_s % t.step_s == 0] or usable
+        covering = [t for t in even if t.oldest_start() <= start_s]
+        return (covering or even)[-1]
+
+    def query(self, region: str, cell_id: str, start_s: float, end_s: float,
+              step_s: float) -> Optional[Dict[str, Any]]:
+        """
+        Buckets of width step_s over [start_s, end_s), aligned to multiples
+        of step_s. Empty buckets are omitted. None if the cell is unknown.
+        """
+        with self._lock:
+            tiers = self._cells.get((region, cell_id))
+            if tiers is None:
+                return None
+            tier = self._pick_tier(tiers, start_s, step_s)
+            step_s = max(step_s, tier.step_s)
+
+            out: Dict[int, Bucket] = {}
+            # only walk bucket numbers the tier can actually hold
+            first = max(int(start_s // tier.step_s), int(tier.newest) - tier.keep + 1)
+            last = min(int(math.ceil(end_s / tier.step_s)), int(tier.newest) + 1)
+            get = tier.buckets.get
+            for number in range(first, last):
+                bucket = get(number)
+                if bucket is None:
+                    continue
+                slot = int(number * tier.step_s // step_s)
+                merged = out.get(slot)
+                if merged is None:
+                    merged = out[slot] = Bucket()
+                merged.merge(bucket)
+
+            buckets = [dict(start=slot * step_s, **out[slot].summary()) for slot in sorted(out)]
+        return {"tier_s": tier.step_s, "step_s": step_s, "buckets": buckets}
+
+    def cell_count(self) -> int:
+        return len(self._cells)
@@ -0,0 +1,213 @@
+# sharding.py
+#
+# Cell-sharded state for running several uvicorn workers (--workers N).
+#
+# WHY:
+# - All runtime state lives in main.py module globals, so every worker
+#   process has its own private view: /status depends on which worker
+#   answered, and an incident opened in one worker is invisible to the rest.
+#
+# HOW:
+# - Cells are partitioned over N shards with a consistent-hash ring
+#   (virtual nodes, stable blake2b hash, bisect lookup), so the mapping is
+#   identical in every process and changing N only moves ~1/N of the cells.
+# - Each worker claims one shard at startup by binding that shard's private
+#   loopback port (base_port + index); the first free port wins. A restarted
+#   worker simply re-claims the slot its predecessor released.
+# - The shard owner runs store → detect → track → pipeline for its cells.
+#   Other workers forward to it over a tiny length-prefixed JSON protocol
+#   (ShardServer / ShardClient); readers fan out to every shard and merge.
+#
+# Frame: <u32 big-endian length> + JSON. Request {"op", "args"}; reply
+# {"ok": true, "result"} or {"ok": false, "status", "detail"}.
+
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import struct
+import threading
+
+
+_LENGTH = struct.Struct(">I")
+
+
+class ShardError(Exception):
+    """A shard call failed; status/detail mirror an HTTP error."""
+
+    def __init__(self, status: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def _hash64(key: str) -> int:
+    # not hash(): str hashing is randomized per process
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring mapping keys ("region:cell_id") to shard indexes."""
+
+    def __init__(self, shards: int, vnodes: int = 64):
+        self.shards = shards
+        points = sorted((_hash64(f"shard-{shard}#{v}"), shard)
+                        for shard in range(shards) for v in range(vnodes))
+        self._hashes = [h for h, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def owner(self, key: str) -> int:
+        i = bisect_right(self._hashes, _hash64(key))
+        return self._owners[i % len(self._owners)]
+
+
+def claim_shard(shards: int, base_port: int, host: str = "127.0.0.1") -> Tuple[int, socket.socket]:
+    """
+    Bind the first free shard port. Returns (shard index, listening socket).
+    SO_REUSEADDR only skips the TIME_WAIT left by a previous owner's
+    connections; on POSIX it still refuses a port that another worker is
+    listening on, so two live workers never own one shard.
+    """
+    for index in range(shards):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if os.name == "posix":  # on Windows the same flag allows port stealing
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, base_port + index))
+        except OSError:
+            sock.close()
+            continue
+        sock.listen(128)
+        sock.setblocking(False)
+        return index, sock
+    raise RuntimeError(f"all {shards} shard ports from {base_port} are taken; "
+                       f"run at most {shards} workers per AINOA_SHARDS")
+
+
+def _encode(obj: Dict[str, Any]) -> bytes:
+    data = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    return _LENGTH.pack(len(data)) + data
+
+
+class ShardServer:
+    """
+    Serves one shard's ops to the other workers.
+
+    handler(op, args) is synchronous (it takes main.py's STATE_LOCK), so it
+    runs on this server's own executor. That pool is never blocked waiting on
+    another shard, which is what keeps cross-worker calls deadlock-free even
+    when every request thread is busy forwarding.
+    """
+
+    def __init__(self, sock: socket.socket, handler: Callable[[str, Dict[str, Any]], Any],
+                 workers: int = 4):
+        self._sock = sock
+        self._handler = handler
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ainoa-shard")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.requests = 0
+        self.errors = 0
+
+    def _call(self, op: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return {"ok": True, "result": self._handler(op, args)}
+        except ShardError as e:
+            return {"ok": False, "status": e.status, "detail": e.detail}
+        except Exception as e:  # report it to the caller; keep serving
+            return {"ok": False, "status": 500, "detail": f"{type(e).__name__}: {e}"}
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                request = json.loads(await reader.readexactly(length))
+                self.requests += 1
+                reply = await loop.run_in_executor(self._executor, self._call, request["op"], request.get("args") or {})
+                if not reply["ok"]:
+                    self.errors += 1
+                writer.write(_encode(reply))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, sock=self._sock)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._executor.shutdown(wait=False)
+
+
+class ShardClient:
+    """
+    Blocking client for one remote shard, one connection per calling thread
+    (FastAPI's threadpool), reconnecting once if the connection went stale
+    (idempotent ops only; anything else surfaces the error).
+    """
+
+    def __init__(self, port: int, host: str = "127.0.0.1", timeout_s: float = 5.0):
+        self.port = port
+        self.host = host
+        self.timeout_s = timeout_s
+        self._local = threading.local()
+
+    def _connection(self) -> Tuple[socket.socket, bool]:
+        """(socket, reused) for the calling thread."""
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            return sock, True
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout_s)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.sock = sock
+        return sock, False
+
+    def _drop(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    @staticmethod
+    def _recv_exact(sock: socket.socket, n: int) -> bytes:
+        chunks: List[bytes] = []
+        while n:
+            chunk = sock.recv(n)
+            if not chunk:
+                raise ConnectionError("shard closed the connection")
+            chunks.append(chunk)
+            n -= len(chunk)
+        return b"".join(chunks)
+
+    def call(self, op: str, args: Optional[Dict[str, Any]] = None, idempotent: bool = False) -> Any:
+        """
+        idempotent: the op may safely run twice. Only those are resent after a
+        stale connection: the reset can arrive after the shard already ran it.
+        """
+        frame = _encode({"op": op, "args": args or {}})
+        while True:
+            reused = False
+            try:
+                sock, reused = self._connection()
+                sock.sendall(frame)
+                (length,) = _LENGTH.unpack(self._recv_exact(sock, _LENGTH.size))
+                reply = json.loads(self._recv_exact(sock, length))
+                break
+            except OSError as e:
+                self._drop()
+                # only a kept-alive connection that went stale is retried (the
+                # shard restarted); a timeout may mean the op already ran
+                if not reused or not idempotent or isinstance(e, socket.timeout):
+                    raise ShardError(503, f"shard on port {self.port} unavailable: {e}")
+        if not reply["ok"]:
+            raise ShardError(reply["status"], reply["detail"])
+        return reply["result"]
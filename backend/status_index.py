@@ -0,0 +1,67 @@
+# status_index.py
+#
+# Ordered per-region cell indexes for filtered /status views.
+#
+# WHY:
+# - /status?worst=k needs the k worst cells by latency or loss. Sorting
+#   every cell per request is O(n log n) on each dashboard poll.
+#
+# HOW:
+# - RankedCells keeps (-value, cell_id) in a sorted list. A new sample for a
+#   cell is one bisect to find its old entry, one to place the new one (and a
+#   memmove of the tail, which is fast even at tens of thousands of cells);
+#   unchanged values cost a dict lookup. The worst k are the first k entries.
+# - Several regions' rankings merge lazily with heapq.merge, so a fleet-wide
+#   worst=k reads O(k log regions) entries, never the whole fleet.
+# - Pagination uses the same trick for cell ids: a sorted id list per region,
+#   touched only when a cell first appears, so a page is a slice.
+
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Tuple
+
+
+class RankedCells:
+    """cell_id ordered by one KPI, highest (worst) first."""
+
+    __slots__ = ("_keys", "_values")
+
+    def __init__(self):
+        self._keys: List[Tuple[float, str]] = []
+        self._values: Dict[str, float] = {}
+
+    def update(self, cell_id: str, value: float) -> None:
+        old = self._values.get(cell_id)
+        if old is not None:
+            if old == value:
+                return
+            del self._keys[bisect_left(self._keys, (-old, cell_id))]
+        insort(self._keys, (-value, cell_id))
+        self._values[cell_id] = value
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def entries(self, region: str) -> Iterator[Tuple[float, str, str]]:
+        """(-value, cell_id, region), worst first: heapq.merge-able across regions."""
+        for neg_value, cell_id in self._keys:
+            yield neg_value, cell_id, region
+
+
+class CellOrder:
+    """Sorted cell ids of one region, for stable pagination."""
+
+    __slots__ = ("_ids",)
+
+    def __init__(self):
+        self._ids: List[str] = []
+
+    def add(self, cell_id: str) -> None:
+        i = bisect_left(self._ids, cell_id)
+        if i == len(self._ids) or self._ids[i] != cell_id:
+            self._ids.insert(i, cell_id)
+
+    def page(self, offset: int, limit: int) -> List[str]:
+        return self._ids[offset:offset + limit]
+
+    def __len__(self) -> int:
+        return len(self._ids)
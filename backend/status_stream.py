@@ -0,0 +1,145 @@
+# status_stream.py
+#
+# Server-push fan-out for the AINOA Console (/status/stream, Server-Sent Events).
+#
+# HOW:
+# - Ingest threads only mark what changed (dirty cells, changed incidents).
+#   That's a set insert under a lock, so the hot path stays cheap.
+# - Producers mark while still holding the state lock, and build_delta
+#   drains the marks under that same lock, so a delta stamped with version
+#   v covers exactly the changes up to v. Clients can then drop any delta
+#   not newer than their snapshot.
+# - One flusher task on the event loop wakes every `interval` seconds,
+#   coalesces everything marked since the last flush into ONE delta, encodes
+#   it once as an SSE frame and hands the same bytes to every subscriber.
+# - Each subscriber has a bounded queue. A subscriber that falls behind is
+#   dropped (its stream ends); EventSource reconnects and starts over with a
+#   fresh snapshot, which is cheaper than buffering for it.
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import json
+import threading
+
+
+CellRef = Tuple[str, str]  # (region, cell_id)
+Dirty = Tuple[Set[CellRef], Set[str]]  # (dirty cells, dirty incident ids)
+
+
+def sse_frame(event: str, data: bytes) -> bytes:
+    """Encode one SSE message. `data` must be single-line JSON."""
+    return b"event: " + event.encode("ascii") + b"\ndata: " + data + b"\n\n"
+
+
+class StatusBroadcaster:
+    """
+    Coalesces state changes into periodic delta frames for N subscribers.
+
+    build_delta(take_dirty) is supplied by main.py: it calls take_dirty()
+    under its state lock and returns the JSON-ready delta document (or None
+    to skip the flush).
+    """
+
+    def __init__(self,
+                 build_delta: Callable[[Callable[[], Dirty]], Optional[Dict[str, Any]]],
+                 interval: float = 0.5,
+                 queue_size: int = 32):
+        self._build_delta = build_delta
+        self.interval = interval
+        self.queue_size = queue_size
+
+        self._lock = threading.Lock()
+        self._dirty_cells: Set[CellRef] = set()
+        self._dirty_incidents: Set[str] = set()
+
+        self._subscribers: List[asyncio.Queue] = []
+        self._task: Optional[asyncio.Task] = None
+
+        # counters (surfaced by /health)
+        self.frames_sent = 0
+        self.subscribers_dropped = 0
+
+    # -- producers (any thread) ------------------------------------------------
+
+    def mark_cells(self, cells: Iterable[CellRef]) -> None:
+        with self._lock:
+            self._dirty_cells.update(cells)
+
+    def mark_incident(self, incident_id: str) -> None:
+        """Incident opened/updated/resolved or its pipeline outputs changed."""
+        with self._lock:
+            self._dirty_incidents.add(incident_id)
+
+    # -- subscribers (event loop) ----------------------------------------------
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, frame: bytes) -> None:
+        """Hand one pre-encoded frame to every subscriber (no re-serialization)."""
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # slow consumer: end its stream, it will reconnect for a snapshot
+                self.unsubscribe(queue)
+                self.subscribers_dropped += 1
+                queue.get_nowait()
+                queue.put_nowait(None)
+        self.frames_sent += 1
+
+    # -- flusher ---------------------------------------------------------------
+
+    def take_dirty(self) -> Dirty:
+        """Everything marked since the last call, and reset."""
+        with self._lock:
+            dirty, self._dirty_cells = self._dirty_cells, set()
+            incidents, self._dirty_incidents = self._dirty_incidents, set()
+        return dirty, incidents
+
+    def flush(self) -> None:
+        if not self._subscribers:
+            self.take_dirty()
+            return
+
+        delta = self._build_delta(self.take_dirty)
+        if delta is None:
+            return
+        data = json.dumps(delta, separators=(",", ":")).encode("utf-8")
+        self.publish(sse_frame("delta", data))
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:  # never let one bad delta kill the stream
+                print("[AINOA] status stream flush failed:", e)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for queue in list(self._subscribers):
+            self.unsubscribe(queue)
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
@@ -0,0 +1,208 @@
+# telemetry_store.py
+#
+# Per-cell storage for raw telemetry samples (compressed history).
+#
+# WHY:
+# - main.py used to keep a global list of event dicts capped at 200 and
+#   re-slice it on every push once full (a full list copy per sample).
+# - Each sample was a Python dict holding floats + a datetime object.
+#
+# HOW:
+# - Region and cell names are interned to small integer IDs.
+# - Every (region, cell) pair owns a CompressedSeries (compressed_series.py):
+#   Gorilla-encoded sealed blocks plus a small uncompressed head. Appends are
+#   O(1) amortized (a block is encoded once, when sealed) and never copy.
+#   ~2-20 bytes per sample instead of hundreds as dicts.
+# - Retention (sample count) is configurable per cell; shrinking keeps the
+#   newest samples.
+# - A secondary index keyed by the (region, cell_id) name pair points straight
+#   at each series, so per-cell reads (e.g. the last N samples for an incident
+#   prompt) never touch other cells. Reads snapshot the series under the lock
+#   and decode lazily outside it; the newest samples usually come straight
+#   from the head.
+#
+# Samples come back out as plain dicts with the same keys as
+# TelemetryEvent.dict(), so callers don't care about the columnar layout.
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import itertools
+import threading
+
+from compressed_series import CompressedSeries, Sample, SeriesSnapshot
+
+
+def to_epoch(ts: datetime) -> float:
+    """Naive datetimes are treated as UTC (TelemetryEvent defaults to utcnow)."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def from_epoch(epoch: float) -> datetime:
+    """Inverse of to_epoch(); returns a naive UTC datetime like datetime.utcnow()."""
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None)
+
+
+def _rows(name: Tuple[str, str], snapshot: SeriesSnapshot) -> Iterator[Tuple[str, str, float, float, float, float]]:
+    for sample in snapshot:
+        yield name + sample
+
+
+class TelemetryStore:
+    """
+    All raw telemetry, one CompressedSeries per (region, cell_id).
+
+    Thread-safe: FastAPI runs sync handlers in a threadpool, so concurrent
+    pushes can hit the same series.
+    """
+
+    def __init__(self, default_capacity: int = 1800, block_size: int = 120):
+        if default_capacity < 1:
+            raise ValueError("default_capacity must be >= 1")
+        self.default_capacity = default_capacity
+        self.block_size = block_size
+
+        self._region_ids: Dict[str, int] = {}
+        self._region_names: List[str] = []
+        self._cell_ids: Dict[str, int] = {}
+        self._cell_names: List[str] = []
+
+        # (region_id, cell_id) -> series
+        self._series: Dict[Tuple[int, int], CompressedSeries] = {}
+        # secondary index: (region, cell_id) names -> same series, for per-cell reads
+        self._by_name: Dict[Tuple[str, str], CompressedSeries] = {}
+        # retention overrides, kept so they apply to cells created later too
+        self._retention: Dict[Tuple[int, int], int] = {}
+
+        self._total = 0
+        self._lock = threading.Lock()
+
+    # -- interning -----------------------------------------------------------
+
+    def intern_region(self, region: str) -> int:
+        rid = self._region_ids.get(region)
+        if rid is None:
+            rid = len(self._region_names)
+            self._region_ids[region] = rid
+            self._region_names.append(region)
+        return rid
+
+    def intern_cell(self, cell_id: str) -> int:
+        cid = self._cell_ids.get(cell_id)
+        if cid is None:
+            cid = len(self._cell_names)
+            self._cell_ids[cell_id] = cid
+            self._cell_names.append(cell_id)
+        return cid
+
+    def region_name(self, region_id: int) -> str:
+        return self._region_names[region_id]
+
+    def cell_name(self, cell_id: int) -> str:
+        return self._cell_names[cell_id]
+
+    # -- writes --------------------------------------------------------------
+
+    def append(self, region: str, cell_id: str, packet_loss_pct: float,
+               latency_ms: float, throughput_mbps: float, timestamp: datetime) -> None:
+        epoch_s = to_epoch(timestamp)
+        with self._lock:
+            series = self._by_name.get((region, cell_id))
+            if series is None:
+                key = (self.intern_region(region), self.intern_cell(cell_id))
+                series = CompressedSeries(self._retention.get(key, self.default_capacity), self.block_size)
+                self._series[key] = series
+                self._by_name[(region, cell_id)] = series
+            evicted = series.append(packet_loss_pct, latency_ms, throughput_mbps, epoch_s)
+            self._total += 1 - evicted
+
+    def set_retention(self, region: str, cell_id: str, capacity: int) -> None:
+        """Set how many samples are retained for one cell (existing or future)."""
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        with self._lock:
+            key = (self.intern_region(region), self.intern_cell(cell_id))
+            self._retention[key] = capacity
+            series = self._series.get(key)
+            if series is not None:
+                self._total -= series.resize(capacity)
+
+    def retention(self, region: str, cell_id: str) -> int:
+        key = (self._region_ids.get(region), self._cell_ids.get(cell_id))
+        return self._retention.get(key, self.default_capacity)
+
+    # -- reads ---------------------------------------------------------------
+
+    def _snapshot(self, region: str, cell_id: str) -> Optional[SeriesSnapshot]:
+        with self._lock:
+            series = self._by_name.get((region, cell_id))
+            return None if series is None else series.snapshot()
+
+    @staticmethod
+    def _sample(region: str, cell_id: str, sample: Sample) -> Dict[str, Any]:
+        epoch_s, loss, latency, throughput = sample
+        return {
+            "region": region,
+            "cell_id": cell_id,
+            "packet_loss_pct": loss,
+            "latency_ms": latency,
+            "throughput_mbps": throughput,
+            "timestamp": from_epoch(epoch_s),
+        }
+
+    def iter_samples(self, region: str, cell_id: str, start_s: Optional[float] = None,
+                     end_s: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Retained samples for one cell, oldest → newest, decoded as consumed;
+        optionally only start_s <= timestamp < end_s (epoch seconds).
+        """
+        snapshot = self._snapshot(region, cell_id)
+        if snapshot is None:
+            return
+        for sample in snapshot.iter_range(start_s, end_s):
+            yield self._sample(region, cell_id, sample)
+
+    def iter_recent(self, region: str, cell_id: str) -> Iterator[Dict[str, Any]]:
+        """Retained samples for one cell, newest → oldest, decoded as consumed."""
+        snapshot = self._snapshot(region, cell_id)
+        if snapshot is None:
+            return
+        for sample in snapshot.iter_newest():
+            yield self._sample(region, cell_id, sample)
+
+    def samples(self, region: str, cell_id: str) -> List[Dict[str, Any]]:
+        """All retained samples for one cell, oldest → newest."""
+        return list(self.iter_samples(region, cell_id))
+
+    def recent(self, region: str, cell_id: str, n: int) -> List[Dict[str, Any]]:
+        """
+        The newest n samples for one cell, oldest → newest. Decodes at most
+        the sealed blocks those n samples live in (usually none).
+        """
+        if n <= 0:
+            return []
+        newest = list(itertools.islice(self.iter_recent(region, cell_id), n))
+        newest.reverse()
+        return newest
+
+    def export(self) -> List[Iterator[Tuple[str, str, float, float, float, float]]]:
+        """
+        Every retained sample as raw columns, one lazy iterator per cell in
+        time order: (region, cell_id, epoch_s, packet_loss_pct, latency_ms,
+        throughput_mbps). Used to snapshot the store (e.g. WAL compaction).
+        """
+        with self._lock:
+            snapshots = [(name, series.snapshot()) for name, series in self._by_name.items()]
+        return [_rows(name, snapshot) for name, snapshot in snapshots]
+
+    def nbytes(self) -> int:
+        """Bytes of sample data held (compressed blocks + uncompressed heads)."""
+        with self._lock:
+            return sum(series.nbytes() for series in self._series.values())
+
+    def cell_count(self) -> int:
+        return len(self._series)
+
+    def __len__(self) -> int:
+        return self._total
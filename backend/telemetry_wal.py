@@ -0,0 +1,333 @@
+# telemetry_wal.py
+#
+# Optional durable, append-only log of accepted telemetry and pipeline outputs,
+# so a restart (or uvicorn --reload) doesn't wipe the dashboard.
+#
+# LAYOUT:
+# - A directory of segment files seg-000000000001.wal, seg-...2.wal, ...
+#   Each process start opens a fresh segment; a segment is rolled once it
+#   passes segment_bytes.
+# - Record = header <u32 payload_len, u8 kind, u32 crc32(payload)> + payload.
+#   KIND_TELEMETRY payload: <f64 epoch_s, f64 loss, f64 latency, f64 tput,
+#   u16 len(region), u16 len(cell_id)> + utf-8 names (fixed layout, decoded
+#   with struct.unpack_from straight out of the mmap). KIND_PIPELINE
+#   (an incident's diagnosis/policy/forecast) and KIND_INCIDENT (an
+#   incident's full state after it opened, reopened, escalated, resolved or
+#   an operator moved it) payloads are JSON.
+#
+# WRITES (group commit):
+# - append_*() only encodes the record and adds it to an in-memory buffer.
+# - A writer thread wakes every commit_interval_s, writes the whole buffer
+#   with one write() and pays one fsync for the group. A crash loses at most
+#   one commit interval of samples; no push ever waits on the disk.
+# - A failed write or fsync puts the group back at the head of the buffer
+#   (counted in commit_errors), truncates the segment back to where the
+#   group started (writes are unbuffered, so nothing of it is left to flush
+#   later) and abandons it; the next commit retries on a fresh segment. If
+#   even the truncate fails, replay's torn-tail handling ends that segment.
+#
+# STARTUP:
+# - replay() memory-maps each segment in order and hands decoded records to
+#   callbacks. A torn/corrupt tail (crash mid-write) ends that segment.
+# - Retention: segments last committed to (file mtime) more than
+#   retention_s ago are deleted. Wall-clock, not sample timestamps: a
+#   collector backfilling old data must not get its segment deleted.
+# - Compaction: when more than compact_after_segments remain after replay,
+#   main.py writes the current in-memory state (already bounded by per-cell
+#   retention) as one snapshot segment and the old ones are removed, so
+#   startup cost tracks retained state, not days of raw log.
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+
+KIND_TELEMETRY = 1
+KIND_PIPELINE = 2
+KIND_INCIDENT = 3
+
+_HEADER = struct.Struct("<IBI")
+_TELEMETRY = struct.Struct("<ddddHH")
+
+SEGMENT_PREFIX = "seg-"
+SEGMENT_SUFFIX = ".wal"
+
+
+def encode_record(kind: int, payload: bytes) -> bytes:
+    return _HEADER.pack(len(payload), kind, zlib.crc32(payload)) + payload
+
+
+def encode_telemetry(region: str, cell_id: str, epoch_s: float, packet_loss_pct: float,
+                     latency_ms: float, throughput_mbps: float) -> bytes:
+    r = region.encode("utf-8")
+    c = cell_id.encode("utf-8")
+    payload = _TELEMETRY.pack(epoch_s, packet_loss_pct, latency_ms, throughput_mbps, len(r), len(c)) + r + c
+    return encode_record(KIND_TELEMETRY, payload)
+
+
+def encode_json(kind: int, obj: Dict[str, Any]) -> bytes:
+    return encode_record(kind, json.dumps(obj, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+class TelemetryWAL:
+
+    def __init__(self, directory: str, segment_bytes: int = 64 << 20, commit_interval_s: float = 0.05,
+                 fsync: bool = True, retention_s: float = 24 * 3600, compact_after_segments: int = 4,
+                 max_group_records: int = 8192):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.commit_interval_s = commit_interval_s
+        self.fsync = fsync
+        self.retention_s = retention_s
+        self.compact_after_segments = compact_after_segments
+        self.max_group_records = max_group_records  # commit early once this many are buffered
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._buffer: List[bytes] = []
+        self._buffer_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._file = None
+        self._file_bytes = 0
+        self._segment_newest: Dict[str, float] = {}  # segment path -> last commit (wall clock)
+
+        # counters
+        self.records_appended = 0
+        self.commits = 0
+        self.bytes_written = 0
+        self.commit_errors = 0
+        self.records_replayed = 0
+        self.replay_errors = 0
+        self.segments_deleted = 0
+
+    # -- segment bookkeeping -------------------------------------------------------
+
+    def segments(self) -> List[str]:
+        names = sorted(n for n in os.listdir(self.directory)
+                       if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.directory, n) for n in names]
+
+    def _next_segment_path(self) -> str:
+        existing = self.segments()
+        last = int(os.path.basename(existing[-1])[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) if existing else 0
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{last + 1:012d}{SEGMENT_SUFFIX}")
+
+    def _open_new_segment(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        path = self._next_segment_path()
+        self._file = open(path, "ab", buffering=0)
+        self._file_bytes = 0
+        self._segment_newest[path] = time.time()
+
+    # -- append side (any thread, cheap) -------------------------------------------
+
+    def append_telemetry(self, region: str, cell_id: str, epoch_s: float, packet_loss_pct: float,
+                         latency_ms: float, throughput_mbps: float) -> None:
+        self._append(encode_telemetry(region, cell_id, epoch_s, packet_loss_pct, latency_ms, throughput_mbps))
+
+    def append_json(self, kind: int, obj: Dict[str, Any]) -> None:
+        self._append(encode_json(kind, obj))
+
+    def _append(self, record: bytes) -> None:
+        with self._buffer_lock:
+            self._buffer.append(record)
+            self.records_appended += 1
+            full = len(self._buffer) >= self.max_group_records
+        if full:
+            self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    # -- writer thread -------------------------------------------------------------
+
+    def commit(self) -> None:
+        """Write + fsync everything buffered so far as one group."""
+        with self._buffer_lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        data = b"".join(batch)
+        try:
+            if self._file is None:
+                self._open_new_segment()   # the previous one failed mid-write
+            view = memoryview(data)
+            while view:
+                view = view[self._file.write(view):]
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        except OSError:
+            with self._buffer_lock:
+                self._buffer[:0] = batch   # retried first, ahead of newer records
+            self.commit_errors += 1
+            self._abandon_segment()
+            raise
+        self._file_bytes += len(data)
+        self.bytes_written += len(data)
+        self.commits += 1
+        self._segment_newest[self._file.name] = time.time()
+
+        if self._file_bytes >= self.segment_bytes:
+            self._open_new_segment()
+            self.apply_retention()
+
+    def _abandon_segment(self) -> None:
+        """Cut the failed group off the current segment and stop writing to it."""
+        file, self._file = self._file, None
+        if file is None:
+            return
+        try:
+            os.ftruncate(file.fileno(), self._file_bytes)
+        except OSError:
+            pass
+        try:
+            file.close()
+        except OSError:
+            pass
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(self.commit_interval_s)
+            self._wakeup.clear()
+            try:
+                self.commit()
+            except OSError as e:
+                print("[AINOA] WAL commit failed:", e)
+        self.commit()
+
+    def start(self) -> None:
+        """Open a fresh segment and start group commits."""
+        if self._thread is not None:
+            return
+        self._open_new_segment()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ainoa-wal", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # -- replay --------------------------------------------------------------------
+
+    def _replay_segment(self, path: str,
+                        on_telemetry: Callable[[str, str, float, float, float, float], None],
+                        on_json: Callable[[int, Dict[str, Any]], None]) -> None:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos, end = 0, len(mm)
+                header_size, telemetry_size = _HEADER.size, _TELEMETRY.size
+                while pos + header_size <= end:
+                    length, kind, crc = _HEADER.unpack_from(mm, pos)
+                    start = pos + header_size
+                    if start + length > end:
+                        self.replay_errors += 1  # torn tail
+                        break
+                    payload = mm[start:start + length]
+                    if zlib.crc32(payload) != crc:
+                        self.replay_errors += 1
+                        break
+                    pos = start + length
+
+                    if kind == KIND_TELEMETRY:
+                        epoch_s, loss, latency, tput, rlen, clen = _TELEMETRY.unpack_from(payload, 0)
+                        region = payload[telemetry_size:telemetry_size + rlen].decode("utf-8")
+                        cell_id = payload[telemetry_size + rlen:telemetry_size + rlen + clen].decode("utf-8")
+                        on_telemetry(region, cell_id, epoch_s, loss, latency, tput)
+                    else:
+                        on_json(kind, json.loads(payload))
+                    self.records_replayed += 1
+
+    def replay(self, on_telemetry: Callable[[str, str, float, float, float, float], None],
+               on_json: Callable[[int, Dict[str, Any]], None]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        segments = self.segments()
+        for path in segments:
+            self._replay_segment(path, on_telemetry, on_json)
+            self._segment_newest[path] = os.path.getmtime(path)
+        return {
+            "segments": len(segments),
+            "records": self.records_replayed,
+            "errors": self.replay_errors,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    # -- retention / compaction ----------------------------------------------------
+
+    def apply_retention(self, now: Optional[float] = None) -> int:
+        """Delete closed segments not committed to for more than retention_s."""
+        now = time.time() if now is None else now
+        current = self._file.name if self._file is not None else None
+        removed = 0
+        for path in self.segments():
+            if path == current:
+                continue
+            newest = self._segment_newest.get(path) or os.path.getmtime(path)
+            if now - newest > self.retention_s:
+                os.remove(path)
+                self._segment_newest.pop(path, None)
+                removed += 1
+        self.segments_deleted += removed
+        return removed
+
+    def needs_compaction(self) -> bool:
+        return len(self.segments()) > self.compact_after_segments
+
+    def compact(self, records: Iterable[bytes]) -> int:
+        """
+        Replace every existing segment with one snapshot segment holding
+        `records` (already encoded, in replay order). Must run before start(),
+        i.e. before new appends. Crash-safe: the snapshot is written to a temp
+        file, fsynced and renamed before old segments are deleted.
+        """
+        if self._thread is not None:
+            raise RuntimeError("compact() must run before start()")
+        old = self.segments()
+        target = self._next_segment_path()
+        tmp = target + ".tmp"
+        count = 0
+        with open(tmp, "wb") as f:
+            for record in records:
+                f.write(record)
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, target)
+        for path in old:
+            os.remove(path)
+            self._segment_newest.pop(path, None)
+        self.segments_deleted += len(old)
+        self._segment_newest[target] = time.time()
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "segments": len(self.segments()),
+            "pending": self.pending,
+            "records_appended": self.records_appended,
+            "commits": self.commits,
+            "bytes_written": self.bytes_written,
+            "commit_errors": self.commit_errors,
+            "records_replayed": self.records_replayed,
+            "replay_errors": self.replay_errors,
+            "segments_deleted": self.segments_deleted,
+        }
@@ -0,0 +1,84 @@
+import math
+import random
+import struct
+
+from compressed_series import CompressedSeries, decode_block, encode_block
+
+
+def _bits(x: float) -> int:
+    return struct.unpack("<Q", struct.pack("<d", x))[0]
+
+
+def _assert_same(got, want):
+    assert len(got) == len(want)
+    for g, w in zip(got, want):
+        assert g[0] == w[0]
+        # floats must come back bit-exact (-0.0, NaN payloads included)
+        assert [_bits(x) for x in g[1:]] == [_bits(x) for x in w[1:]]
+
+
+def _samples(n, seed=7, start_us=1_700_000_000_000_000):
+    rng = random.Random(seed)
+    ts_us = start_us
+    out = []
+    for _ in range(n):
+        ts_us += rng.choice((1_000_000, 1_000_000, 1_000_000, 999_997, 1_250_000))
+        out.append((ts_us / 1e6, round(rng.uniform(0, 10), 2), rng.uniform(20, 300), rng.choice((125.0, 125.5, 80.0))))
+    return out
+
+
+def _round_trip(samples):
+    ts_us = [round(s[0] * 1e6) for s in samples]
+    columns = [[s[i] for s in samples] for i in (1, 2, 3)]
+    return decode_block(encode_block(ts_us, columns), len(samples))
+
+
+def test_block_round_trip():
+    samples = _samples(500)
+    _assert_same(_round_trip(samples), samples)
+
+
+def test_block_round_trip_out_of_order_timestamps():
+    samples = _samples(200)
+    rng = random.Random(3)
+    rng.shuffle(samples)
+    # late and duplicate stamps, and jumps that need every delta-of-delta bucket
+    samples[10] = (samples[9][0],) + samples[10][1:]
+    samples[20] = (samples[19][0] - 86_400.0,) + samples[20][1:]
+    samples[30] = (samples[29][0] + 3 * 86_400.0 * 365,) + samples[30][1:]
+    _assert_same(_round_trip(samples), samples)
+
+
+def test_block_round_trip_signed_zero_and_specials():
+    values = [0.0, -0.0, 0.0, -0.0, -0.0, 1.5, -1.5, math.inf, -math.inf, math.nan,
+              5e-324, -5e-324, 1.7976931348623157e308, 0.0]
+    samples = [(1_700_000_000 + i, v, -v, v) for i, v in enumerate(values)]
+    got = _round_trip(samples)
+    _assert_same(got, samples)
+    assert math.copysign(1.0, got[1][1]) == -1.0
+    assert math.copysign(1.0, got[2][1]) == 1.0
+
+
+def test_series_reads_match_appends_across_seals_and_retention():
+    samples = _samples(1000)
+    series = CompressedSeries(capacity=700, block_size=64, head_keep=8)
+    evicted = sum(series.append(loss, lat, thr, ts) for ts, loss, lat, thr in samples)
+    assert evicted == 300
+    assert len(series.blocks) > 1
+
+    snap = series.snapshot()
+    _assert_same(list(snap), samples[-700:])
+    _assert_same(list(snap.iter_newest()), samples[-700:][::-1])
+
+    start, end = samples[500][0], samples[600][0]
+    _assert_same(list(snap.iter_range(start, end)), samples[500:600])
+
+
+def test_series_resize_below_head():
+    series = CompressedSeries(capacity=100, block_size=16, head_keep=4)
+    samples = _samples(50)
+    for ts, loss, lat, thr in samples:
+        series.append(loss, lat, thr, ts)
+    assert series.resize(3) == 47
+    _assert_same(list(series.snapshot()), samples[-3:])
+    assert series.size == 3
@@ -0,0 +1,89 @@
+import json
+import socket
+import threading
+
+import pytest
+
+from sharding import HashRing, ShardClient, ShardError, _LENGTH, _encode
+
+
+KEYS = [f"{region}:cell_{i}" for region in ("northwest", "central", "south") for i in range(2000)]
+
+
+def test_owner_is_stable_across_instances():
+    # not hash(): every worker process must agree on the mapping
+    a, b = HashRing(4), HashRing(4)
+    assert [a.owner(k) for k in KEYS] == [b.owner(k) for k in KEYS]
+    assert set(a.owner(k) for k in KEYS) == {0, 1, 2, 3}
+
+
+@pytest.mark.parametrize("shards", [1, 2, 4, 7])
+def test_adding_a_shard_only_moves_keys_to_it(shards):
+    before, after = HashRing(shards), HashRing(shards + 1)
+    moved = [k for k in KEYS if before.owner(k) != after.owner(k)]
+    assert all(after.owner(k) == shards for k in moved)
+    expected = len(KEYS) / (shards + 1)
+    assert 0.5 * expected < len(moved) < 1.5 * expected
+
+
+class _FlakyShard:
+    """Loopback shard that runs each op, but can drop the connection instead of replying."""
+
+    def __init__(self):
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.ran = []
+        self.drop_next_reply = False
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                head = conn.recv(_LENGTH.size, socket.MSG_WAITALL)
+                if not head:
+                    return
+                (length,) = _LENGTH.unpack(head)
+                request = json.loads(conn.recv(length, socket.MSG_WAITALL))
+                self.ran.append(request["op"])
+                if self.drop_next_reply:
+                    self.drop_next_reply = False
+                    return   # e.g. the worker restarted after running the op
+                conn.sendall(_encode({"ok": True, "result": len(self.ran)}))
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def shard():
+    server = _FlakyShard()
+    yield server
+    server.close()
+
+
+def test_idempotent_op_is_resent_on_a_stale_connection(shard):
+    client = ShardClient(shard.port)
+    assert client.call("status_part", idempotent=True) == 1
+    shard.drop_next_reply = True
+    assert client.call("status_part", idempotent=True) == 3
+    assert shard.ran == ["status_part"] * 3
+
+
+def test_non_idempotent_op_is_not_resent(shard):
+    client = ShardClient(shard.port)
+    client.call("push", {"event": {}})
+    shard.drop_next_reply = True
+    with pytest.raises(ShardError) as e:
+        client.call("push", {"event": {}})
+    assert e.value.status == 503
+    assert shard.ran == ["push", "push"]
+    # the broken connection was dropped; the next call reconnects
+    assert client.call("push", {"event": {}}) == 3
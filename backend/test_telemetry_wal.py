@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+import telemetry_wal
+from telemetry_wal import KIND_PIPELINE, TelemetryWAL
+
+
+def _write(directory, n, first=0):
+    wal = TelemetryWAL(directory)
+    wal.start()
+    for i in range(first, first + n):
+        wal.append_telemetry("northwest", f"cell_{i}", 1_700_000_000.0 + i, 0.1 * i, 40.0 + i, 100.0)
+    wal.append_json(KIND_PIPELINE, {"region": "northwest", "cell_id": f"cell_{first}", "n": n})
+    wal.close()
+    return wal.segments()[-1]
+
+
+def _replay(directory):
+    wal = TelemetryWAL(directory)
+    telemetry, json_records = [], []
+    summary = wal.replay(lambda *record: telemetry.append(record),
+                         lambda kind, obj: json_records.append((kind, obj)))
+    return summary, telemetry, json_records
+
+
+def test_replay_round_trip(tmp_path):
+    _write(str(tmp_path), 50)
+    summary, telemetry, json_records = _replay(str(tmp_path))
+    assert summary["errors"] == 0
+    assert summary["records"] == 51
+    assert telemetry[7] == ("northwest", "cell_7", 1_700_000_007.0, 0.1 * 7, 47.0, 100.0)
+    assert json_records == [(KIND_PIPELINE, {"region": "northwest", "cell_id": "cell_0", "n": 50})]
+
+
+@pytest.mark.parametrize("cut", [1, 5, 12])
+def test_replay_stops_at_torn_tail(tmp_path, cut):
+    path = _write(str(tmp_path), 20)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - cut)   # crash mid-write of the last record
+    summary, telemetry, json_records = _replay(str(tmp_path))
+    assert summary["errors"] == 1
+    assert len(telemetry) == 20
+    assert json_records == []
+
+
+def test_replay_stops_at_corrupt_record_and_continues_with_next_segment(tmp_path):
+    path = _write(str(tmp_path), 20)
+    with open(path, "r+b") as f:
+        f.seek(-3, os.SEEK_END)
+        byte = f.read(1)
+        f.seek(-3, os.SEEK_END)
+        f.write(bytes([byte[0] ^ 0xFF]))        # payload no longer matches its crc32
+    _write(str(tmp_path), 5, first=100)
+
+    summary, telemetry, json_records = _replay(str(tmp_path))
+    assert summary["segments"] == 2
+    assert summary["errors"] == 1
+    assert [t[1] for t in telemetry] == [f"cell_{i}" for i in range(20)] + [f"cell_{i}" for i in range(100, 105)]
+    assert [obj["n"] for _, obj in json_records] == [5]
+
+
+def test_failed_commit_is_retried_without_duplicates(tmp_path, monkeypatch):
+    wal = TelemetryWAL(str(tmp_path))
+    wal._open_new_segment()
+    wal.append_telemetry("central", "cell_1", 1.0, 0.1, 40.0, 100.0)
+    wal.commit()
+
+    real_fsync = os.fsync
+    calls = []
+
+    def failing_fsync(fd):
+        calls.append(fd)
+        if len(calls) == 1:
+            raise OSError("disk full")
+        real_fsync(fd)
+
+    monkeypatch.setattr(telemetry_wal.os, "fsync", failing_fsync)
+    wal.append_telemetry("central", "cell_2", 2.0, 0.2, 41.0, 100.0)
+    with pytest.raises(OSError):
+        wal.commit()
+    assert wal.commit_errors == 1
+    assert wal.pending == 1                         # the group went back into the buffer
+
+    wal.append_telemetry("central", "cell_3", 3.0, 0.3, 42.0, 100.0)
+    wal.commit()
+    wal.close()
+
+    summary, telemetry, _ = _replay(str(tmp_path))
+    assert summary["errors"] == 0
+    assert [t[1] for t in telemetry] == ["cell_1", "cell_2", "cell_3"]
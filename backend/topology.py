@@ -0,0 +1,143 @@
+# topology.py
+#
+# Cell adjacency graph + live neighbor headroom, for picking offload targets.
+#
+# WHY:
+# - decision_layer_policy() used to offload to a hard-coded "cell_15" no
+#   matter which cell was degraded or how loaded that neighbor was.
+#
+# HOW:
+# - The graph (and per-cell capacity) is loaded from a JSON file; edges are
+#   undirected. Cells are keyed "region:cell_id" like LATEST_BY_CELL.
+# - Every cell keeps a max-heap of its neighbors by headroom
+#   (capacity_mbps - latest throughput_mbps). When a sample arrives for
+#   cell N, one entry is pushed into the heap of each of N's neighbors
+#   (O(d log k)); N's older entries go stale (lazy deletion by version).
+# - A neighbor that is in trouble (anomalous latest sample, or an active
+#   incident) gets no entry at all, so it can never come out on top.
+# - best_neighbor() / top_neighbors() drop stale entries off the top and
+#   read the live head: O(k log d) amortized, no scan of the adjacency.
+#   Heaps are rebuilt once stale entries outnumber live ones, so memory
+#   stays O(edges).
+#
+# File format:
+#   {
+#     "default_capacity_mbps": 300,
+#     "capacity_mbps": {"northwest:cell_12": 400},
+#     "neighbors": {"northwest:cell_12": ["northwest:cell_15", "central:cell_21"]}
+#   }
+
+from typing import Dict, List, Optional, Set, Tuple
+import heapq
+import json
+import threading
+
+
+class Topology:
+    """Thread-safe (ingest threads update, pipeline workers select)."""
+
+    def __init__(self, neighbors: Optional[Dict[str, List[str]]] = None,
+                 capacity_mbps: Optional[Dict[str, float]] = None,
+                 default_capacity_mbps: float = 300.0):
+        self.default_capacity_mbps = default_capacity_mbps
+        self._capacity: Dict[str, float] = dict(capacity_mbps or {})
+        self._adjacent: Dict[str, Set[str]] = {}
+        for cell, peers in (neighbors or {}).items():
+            for peer in peers:
+                self.add_edge(cell, peer)
+
+        # cell -> heap of (-headroom, version, neighbor key)
+        self._heaps: Dict[str, List[Tuple[float, int, str]]] = {}
+        # neighbor key -> (version, headroom or None when in trouble)
+        self._current: Dict[str, Tuple[int, Optional[float]]] = {}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "Topology":
+        with open(path) as f:
+            config = json.load(f)
+        return cls(
+            neighbors=config.get("neighbors", {}),
+            capacity_mbps=config.get("capacity_mbps", {}),
+            default_capacity_mbps=float(config.get("default_capacity_mbps", 300.0)),
+        )
+
+    def add_edge(self, a: str, b: str) -> None:
+        if a == b:
+            return
+        self._adjacent.setdefault(a, set()).add(b)
+        self._adjacent.setdefault(b, set()).add(a)
+
+    def neighbors(self, cell: str) -> Set[str]:
+        return self._adjacent.get(cell, set())
+
+    def capacity(self, cell: str) -> float:
+        return self._capacity.get(cell, self.default_capacity_mbps)
+
+    # -- ingest side ---------------------------------------------------------------
+
+    def observe(self, cell: str, throughput_mbps: float, troubled: bool) -> None:
+        """Latest sample for `cell`: refresh its entry in every neighbor's heap."""
+        peers = self._adjacent.get(cell)
+        if not peers:
+            return
+        headroom = None if troubled else self.capacity(cell) - throughput_mbps
+        with self._lock:
+            self._version += 1
+            version = self._version
+            self._current[cell] = (version, headroom)
+            if headroom is None:
+                return  # old entries are now stale; nothing new to offer
+            entry = (-headroom, version, cell)
+            for peer in peers:
+                heap = self._heaps.get(peer)
+                if heap is None:
+                    heap = self._heaps[peer] = []
+                heapq.heappush(heap, entry)
+                if len(heap) > 2 * len(self._adjacent[peer]) + 8:
+                    self._rebuild(peer)
+
+    def _rebuild(self, cell: str) -> None:
+        live = [e for e in self._heaps[cell] if self._current.get(e[2], (None,))[0] == e[1]]
+        heapq.heapify(live)
+        self._heaps[cell] = live
+
+    # -- decision side -------------------------------------------------------------
+
+    def best_neighbor(self, cell: str) -> Optional[Tuple[str, float]]:
+        """(neighbor key, headroom_mbps) of the healthy neighbor with most headroom."""
+        with self._lock:
+            heap = self._heaps.get(cell)
+            while heap:
+                neg_headroom, version, peer = heap[0]
+                if self._current.get(peer, (None,))[0] == version:
+                    return peer, -neg_headroom
+                heapq.heappop(heap)  # superseded by a newer sample
+            return None
+
+    def top_neighbors(self, cell: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Up to k healthy neighbors with the most headroom, best first. Pops
+        live entries off the heap (discarding stale ones for good) and pushes
+        the live ones back: O(k log d) plus the amortized stale pops.
+        """
+        with self._lock:
+            heap = self._heaps.get(cell)
+            if not heap:
+                return []
+            live: List[Tuple[float, int, str]] = []
+            while heap and len(live) < k:
+                entry = heapq.heappop(heap)
+                if self._current.get(entry[2], (None,))[0] == entry[1]:
+                    live.append(entry)  # one live entry per neighbor: no duplicates
+            for entry in live:
+                heapq.heappush(heap, entry)
+        return [(peer, -neg_headroom) for neg_headroom, _, peer in live]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "cells": len(self._adjacent),
+            "edges": sum(len(p) for p in self._adjacent.values()) // 2,
+            "heap_entries": sum(len(h) for h in self._heaps.values()),
+        }